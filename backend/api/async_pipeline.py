@@ -0,0 +1,237 @@
+"""
+Async execution of note generation jobs (``NOTE_JOB_BACKEND = 'async'``).
+
+Jobs run as coroutines on one event loop in a background thread, so the same
+code works under WSGI and ASGI and a job outlives the request that queued it.
+Provider calls go through async_providers.py (pooled HTTP clients, yt-dlp on a
+small thread pool) and database work through ``sync_to_async``, so a job
+waiting on AssemblyAI or Gemini costs a coroutine, not a thread. Up to
+``NOTE_JOB_ASYNC_CONCURRENCY`` jobs run at once.
+
+The stages themselves are shared with ``utils.run_pipeline`` (see stages.py);
+only the operations they yield are performed differently. Caching,
+single-flight sharing and job bookkeeping mirror ``jobs.run_job``.
+"""
+import asyncio
+import contextvars
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import async_providers as providers
+from . import utils
+from .cache import get_cached_result
+from .checkpoints import Checkpoint, JobCheckpoint
+from .job_events import job_events
+from .jobs import (
+    claim_job, complete_job, fail_job, mark_job_crashed, finish_pipeline_result, start_next_batch_job
+)
+from .metrics import PIPELINES_IN_FLIGHT, JOBS_IN_FLIGHT, JOBS_FINISHED
+from .models import NoteJob
+from .notes_engine import generate_notes_async, stream_notes_async
+from .segmented import transcribe_segmented_async
+from .singleflight import AsyncSingleFlight
+from .stages import adrive, transcript_stages, pipeline_stages
+from .transcode import transcode_audio_async
+from .vad import trim_silence_async
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+_job_slots = None
+
+# Jobs for the same video share one pipeline run (all coroutines live on _loop)
+pipeline_flights = AsyncSingleFlight()
+
+
+def database(fn):
+    """Wrap a blocking ORM function as a coroutine function run on a worker thread."""
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+async def enter_stage(on_stage, stage):
+    print(f"Pipeline stage: {stage}")
+    if on_stage is not None:
+        await on_stage(stage)
+
+
+async def save_checkpoint(checkpoint, stage, **values):
+    await database(checkpoint.save)(stage, **values)
+
+
+class AsyncPerformer:
+    """Performs the operations of the pipeline stages (see stages.py) as coroutines."""
+
+    def __init__(self, checkpoint, on_stage=None, on_text=None):
+        self.checkpoint = checkpoint
+        self.on_stage = on_stage
+        self.on_text = on_text
+
+    async def stage(self, stage):
+        await enter_stage(self.on_stage, stage)
+
+    async def video_info(self, link):
+        return await providers.run_blocking(utils.get_video_info, link)
+
+    async def captions(self, info):
+        return await providers.run_blocking(utils.fetch_caption_transcript, info)
+
+    async def download(self, link):
+        audio_path = await providers.run_blocking(utils.download_audio_file, link)
+        audio_path = await transcode_audio_async(audio_path)
+        trimmed = await trim_silence_async(audio_path)
+        if trimmed is None:
+            return audio_path, None, None
+        return trimmed.path, trimmed.offsets or None, trimmed.levels
+
+    async def upload(self, file_path):
+        return await providers.upload_audio_to_cloudinary(file_path)
+
+    async def transcribe_segmented(self, file_path, offsets, levels):
+        return await transcribe_segmented_async(file_path, providers.transcribe_words, offsets=offsets, levels=levels)
+
+    async def transcribe(self, audio_source, transcript_id):
+        async def on_submitted(transcript_id):
+            await save_checkpoint(self.checkpoint, 'asr', transcript_id=transcript_id)
+
+        return await providers.transcribe_audio(audio_source, transcript_id=transcript_id, on_submitted=on_submitted)
+
+    async def generate(self, transcription, title, segments):
+        if self.on_text is None:
+            return await generate_notes_async(
+                transcription, title, providers.generate_text, segments=segments, namespace=utils.pipeline_version(),
+                checkpoint=self.checkpoint
+            )
+        parts = []
+        async for text in stream_notes_async(transcription, title, providers.generate_text, providers.stream_text,
+                                             segments=segments, namespace=utils.pipeline_version(),
+                                             checkpoint=self.checkpoint):
+            parts.append(text)
+            self.on_text(text)
+        return ''.join(parts)
+
+    async def save(self, stage, values):
+        await save_checkpoint(self.checkpoint, stage, **values)
+
+    async def save_transcript(self, transcription, transcript_source, segments):
+        await database(self.checkpoint.save_transcript)(transcription, transcript_source, segments)
+
+
+async def prepare_transcript(link, on_stage=None, checkpoint=None):
+    """Async ``utils.prepare_transcript``."""
+    checkpoint = checkpoint or Checkpoint()
+    return await adrive(transcript_stages(link, checkpoint), AsyncPerformer(checkpoint, on_stage=on_stage))
+
+
+async def run_pipeline(link, on_stage=None, checkpoint=None, on_text=None):
+    """Async ``utils.run_pipeline``; ``on_text`` is a plain (not async) callable."""
+    checkpoint = checkpoint or Checkpoint()
+    performer = AsyncPerformer(checkpoint, on_stage=on_stage, on_text=on_text)
+    return await adrive(pipeline_stages(link, checkpoint, utils.pipeline_version()), performer)
+
+
+async def run_shared_pipeline(link, on_stage=None, on_wait=None, checkpoint=None, on_text=None):
+    """Async ``jobs.run_shared_pipeline``."""
+    video_id = utils.parse_video_id(link)
+    key = f"{video_id}:{utils.pipeline_version()}" if video_id else link
+
+    async def compute():
+        result = await database(get_cached_result)(link)
+        if result is None:
+            with PIPELINES_IN_FLIGHT.track_inprogress():
+                result = await run_pipeline(link, on_stage=on_stage, checkpoint=checkpoint, on_text=on_text)
+            await database(finish_pipeline_result)(link, result)
+        return result
+
+    return await pipeline_flights.do(key, compute, on_wait=on_wait)
+
+
+def _load_job(job_id):
+    return NoteJob.objects.select_related('user').get(pk=job_id)
+
+
+def _set_stage(job_id, stage):
+    NoteJob.objects.filter(pk=job_id).update(stage=stage, updated_at=timezone.now())
+
+
+async def run_job(job_id):
+    """Run the pipeline for a job and store the resulting note or error."""
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(settings.NOTE_JOB_ASYNC_CONCURRENCY)
+
+    async with _job_slots:
+        if not await database(claim_job)(job_id):
+            return
+        with JOBS_IN_FLIGHT.track_inprogress():
+            try:
+                status = await _run_claimed_job(job_id)
+            except Exception as e:
+                status = await database(mark_job_crashed)(job_id, e)
+        JOBS_FINISHED.inc(status=status)
+        job_events.finish(job_id)
+        await database(start_next_batch_job)(job_id)
+
+
+async def _run_claimed_job(job_id):
+    job = await database(_load_job)(job_id)
+    print(f"Running note job {job.pk} for {job.youtube_link} (async)")
+
+    async def on_stage(stage):
+        await database(_set_stage)(job.pk, stage)
+        job_events.publish(job.pk, 'stage', {'stage': stage})
+
+    # Stream the notes only when someone is following the job (see streaming.py)
+    on_text = None
+    if job_events.has_subscribers(job.pk):
+        on_text = lambda text: job_events.publish(job.pk, 'chunk', {'text': text})
+
+    try:
+        result = await run_shared_pipeline(
+            job.youtube_link, on_stage=on_stage, on_wait=lambda: on_stage('waiting'), checkpoint=JobCheckpoint(job),
+            on_text=on_text
+        )
+    except Exception as e:
+        return await database(fail_job)(job, e)
+    return await database(complete_job)(job, result)
+
+
+def get_loop():
+    """Return the background event loop, starting its thread on first use."""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name='note-job-loop', daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def submit_job(job_id):
+    """Schedule a job on the background loop; returns a ``concurrent.futures.Future``."""
+    # Start from empty context variables: the caller's (e.g. asgiref's executor
+    # for the request that queued the job) must not leak into a job that outlives it
+    return contextvars.Context().run(asyncio.run_coroutine_threadsafe, run_job(job_id), get_loop())
+
+
+def shutdown(timeout=None):
+    """Stop the background loop after closing its HTTP client (used by tests and benchmarks)."""
+    global _loop, _loop_thread, _job_slots
+    with _loop_lock:
+        loop, thread = _loop, _loop_thread
+        _loop = _loop_thread = _job_slots = None
+    if loop is None:
+        return
+    asyncio.run_coroutine_threadsafe(providers.close_client(), loop).result(timeout)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout)
+    loop.close()
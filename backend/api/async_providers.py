@@ -0,0 +1,298 @@
+"""
+Async clients for the pipeline's HTTP providers.
+
+AssemblyAI, Gemini, Cloudinary and Google userinfo are called through their
+REST APIs with one pooled, keep-alive ``httpx.AsyncClient`` per event loop, so
+a waiting call holds a socket rather than a thread. yt-dlp has no async API; it
+runs on a bounded thread pool via ``run_blocking`` (``YTDLP_WORKERS`` threads)
+so hundreds of jobs can't start hundreds of extractions at once.
+
+Every request goes through ``resilience.acall`` with the provider's timeout,
+so rate limits and transient failures are retried and a provider that keeps
+failing is cut off by its circuit breaker.
+"""
+import asyncio
+import json
+import os
+import secrets
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary
+import cloudinary.utils
+from django.conf import settings
+
+from .metrics import observe_stage
+from .resilience import acall, provider_timeout
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+ASSEMBLYAI_BASE_URL = 'https://api.assemblyai.com/v2'
+ASSEMBLYAI_POLL_INTERVAL = 3.0
+GEMINI_BASE_URL = 'https://generativelanguage.googleapis.com/v1beta'
+GOOGLE_USERINFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+_clients = weakref.WeakKeyDictionary()
+_blocking_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_client():
+    """Return the pooled HTTP client for the running event loop."""
+    if httpx is None:
+        raise RuntimeError("httpx is required for the async pipeline (pip install httpx)")
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.ASYNC_HTTP_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_client():
+    """Close the running loop's client (e.g. on shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_blocking_executor():
+    """Return the thread pool for blocking provider calls (yt-dlp)."""
+    global _blocking_executor
+    with _executor_lock:
+        if _blocking_executor is None:
+            _blocking_executor = ThreadPoolExecutor(max_workers=settings.YTDLP_WORKERS, thread_name_prefix='ytdlp')
+        return _blocking_executor
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking call on the yt-dlp pool without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(get_blocking_executor(), fn, *args)
+
+
+async def _request(provider, method, url, **kwargs):
+    """Send one request to ``provider`` with retries, raising for HTTP errors."""
+    async def send():
+        response = await get_client().request(method, url, timeout=provider_timeout(provider), **kwargs)
+        response.raise_for_status()
+        return response
+    return await acall(provider, send)
+
+
+async def _read_file(file_path):
+    """Stream a local file in chunks, reading on the default executor."""
+    loop = asyncio.get_running_loop()
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _multipart_parts(boundary, fields, file_field, filename):
+    """The bytes before and after the file in a multipart/form-data body."""
+    head = b''.join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    head += (f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+             f'Content-Type: application/octet-stream\r\n\r\n').encode()
+    return head, f'\r\n--{boundary}--\r\n'.encode()
+
+
+async def _multipart_body(head, file_path, tail):
+    """Stream a multipart/form-data body whose one file part is read with ``_read_file``."""
+    yield head
+    async for chunk in _read_file(file_path):
+        yield chunk
+    yield tail
+
+
+# AssemblyAI
+
+def _assemblyai_headers():
+    return {'authorization': os.getenv("ASSEMBLYAI_API_KEY") or ''}
+
+
+async def _wait_for_transcript(headers, transcript_id):
+    """Poll a transcript until it completes or fails and return its JSON."""
+    while True:
+        response = await _request('assemblyai', 'GET', f"{ASSEMBLYAI_BASE_URL}/transcript/{transcript_id}", headers=headers)
+        transcript = response.json()
+        if transcript['status'] in ('completed', 'error'):
+            return transcript
+        await asyncio.sleep(ASSEMBLYAI_POLL_INTERVAL)
+
+
+async def transcribe_audio(audio_source, transcript_id=None, on_submitted=None):
+    """Transcribe a public URL or local file with AssemblyAI and return the text.
+
+    Pass the ``transcript_id`` of an earlier submission to wait for it instead
+    of submitting again; ``on_submitted`` is awaited with the id of a new one.
+    """
+    with observe_stage('transcription'):
+        headers = _assemblyai_headers()
+        if transcript_id:
+            transcript = await _wait_for_transcript(headers, transcript_id)
+            if transcript['status'] == 'completed':
+                return transcript.get('text') or ''
+            print(f"Transcript {transcript_id} failed, submitting the audio again")
+
+        transcript = await _transcribe(headers, audio_source, on_submitted)
+        return transcript.get('text') or ''
+
+
+async def transcribe_words(file_path):
+    """Transcribe a local file with AssemblyAI and return its words, timed in seconds."""
+    from .segmented import Word
+
+    transcript = await _transcribe(_assemblyai_headers(), file_path)
+    return [Word(word['text'], word['start'] / 1000, word['end'] / 1000) for word in transcript.get('words') or []]
+
+
+async def _transcribe(headers, audio_source, on_submitted=None):
+    """Submit a public URL or local file and return the completed transcript."""
+    audio_url = audio_source
+    if not str(audio_source).startswith(('http://', 'https://')):
+        async def upload():
+            # Each attempt streams the file from the start
+            response = await get_client().post(
+                f"{ASSEMBLYAI_BASE_URL}/upload", headers=headers, content=_read_file(audio_source),
+                timeout=provider_timeout('assemblyai')
+            )
+            response.raise_for_status()
+            return response.json()['upload_url']
+        audio_url = await acall('assemblyai', upload)
+
+    response = await _request('assemblyai', 'POST', f"{ASSEMBLYAI_BASE_URL}/transcript", headers=headers,
+                              json={'audio_url': audio_url})
+    transcript_id = response.json()['id']
+    if on_submitted is not None:
+        await on_submitted(transcript_id)
+
+    transcript = await _wait_for_transcript(headers, transcript_id)
+    if transcript['status'] == 'error':
+        raise Exception(f"Transcription failed: {transcript.get('error')}")
+    return transcript
+
+
+# Gemini
+
+def _gemini_url(model, method):
+    from .utils import NOTES_MODEL
+
+    return f"{GEMINI_BASE_URL}/models/{model or NOTES_MODEL}:{method}"
+
+
+def _gemini_headers():
+    return {'x-goog-api-key': os.getenv("GOOGLE_GEMINI_API_KEY") or ''}
+
+
+def _gemini_text(payload):
+    candidates = payload.get('candidates') or []
+    parts = candidates[0].get('content', {}).get('parts', []) if candidates else []
+    return ''.join(part.get('text', '') for part in parts)
+
+
+async def generate_text(prompt, model=None):
+    """Send one prompt to Gemini and return the response text, raising on failure."""
+    response = await _request(
+        'gemini',
+        'POST',
+        _gemini_url(model, 'generateContent'),
+        headers=_gemini_headers(),
+        json={'contents': [{'parts': [{'text': prompt}]}]},
+    )
+    text = _gemini_text(response.json())
+    if not text:
+        raise Exception("Gemini returned an empty response")
+    return text
+
+
+async def stream_text(prompt, model=None):
+    """Stream one Gemini response, yielding text pieces as they arrive.
+
+    Only opening the stream is retried; a failure midway raises, since the
+    pieces already yielded can't be taken back.
+    """
+    client = get_client()
+
+    async def open_stream():
+        request = client.build_request(
+            'POST', _gemini_url(model, 'streamGenerateContent'), params={'alt': 'sse'},
+            headers=_gemini_headers(), json={'contents': [{'parts': [{'text': prompt}]}]},
+            timeout=provider_timeout('gemini'),
+        )
+        response = await client.send(request, stream=True)
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            response.raise_for_status()
+        return response
+
+    response = await acall('gemini', open_stream)
+    try:
+        async for line in response.aiter_lines():
+            if not line.startswith('data:'):
+                continue
+            text = _gemini_text(json.loads(line[len('data:'):]))
+            if text:
+                yield text
+    finally:
+        await response.aclose()
+
+
+# Cloudinary
+
+async def upload_audio_to_cloudinary(file_path):
+    """Upload a local audio file to Cloudinary, delete it, and return its public URL."""
+    from .utils import remove_audio_file
+
+    with observe_stage('cloudinary_upload'):
+        config = cloudinary.config()
+        params = {'timestamp': int(time.time()), 'folder': 'youtube_audio'}
+        params['signature'] = cloudinary.utils.api_sign_request(params, config.api_secret)
+        params['api_key'] = config.api_key
+
+        boundary = secrets.token_hex(16)
+        head, tail = _multipart_parts(boundary, params, 'file', os.path.basename(file_path))
+        headers = {
+            'Content-Type': f'multipart/form-data; boundary={boundary}',
+            'Content-Length': str(len(head) + os.path.getsize(file_path) + len(tail)),
+        }
+
+        async def upload():
+            # Each attempt streams the file from the start
+            response = await get_client().post(
+                cloudinary.utils.cloudinary_api_url('upload', resource_type='auto'),
+                headers=headers,
+                content=_multipart_body(head, file_path, tail),
+                timeout=provider_timeout('cloudinary'),
+            )
+            response.raise_for_status()
+            return response.json()['url']
+        url = await acall('cloudinary', upload)
+    remove_audio_file(file_path)
+    return url
+
+
+# Google
+
+async def get_google_user_info(access_token):
+    """Fetch the signed-in user's Google profile."""
+    response = await _request('google', 'GET', GOOGLE_USERINFO_URL, headers={'Authorization': f'Bearer {access_token}'})
+    return response.json()
@@ -0,0 +1,194 @@
+"""
+Async (ASGI) variants of the note generation, job status and Google login endpoints.
+
+DRF's APIView is synchronous, so these are plain Django async views that reuse
+DRF's authentication classes, request validation and serializers. Under an
+ASGI server (e.g. ``gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker``)
+a client long-polling a job with ``?wait=`` holds a coroutine instead of a
+worker thread. Pair them with ``NOTE_JOB_BACKEND = 'async'``.
+"""
+import asyncio
+import json
+import time
+
+from allauth.socialaccount.models import SocialApp
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.urls import reverse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import async_providers as providers
+from .cache import get_cached_result
+from .jobs import enqueue_job, create_note_from_result
+from .models import NoteJob
+from .renderers import FastJSONRenderer
+from .serializers import VideoNotesSerializer, NoteJobSerializer
+from .social_auth import exchange_google_code, login_google_user
+from .views import parse_generate_request
+
+# Upper bound for ?wait= on the job status endpoint, in seconds
+MAX_JOB_WAIT = 30
+JOB_WAIT_POLL_INTERVAL = 0.5
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status_code,
+        content_type='application/json',
+        headers=headers
+    )
+
+
+@sync_to_async
+def authenticate(request):
+    """Run DRF's configured authenticators; returns the user or AnonymousUser."""
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    return drf_request.user
+
+
+class AsyncAPIView(View):
+    """Async view that requires an authenticated user, like ``IsAuthenticated`` on an APIView."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token auth, as with APIView (SessionAuthentication still enforces CSRF itself)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+        except exceptions.APIException as e:
+            # Same body as DRF's exception handler
+            data = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return json_response(data, e.status_code)
+        if not user or not user.is_authenticated:
+            return json_response({'detail': 'Authentication credentials were not provided.'},
+                                 status.HTTP_401_UNAUTHORIZED)
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+@sync_to_async
+def _note_from_cache(user, link):
+    cached = get_cached_result(link)
+    if cached is None:
+        return None
+    print("Serving notes from the result cache")
+    return VideoNotesSerializer(create_note_from_result(user, link, cached)).data
+
+
+@sync_to_async
+def _queue_job(user, link):
+    job = NoteJob.objects.create(user=user, youtube_link=link)
+    enqueue_job(job)
+    print(f"Queued note job {job.pk}")
+    return job
+
+
+class AsyncGenerateNotesView(AsyncAPIView):
+    """``POST /api/notes/async/generate/``: same contract as GenerateNotesView."""
+
+    async def post(self, request):
+        yt_link, error_response = parse_generate_request(request)
+        if error_response is not None:
+            return json_response(error_response.data, error_response.status_code)
+
+        try:
+            data = await _note_from_cache(request.user, yt_link)
+            if data is not None:
+                return json_response(data, status.HTTP_201_CREATED)
+
+            job = await _queue_job(request.user, yt_link)
+        except Exception as e:
+            print(f"Unexpected error: {str(e)}")
+            return json_response({'error': 'Server error', 'detail': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return json_response(
+            NoteJobSerializer(job).data,
+            status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('async_note_job_detail', args=[job.pk])}
+        )
+
+
+class AsyncNoteJobDetailView(AsyncAPIView):
+    """``GET /api/notes/async/jobs/<id>/``.
+
+    With ``?wait=<seconds>`` (up to ``MAX_JOB_WAIT``) the response is held until
+    the job's status or stage changes, so clients can long-poll instead of
+    polling on a timer.
+    """
+
+    async def get(self, request, pk):
+        try:
+            wait = min(max(float(request.GET.get('wait', 0)), 0), MAX_JOB_WAIT)
+        except ValueError:
+            wait = 0
+        jobs = NoteJob.objects.filter(user=request.user, pk=pk)
+
+        job = await jobs.afirst()
+        if job is None:
+            return json_response({'detail': 'No NoteJob matches the given query.'}, status.HTTP_404_NOT_FOUND)
+
+        deadline = time.monotonic() + wait
+        seen = (job.status, job.stage)
+        while job.status in (NoteJob.STATUS_HELD, NoteJob.STATUS_PENDING, NoteJob.STATUS_RUNNING) and time.monotonic() < deadline:
+            await asyncio.sleep(JOB_WAIT_POLL_INTERVAL)
+            job = await jobs.afirst()
+            if job is None:
+                return json_response({'detail': 'No NoteJob matches the given query.'}, status.HTTP_404_NOT_FOUND)
+            if (job.status, job.stage) != seen:
+                break
+        return json_response(NoteJobSerializer(job).data)
+
+
+class AsyncGoogleLoginView(View):
+    """``POST /api/auth/async/google/``: same contract as GoogleLoginView.
+
+    The token exchange goes through allauth's (blocking) OAuth client on a
+    worker thread; the userinfo lookup uses the pooled async client.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request):
+        try:
+            code = json.loads(request.body or b'{}').get('code')
+        except (ValueError, AttributeError):
+            code = request.POST.get('code')
+        if not code:
+            return json_response({'error': 'Authorization code is required'}, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            access_token = await sync_to_async(exchange_google_code)(request, code)
+        except SocialApp.DoesNotExist:
+            return json_response({'error': 'Google OAuth configuration not found'}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except Exception as e:
+            return json_response({
+                'error': 'Failed to exchange authorization code for token',
+                'details': str(e),
+                'exception_type': str(type(e).__name__)
+            }, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user_info = await providers.get_google_user_info(access_token)
+        except Exception as e:
+            return json_response({
+                'error': 'Failed to get user info from Google',
+                'details': str(e),
+                'exception_type': str(type(e).__name__)
+            }, status.HTTP_400_BAD_REQUEST)
+        email = user_info.get('email')
+        if not email:
+            return json_response({'error': 'Email not provided by Google'}, status.HTTP_400_BAD_REQUEST)
+
+        return json_response(await sync_to_async(login_google_user)(email))
@@ -0,0 +1,248 @@
+"""
+Batch submission of many YouTube links at once.
+
+``create_batch`` validates and normalizes every link in one pass, then
+resolves each distinct video in order of cost:
+
+* ``existing`` - the user already has notes for the video; nothing is created
+* ``cached``   - another user processed it; a note is created from the result cache
+* ``queued``   - a ``NoteJob`` is created for it
+
+Only ``NOTE_BATCH_CONCURRENCY`` of a batch's jobs are pending at a time; the
+rest are ``held`` and released one by one as earlier jobs finish (see
+``jobs.start_next_batch_job``), so a large batch can't fill every worker.
+Links that aren't YouTube videos are reported as ``invalid``, repeats of a
+video earlier in the batch as ``duplicate`` and playlist entries longer than
+``MAX_VIDEO_DURATION`` as ``skipped``.
+
+``create_collection`` expands a playlist or channel into such a batch, and
+``resume_batch`` retries whatever failed (or was interrupted) without
+touching the videos that already have notes.
+"""
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import get_cached_result
+from .jobs import enqueue_job, create_note_from_result, retry_job
+from .metadata import parse_collection_url, expand_collection
+from .models import NoteBatch, NoteJob, VideoNotes
+from .scheduler import record_duration
+from .utils import parse_video_id
+
+ITEM_QUEUED = 'queued'
+ITEM_EXISTING = 'existing'
+ITEM_CACHED = 'cached'
+ITEM_DUPLICATE = 'duplicate'
+ITEM_INVALID = 'invalid'
+ITEM_SKIPPED = 'skipped'
+
+ACTIVE_JOB_STATUSES = (NoteJob.STATUS_PENDING, NoteJob.STATUS_RUNNING)
+
+
+def canonical_link(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def normalize_links(links):
+    """Return one item per submitted link with its canonical form and video id, or why it was rejected."""
+    items = []
+    seen = set()
+    for raw in links:
+        link = unquote(str(raw)).strip()
+        video_id = parse_video_id(link)
+        if not video_id:
+            items.append({'link': link, 'status': ITEM_INVALID, 'error': 'Not a YouTube video link'})
+        elif video_id in seen:
+            items.append({'link': canonical_link(video_id), 'video_id': video_id, 'status': ITEM_DUPLICATE})
+        else:
+            seen.add(video_id)
+            items.append({'link': canonical_link(video_id), 'video_id': video_id, 'status': ITEM_QUEUED})
+    return items
+
+
+def _queue_items(user, batch, items, slots):
+    """Create a job per item: the first ``slots`` pending, the rest held. Call inside a transaction."""
+    jobs = NoteJob.objects.bulk_create([
+        NoteJob(
+            user=user,
+            youtube_link=item['link'],
+            batch=batch,
+            status=NoteJob.STATUS_PENDING if index < slots else NoteJob.STATUS_HELD
+        )
+        for index, item in enumerate(items)
+    ])
+    for item, job in zip(items, jobs):
+        item['job'] = job.pk
+        if job.status == NoteJob.STATUS_PENDING:
+            enqueue_job(job)
+    return jobs
+
+
+def create_batch(user, links, source_url='', title='', details=None):
+    """Resolve and schedule ``links`` for ``user``; returns the saved NoteBatch.
+
+    ``details`` optionally maps video ids to the ``title`` and ``duration``
+    already known from a playlist listing.
+    """
+    items = normalize_links(links)
+    details = details or {}
+    for item in items:
+        detail = details.get(item.get('video_id'))
+        if detail is None:
+            continue
+        item['title'] = detail['title']
+        record_duration(item['video_id'], detail['duration'])
+        if item['status'] == ITEM_QUEUED and detail['duration'] > settings.MAX_VIDEO_DURATION:
+            item['status'] = ITEM_SKIPPED
+            item['error'] = 'Video too long'
+    pending = [item for item in items if item['status'] == ITEM_QUEUED]
+
+    # One query for every video the user already has notes for (newest note wins)
+    existing = dict(VideoNotes.objects
+                    .filter(user=user, video_id__in=[item['video_id'] for item in pending])
+                    .order_by('created_at', 'id')
+                    .values_list('video_id', 'id'))
+    to_queue = []
+    for item in pending:
+        if item['video_id'] in existing:
+            item['status'] = ITEM_EXISTING
+            item['note'] = existing[item['video_id']]
+            continue
+        cached = get_cached_result(item['link'])
+        if cached is not None:
+            item['status'] = ITEM_CACHED
+            item['note'] = create_note_from_result(user, item['link'], cached).pk
+            continue
+        to_queue.append(item)
+
+    with transaction.atomic():
+        batch = NoteBatch.objects.create(user=user, source_url=source_url, title=title)
+        _queue_items(user, batch, to_queue, settings.NOTE_BATCH_CONCURRENCY)
+        batch.items = items
+        batch.save(update_fields=['items'])
+
+    print(f"Batch {batch.pk}: {len(items)} links, {len(to_queue)} queued")
+    return batch
+
+
+def create_collection(user, link):
+    """Expand a playlist or channel link into its videos and submit them as one batch.
+
+    Raises ValueError if the link isn't a playlist or channel or lists no videos.
+    """
+    url = parse_collection_url(link)
+    if url is None:
+        raise ValueError("The URL must be a YouTube playlist or channel link")
+    collection = expand_collection(url, settings.NOTE_COLLECTION_MAX_VIDEOS)
+    print(f"Expanded {url}: {len(collection.entries)} videos")
+    if not collection.entries:
+        raise ValueError("The playlist or channel has no available videos")
+    return create_batch(
+        user,
+        [canonical_link(entry['video_id']) for entry in collection.entries],
+        source_url=collection.webpage_url[:500],
+        title=collection.title[:255],
+        details={entry['video_id']: entry for entry in collection.entries}
+    )
+
+
+def resume_batch(batch):
+    """Retry a batch's failed items and restart work a restart left behind.
+
+    Failed jobs go back in the queue with their checkpoints (see
+    ``jobs.retry_job``) and items whose job was deleted get a new one; jobs
+    still pending are queued again (``claim_job`` makes a duplicate harmless)
+    and held jobs are released into any free slots. Items with notes are left
+    alone. Returns the updated batch.
+    """
+    with transaction.atomic():
+        batch = NoteBatch.objects.select_for_update().get(pk=batch.pk)
+        jobs = {job.pk: job for job in batch.jobs.all()}
+        missing = []
+        retried = 0
+        for item in batch.items:
+            if item['status'] != ITEM_QUEUED:
+                continue
+            job = jobs.get(item.get('job'))
+            if job is None:
+                item['attempts'] = item.get('attempts', 1) + 1
+                missing.append(item)
+            elif job.status == NoteJob.STATUS_FAILED and retry_job(job, NoteJob.STATUS_HELD):
+                item['attempts'] = item.get('attempts', 1) + 1
+                job.status = NoteJob.STATUS_HELD
+                retried += 1
+
+        active = [job for job in jobs.values() if job.status in ACTIVE_JOB_STATUSES]
+        for job in active:
+            if job.status == NoteJob.STATUS_PENDING:
+                enqueue_job(job)
+
+        # Held jobs go first in submission order (retried ones among them), then the new jobs
+        free = max(settings.NOTE_BATCH_CONCURRENCY - len(active), 0)
+        held = sorted(job.pk for job in jobs.values() if job.status == NoteJob.STATUS_HELD)
+        for job_id in held[:free]:
+            NoteJob.objects.filter(pk=job_id, status=NoteJob.STATUS_HELD).update(
+                status=NoteJob.STATUS_PENDING, updated_at=timezone.now()
+            )
+            enqueue_job(jobs[job_id])
+        _queue_items(batch.user, batch, missing, free - len(held[:free]))
+        batch.save(update_fields=['items'])
+
+    print(f"Batch {batch.pk}: resumed, {retried + len(missing)} items retried")
+    return batch
+
+
+def describe_batch(batch):
+    """API representation of a batch with each item's live job state and aggregate progress."""
+    jobs = {
+        job['id']: job
+        for job in batch.jobs.values('id', 'status', 'stage', 'note_id', 'error', 'detail')
+    }
+    counts = {'total': 0, 'completed': 0, 'failed': 0, 'in_progress': 0}
+    items = []
+    for item in batch.items:
+        item = dict(item)
+        if item['status'] in (ITEM_EXISTING, ITEM_CACHED):
+            counts['completed'] += 1
+        elif item['status'] == ITEM_QUEUED:
+            job = jobs.get(item.get('job'))
+            if job is None:
+                # The job row was deleted
+                item['job_status'] = NoteJob.STATUS_FAILED
+                counts['failed'] += 1
+            else:
+                item['job_status'] = job['status']
+                item['stage'] = job['stage']
+                item['note'] = job['note_id']
+                if job['status'] == NoteJob.STATUS_COMPLETED:
+                    counts['completed'] += 1
+                elif job['status'] == NoteJob.STATUS_FAILED:
+                    item['error'] = job['error']
+                    item['detail'] = job['detail']
+                    counts['failed'] += 1
+                else:
+                    counts['in_progress'] += 1
+        else:
+            items.append(item)
+            continue
+        counts['total'] += 1
+        items.append(item)
+
+    finished = counts['completed'] + counts['failed']
+    return {
+        'id': batch.pk,
+        'title': batch.title,
+        'source_url': batch.source_url,
+        'status': 'running' if counts['in_progress'] else 'completed',
+        'progress': dict(counts, percent=round(100 * finished / counts['total']) if counts['total'] else 100),
+        'items': items,
+        'created_at': batch.created_at,
+    }
+
+
+def batch_note_ids(batch):
+    """Ids of the batch's notes so far, in submission (playlist) order."""
+    return [item['note'] for item in describe_batch(batch)['items'] if item.get('note')]
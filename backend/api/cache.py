@@ -0,0 +1,109 @@
+"""
+Cross-user cache of pipeline results.
+
+Results are keyed by the canonical YouTube video id plus ``pipeline_version()``
+so a prompt or model change never serves stale notes. Entries expire after
+``RESULT_CACHE_TTL`` seconds and the least recently hit entries are evicted once
+there are more than ``RESULT_CACHE_MAX_ENTRIES``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import RESULT_CACHE_EVENTS
+from .models import CachedResult
+from .utils import parse_video_id, pipeline_version, TRANSCRIPT_SOURCE_CAPTIONS
+
+CACHE_EVENTS = ('hits', 'misses', 'stores', 'evictions')
+
+
+def _count(name, amount=1):
+    RESULT_CACHE_EVENTS.inc(amount, event=name)
+
+
+def cache_stats():
+    """Return hit/miss counters for this process along with the hit rate."""
+    stats = {event: RESULT_CACHE_EVENTS.value(event=event) for event in CACHE_EVENTS}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def get_cached_result(link):
+    """Return the cached pipeline result for a link in ``run_pipeline`` format, or None."""
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    video_id = parse_video_id(link)
+    if not video_id:
+        return None
+
+    entry = CachedResult.objects.filter(video_id=video_id, version=pipeline_version()).first()
+    if entry is None:
+        _count('misses')
+        return None
+    if entry.created_at < timezone.now() - timedelta(seconds=settings.RESULT_CACHE_TTL):
+        entry.delete()
+        _count('evictions')
+        _count('misses')
+        return None
+
+    if settings.CAPTIONS_MODE == 'forbid' and entry.transcript_source == TRANSCRIPT_SOURCE_CAPTIONS:
+        # Caption-based results don't count when captions are forbidden
+        _count('misses')
+        return None
+
+    CachedResult.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_hit_at=timezone.now())
+    _count('hits')
+    return {
+        'title': entry.youtube_title,
+        'audio_url': entry.audio_url or '',
+        'transcription': entry.transcription,
+        'transcript_source': entry.transcript_source,
+        'transcript_offsets': entry.transcript_offsets,
+        'notes': entry.notes_content,
+    }
+
+
+def store_result(link, result):
+    """Save a successful pipeline result so later submissions of the video can reuse it."""
+    if not settings.RESULT_CACHE_ENABLED:
+        return
+    video_id = parse_video_id(link)
+    if not video_id:
+        return
+    try:
+        CachedResult.objects.update_or_create(
+            video_id=video_id,
+            version=pipeline_version(),
+            defaults={
+                'youtube_title': result['title'],
+                'audio_url': result['audio_url'],
+                'transcription': result['transcription'],
+                'transcript_source': result.get('transcript_source', ''),
+                'transcript_offsets': result.get('transcript_offsets'),
+                'notes_content': result['notes'],
+            }
+        )
+    except IntegrityError:
+        # Another worker stored the same video at the same moment; its copy is just as good.
+        return
+    _count('stores')
+    evict_entries()
+
+
+def evict_entries():
+    """Drop expired entries and trim the cache to RESULT_CACHE_MAX_ENTRIES by least recent hit."""
+    cutoff = timezone.now() - timedelta(seconds=settings.RESULT_CACHE_TTL)
+    expired, _ = CachedResult.objects.filter(created_at__lt=cutoff).delete()
+
+    overflow = CachedResult.objects.count() - settings.RESULT_CACHE_MAX_ENTRIES
+    trimmed = 0
+    if overflow > 0:
+        stale_ids = list(CachedResult.objects.order_by('last_hit_at').values_list('pk', flat=True)[:overflow])
+        trimmed, _ = CachedResult.objects.filter(pk__in=stale_ids).delete()
+
+    if expired or trimmed:
+        _count('evictions', expired + trimmed)
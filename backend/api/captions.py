@@ -0,0 +1,153 @@
+"""
+Transcripts from YouTube captions.
+
+Most educational videos already carry manual or auto-generated captions. When
+a usable track exists we fetch it through yt-dlp and skip the audio download
+and AssemblyAI entirely; otherwise the caller falls back to speech recognition.
+"""
+import html
+import json
+import re
+from dataclasses import dataclass
+
+import yt_dlp
+from django.conf import settings
+
+from .metadata import youtube_dl_options
+from .resilience import call
+
+# Preferred caption formats, best first
+CAPTION_FORMATS = ['json3', 'vtt']
+
+# Below this many words a track is treated as unusable (e.g. "[Music]" only)
+MIN_CAPTION_WORDS = 20
+
+VTT_TIMING_RE = re.compile(r'(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})')
+VTT_TAG_RE = re.compile(r'<[^>]+>')
+
+
+@dataclass
+class TranscriptSegment:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class CaptionTranscript:
+    language: str
+    automatic: bool
+    segments: list
+
+    @property
+    def text(self):
+        return segments_to_text(self.segments)
+
+
+def segments_to_text(segments):
+    """Join caption segments into plain transcript text."""
+    return ' '.join(segment.text for segment in segments if segment.text).strip()
+
+
+def _vtt_seconds(hours, minutes, seconds, millis):
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+
+def parse_json3(data):
+    """Parse a YouTube json3 caption document into segments."""
+    document = json.loads(data) if isinstance(data, (str, bytes)) else data
+    segments = []
+    for event in document.get('events', []):
+        segs = event.get('segs')
+        if not segs:
+            continue
+        text = ''.join(seg.get('utf8', '') for seg in segs).replace('\n', ' ').strip()
+        if not text:
+            continue
+        start = event.get('tStartMs', 0) / 1000
+        end = start + event.get('dDurationMs', 0) / 1000
+        segments.append(TranscriptSegment(start, end, html.unescape(text)))
+    return segments
+
+
+def parse_vtt(data):
+    """Parse a WebVTT caption document into segments.
+
+    Auto-generated YouTube tracks repeat the previous line in every cue to
+    produce a rolling display, so consecutive duplicate lines are dropped.
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', errors='replace')
+    segments = []
+    last_line = None
+    for block in re.split(r'\r?\n\r?\n', data):
+        lines = block.strip().splitlines()
+        timing_index = next((i for i, line in enumerate(lines) if '-->' in line), None)
+        if timing_index is None:
+            continue
+        match = VTT_TIMING_RE.search(lines[timing_index])
+        if not match:
+            continue
+        start = _vtt_seconds(*match.groups()[:4])
+        end = _vtt_seconds(*match.groups()[4:])
+        new_lines = []
+        for line in lines[timing_index + 1:]:
+            line = html.unescape(VTT_TAG_RE.sub('', line)).strip()
+            if line and line != last_line:
+                new_lines.append(line)
+                last_line = line
+        if new_lines:
+            segments.append(TranscriptSegment(start, end, ' '.join(new_lines)))
+    return segments
+
+
+def _language_matches(language, preferred):
+    return language == preferred or language.split('-')[0] == preferred
+
+
+def select_caption_track(info, languages=None):
+    """Pick the best caption track for a VideoInfo.
+
+    Manual subtitles in a preferred language win over automatic captions.
+    Returns ``(language, automatic, track)`` where ``track`` is the yt-dlp
+    format entry (``ext`` and ``url``), or None when nothing suitable exists.
+    """
+    languages = languages or settings.CAPTION_LANGUAGES
+    for automatic, tracks in ((False, info.subtitles), (True, info.automatic_captions)):
+        for preferred in languages:
+            # For automatic captions, "<lang>-orig" is the untranslated ASR track
+            candidates = sorted(
+                (lang for lang in tracks if _language_matches(lang, preferred) or lang == f"{preferred}-orig"),
+                key=lambda lang: (not lang.endswith('-orig'), lang != preferred)
+            )
+            for language in candidates:
+                for caption_format in CAPTION_FORMATS:
+                    for track in tracks[language]:
+                        if track.get('ext') == caption_format and track.get('url'):
+                            return language, automatic, track
+    return None
+
+
+def fetch_caption_transcript(info, languages=None):
+    """Download and parse the best caption track, or return None if there is no usable one."""
+    selected = select_caption_track(info, languages)
+    if selected is None:
+        print("No caption track available")
+        return None
+    language, automatic, track = selected
+    print(f"Fetching {'automatic' if automatic else 'manual'} {language} captions ({track['ext']})")
+
+    try:
+        with yt_dlp.YoutubeDL(youtube_dl_options()) as ydl:
+            data = call('youtube', lambda: ydl.urlopen(track['url']).read())
+        parser = parse_json3 if track['ext'] == 'json3' else parse_vtt
+        segments = parser(data)
+    except Exception as e:
+        print(f"Error fetching captions: {str(e)}")
+        return None
+
+    transcript = CaptionTranscript(language=language, automatic=automatic, segments=segments)
+    if len(transcript.text.split()) < MIN_CAPTION_WORDS:
+        print("Caption track is too short to be useful")
+        return None
+    return transcript
@@ -0,0 +1,106 @@
+"""
+Per-stage checkpoints for resumable pipeline runs.
+
+Each stage of the pipeline records its output as soon as it has it:
+
+* ``metadata``   - ``{'title', 'duration'}``
+* ``audio``      - ``{'audio_url'}`` (Cloudinary) or ``{'audio_path'}`` (local file),
+  with the ``offsets`` map if silence was cut (see vad.py)
+* ``asr``        - ``{'transcript_id'}`` once AssemblyAI has accepted the audio
+* ``transcript`` - ``{'text', 'source', 'segments'}``
+* ``chunks``     - ``{prompt key: text}`` for each chunk summary and pre-merge
+  of a long transcript (see notes_engine.py)
+* ``notes``      - ``{'notes', 'version'}``
+
+A job's checkpoints are stored on ``NoteJob.checkpoint``, so retrying a failed
+job (``POST /api/notes/jobs/<id>/retry/``) starts at the first stage without
+one: a Gemini failure after a long transcription reruns only the generation
+(and only its chunks that had not finished), and a failure while waiting on
+AssemblyAI polls the same transcript again instead of re-downloading and
+re-submitting the audio. Local audio files and
+notes made with another prompt version are not reused.
+"""
+import os
+import threading
+from dataclasses import asdict
+
+from django.utils import timezone
+
+from .captions import TranscriptSegment
+from .models import NoteJob
+
+
+class Checkpoint:
+    """Stage outputs of one pipeline run, kept in memory."""
+
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        # Chunk summaries finish on several threads at once; persist() runs under the lock
+        # so an older snapshot never overwrites a newer one
+        self._lock = threading.Lock()
+
+    def get(self, stage):
+        return self.data.get(stage)
+
+    def save(self, stage, **values):
+        with self._lock:
+            self.data[stage] = values
+            self.persist()
+
+    def persist(self):
+        pass
+
+    @property
+    def stages(self):
+        return list(self.data)
+
+    # Helpers for the stages whose values need converting or checking
+
+    def audio_source(self):
+        """The checkpointed audio URL or still-existing local file, or None."""
+        audio = self.get('audio') or {}
+        if audio.get('audio_url'):
+            return audio['audio_url']
+        if audio.get('audio_path') and os.path.exists(audio['audio_path']):
+            return audio['audio_path']
+        return None
+
+    def save_transcript(self, text, source, segments=None):
+        self.save('transcript', text=text, source=source,
+                  segments=[asdict(segment) for segment in segments] if segments is not None else None)
+
+    def transcript(self):
+        """``(text, source, segments)`` from the checkpoint, or None."""
+        transcript = self.get('transcript')
+        if transcript is None:
+            return None
+        segments = transcript.get('segments')
+        if segments is not None:
+            segments = [TranscriptSegment(**segment) for segment in segments]
+        return transcript['text'], transcript['source'], segments
+
+    def chunk_result(self, key):
+        return (self.get('chunks') or {}).get(key)
+
+    def save_chunk_result(self, key, text):
+        with self._lock:
+            self.data.setdefault('chunks', {})[key] = text
+            self.persist()
+
+    def notes(self, version):
+        """Checkpointed notes if they were made by the current pipeline version."""
+        notes = self.get('notes')
+        if notes is None or notes.get('version') != version:
+            return None
+        return notes['notes']
+
+
+class JobCheckpoint(Checkpoint):
+    """Checkpoints written through to ``NoteJob.checkpoint`` as each stage finishes."""
+
+    def __init__(self, job):
+        super().__init__(job.checkpoint)
+        self.job_id = job.pk
+
+    def persist(self):
+        NoteJob.objects.filter(pk=self.job_id).update(checkpoint=self.data, updated_at=timezone.now())
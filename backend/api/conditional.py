@@ -0,0 +1,78 @@
+"""
+Conditional GET (ETag / Last-Modified) for the notes endpoints.
+
+Validators are computed from small indexed reads (a note's ``updated_at`` or
+the user's ``NoteCollectionVersion``) before the view loads or serializes
+anything, so an unchanged resource costs one tiny query and a 304.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import VideoNotes, NoteCollectionVersion
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value else None
+
+
+class ConditionalGetMixin:
+    """Answer GET with 304 Not Modified when the client's copy is current.
+
+    Subclasses implement ``get_validators(request, *args, **kwargs)`` returning
+    ``(etag, last_modified)``; ``etag`` may be None to skip the check.
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def _etag_for(self, request, key):
+        # The same resource renders differently per format (JSON vs browsable API)
+        variant = f"{key}|{request.accepted_renderer.format}"
+        return '"%s"' % hashlib.sha1(variant.encode('utf-8')).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        if etag is not None:
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=_timestamp(last_modified)
+            )
+            if not_modified is not None:
+                return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(_timestamp(last_modified))
+            # Let browsers keep a copy but revalidate it on every use
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class NoteConditionalMixin(ConditionalGetMixin):
+    """Validators for one note, from its id and ``updated_at`` only (plus ``?fields=``)."""
+
+    def get_validators(self, request, *args, **kwargs):
+        updated_at = (VideoNotes.objects
+                      .filter(user=request.user, pk=kwargs.get('pk'))
+                      .values_list('updated_at', flat=True)
+                      .first())
+        if updated_at is None:
+            return None, None
+        key = f"note:{kwargs.get('pk')}:{updated_at.isoformat()}:{request.GET.urlencode()}"
+        return self._etag_for(request, key), updated_at
+
+
+class NoteListConditionalMixin(ConditionalGetMixin):
+    """Validators for a page of the notes list, from the user's collection version and the query string."""
+
+    def get_validators(self, request, *args, **kwargs):
+        row = (NoteCollectionVersion.objects
+               .filter(user=request.user)
+               .values_list('version', 'updated_at')
+               .first())
+        version, updated_at = row or (0, None)
+        query = request.GET.urlencode()
+        return self._etag_for(request, f"notes:{request.user.pk}:{version}:{query}"), updated_at
@@ -0,0 +1,139 @@
+"""
+Compressed storage for large text columns.
+
+``CompressedTextField`` behaves like a ``TextField`` in Python but is stored as
+binary: a one-byte codec tag followed by the payload.
+
+* ``0x00`` - UTF-8 text, stored as-is (short values that don't compress)
+* ``0x01`` - raw DEFLATE using ``ZDICT_V1`` as a preset dictionary
+
+Values loaded from the database stay compressed until the attribute is first
+read, so instances that never touch the body (or are saved again untouched)
+don't pay for decompression. ``values()``/``values_list()`` return the stored
+``CompressedValue``; call ``decompress_text()`` on it (or ``str()``).
+
+Only ``exact`` and ``isnull`` lookups are meaningful on these columns; use the
+full-text index in search.py to query the contents.
+"""
+import zlib
+
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+CODEC_PLAIN = 0x00
+CODEC_ZLIB_V1 = 0x01
+
+# Values shorter than this are stored uncompressed
+MIN_COMPRESS_BYTES = 128
+
+# Hand-written preset dictionary of strings common in transcripts and generated markdown notes.
+# zlib favours matches near the end of the dictionary, so the most frequent strings come last.
+# Changing this breaks existing rows: add a new codec tag with a new dictionary instead, such as
+# one trained on a deployment's own notes with ``manage.py train_zdict``.
+ZDICT_V1 = (
+    "Introduction Conclusion Summary Overview Key Concepts Definitions Examples Important "
+    "information understand understanding important example because different between "
+    "through without another something everything actually basically probably really "
+    "question answer problem solution process function value system number people world "
+    "first second third finally however therefore which would could should there their "
+    "about these those where when what this that with from have will your they them been "
+    "just like know going think right okay so um uh you know I mean kind of sort of "
+    "let's talk about in this video we're going to and then so if you look at the "
+    "## Key Concepts\n\n### Definition\n\n- **Example**: \n* **Note**: \n1. **Step**: "
+    "\n\n## \n\n### \n- **\n  - \n- The \n- It is \n- This is \n- They \n"
+    " of the  in the  to the  and the  on the  for the  is a  it is  that is  and  the "
+).encode('utf-8')
+
+
+def compress_text(text):
+    """Encode text for storage."""
+    data = text.encode('utf-8')
+    if len(data) >= MIN_COMPRESS_BYTES:
+        compressor = zlib.compressobj(level=6, wbits=-15, zdict=ZDICT_V1)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return bytes([CODEC_ZLIB_V1]) + compressed
+    return bytes([CODEC_PLAIN]) + data
+
+
+def decompress_text(data):
+    """Decode a stored value back to text."""
+    data = bytes(data)
+    if not data:
+        return ''
+    codec, payload = data[0], data[1:]
+    if codec == CODEC_PLAIN:
+        return payload.decode('utf-8')
+    if codec == CODEC_ZLIB_V1:
+        decompressor = zlib.decompressobj(wbits=-15, zdict=ZDICT_V1)
+        return (decompressor.decompress(payload) + decompressor.flush()).decode('utf-8')
+    raise ValueError(f"Unknown compressed text codec {codec}")
+
+
+class CompressedValue(bytes):
+    """A value as stored in the database, not yet decompressed."""
+
+    def decompress_text(self):
+        return decompress_text(self)
+
+    def __str__(self):
+        return decompress_text(self)
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Decompresses the stored value on first access and caches the text on the instance."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, CompressedValue):
+            value = decompress_text(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # Defining __set__ makes this a data descriptor, so __get__ runs even once the value is in __dict__
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """A TextField stored compressed in a binary column."""
+    descriptor_class = CompressedTextDescriptor
+
+    def get_internal_type(self):
+        # Use the backend's binary column type (bytea, BLOB, longblob...)
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return CompressedValue(value)
+
+    def to_python(self, value):
+        if isinstance(value, CompressedValue):
+            return decompress_text(value)
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        # Read the raw slot so an untouched value is written back without a decompress/compress round trip
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return getattr(model_instance, self.attname)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if isinstance(value, CompressedValue):
+            return bytes(value)
+        return compress_text(str(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is not None:
+            return connection.Database.Binary(value)
+        return value
+
+    def value_from_object(self, obj):
+        return getattr(obj, self.attname)
@@ -0,0 +1,56 @@
+"""
+In-process fan-out of job progress to the streams following a job.
+
+Workers publish a job's stage changes and, while its notes are generated,
+the pieces of text as Gemini streams them. Each notes stream (streaming.py)
+subscribes with a queue of its own. Events are best effort and per process:
+a stream also polls the job row, so it still sees every stage and the final
+note when the job runs in another process (the ``db`` backend) or joins
+another job's pipeline run.
+"""
+import queue
+import threading
+
+# Put on a subscriber's queue when the job has finished
+JOB_FINISHED = object()
+
+
+class JobEvents:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, job_id):
+        """Return a queue that receives ``(event, data)`` tuples for a job."""
+        events = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(events)
+        return events
+
+    def unsubscribe(self, job_id, events):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if events in subscribers:
+                subscribers.remove(events)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for events in subscribers:
+            events.put((event, data))
+
+    def finish(self, job_id):
+        """Wake the job's subscribers and forget them; they read the outcome from the job row."""
+        with self._lock:
+            subscribers = self._subscribers.pop(job_id, ())
+        for events in subscribers:
+            events.put(JOB_FINISHED)
+
+    def has_subscribers(self, job_id):
+        with self._lock:
+            return bool(self._subscribers.get(job_id))
+
+
+job_events = JobEvents()
@@ -0,0 +1,342 @@
+"""
+Background execution of note generation jobs.
+
+Three brokers are supported, selected with ``NOTE_JOB_BACKEND``:
+
+* ``thread`` (default): jobs are handed to an in-process worker pool as soon as
+  the request's transaction commits.
+* ``db``: the web process only inserts ``NoteJob`` rows and a separate
+  ``python manage.py process_note_jobs`` worker claims and runs them.
+* ``async``: jobs run as coroutines on an in-process event loop with pooled
+  HTTP clients (see async_pipeline.py), so hundreds can wait on providers at
+  once without a thread each.
+
+Whichever backend runs them, a process starts its jobs in the fair-share
+order of scheduler.py rather than first come, first served.
+
+In every case the job row in the database is the source of truth, so no external
+broker (Redis, RabbitMQ...) is needed. Only the ``db`` backend's queue survives a
+restart on its own: ``thread`` and ``async`` keep it in memory, so a restarted
+process re-schedules the jobs it left behind on its first request
+(``recover_jobs``).
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import NoteJob, VideoNotes, CachedResult, NoteCollectionVersion
+from .cache import get_cached_result, store_result
+from .checkpoints import JobCheckpoint
+from .job_events import job_events
+from .metrics import PIPELINES_IN_FLIGHT, JOBS_IN_FLIGHT, JOBS_FINISHED
+from .scheduler import get_scheduler, schedule_job
+from .singleflight import SingleFlight
+from .utils import (
+    run_pipeline, describe_pipeline_error, parse_video_id, pipeline_version,
+    upload_audio_to_cloudinary, remove_audio_file
+)
+
+_executor = None
+_archive_executor = None
+_executor_lock = threading.Lock()
+_recovered = False
+
+# Jobs for the same video that run concurrently in this process share one pipeline run
+pipeline_flights = SingleFlight()
+
+
+def get_executor():
+    """Return the shared worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.NOTE_JOB_WORKERS,
+                thread_name_prefix='note-job'
+            )
+        return _executor
+
+
+def get_archive_executor():
+    """Return the small pool used to archive audio to Cloudinary in the background."""
+    global _archive_executor
+    with _executor_lock:
+        if _archive_executor is None:
+            _archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audio-archive')
+        return _archive_executor
+
+
+def archive_audio(video_id, file_path):
+    """Upload a transcribed audio file to Cloudinary and attach the URL to existing rows."""
+    close_old_connections()
+    try:
+        audio_url = upload_audio_to_cloudinary(file_path)
+        CachedResult.objects.filter(video_id=video_id).update(audio_url=audio_url)
+        notes = VideoNotes.objects.filter(Q(audio_url='') | Q(audio_url__isnull=True), video_id=video_id)
+        user_ids = list(notes.order_by().values_list('user_id', flat=True).distinct())
+        # Bulk updates skip auto_now and signals, so refresh the ETag validators by hand
+        notes.update(audio_url=audio_url, updated_at=timezone.now())
+        NoteCollectionVersion.bump(user_ids)
+        print(f"Archived audio for {video_id}")
+    except Exception as e:
+        print(f"Audio archiving failed for {video_id}: {str(e)}")
+        remove_audio_file(file_path)
+    finally:
+        close_old_connections()
+
+
+def enqueue_job(job):
+    """Schedule a pending job once the surrounding transaction commits.
+
+    With the ``thread`` and ``async`` backends the job joins this process's
+    fair-share scheduler, which starts it when a worker slot is free.
+    """
+    if settings.NOTE_JOB_BACKEND not in ('thread', 'async'):
+        # The DB worker picks the row up on its next poll.
+        return
+    transaction.on_commit(lambda: schedule_job(job))
+
+
+def recover_jobs():
+    """Re-schedule the jobs an earlier run of this process left behind; runs once per process.
+
+    Pending jobs only lived in the old process's scheduler, so they are queued
+    again here (claiming is atomic, so one another process already queued
+    still runs once). Running jobs not updated for ``NOTE_JOB_STALE_AFTER``
+    seconds lost their worker and go back to pending, keeping their
+    checkpoints. Returns how many jobs were queued.
+    """
+    global _recovered
+    with _executor_lock:
+        if _recovered:
+            return 0
+        _recovered = True
+
+    cutoff = timezone.now() - timedelta(seconds=settings.NOTE_JOB_STALE_AFTER)
+    requeued = NoteJob.objects.filter(status=NoteJob.STATUS_RUNNING, updated_at__lt=cutoff).update(
+        status=NoteJob.STATUS_PENDING, stage='', updated_at=timezone.now()
+    )
+    pending = (NoteJob.objects
+               .filter(status=NoteJob.STATUS_PENDING)
+               .exclude(pk__in=get_scheduler().job_ids())
+               .order_by('created_at')
+               .only('pk', 'user_id', 'youtube_link', 'batch_id'))
+    count = 0
+    for job in pending.iterator(chunk_size=200):
+        schedule_job(job)
+        count += 1
+    if count:
+        print(f"Recovered {count} note job(s), {requeued} of them left running")
+    return count
+
+
+def retry_job(job, status=None):
+    """Put a failed job back in the queue, keeping its checkpoints. Returns False if it hadn't failed.
+
+    A batch job whose batch already has ``NOTE_BATCH_CONCURRENCY`` jobs in
+    flight is held until one finishes; pass ``status`` to choose explicitly.
+    """
+    if status is None:
+        status = NoteJob.STATUS_PENDING
+        if job.batch_id and NoteJob.objects.filter(
+            batch_id=job.batch_id, status__in=(NoteJob.STATUS_PENDING, NoteJob.STATUS_RUNNING)
+        ).count() >= settings.NOTE_BATCH_CONCURRENCY:
+            status = NoteJob.STATUS_HELD
+    retried = NoteJob.objects.filter(pk=job.pk, status=NoteJob.STATUS_FAILED).update(
+        status=status,
+        stage='',
+        error='',
+        detail='',
+        attempts=F('attempts') + 1,
+        started_at=None,
+        finished_at=None,
+        updated_at=timezone.now()
+    ) == 1
+    if retried and status == NoteJob.STATUS_PENDING:
+        enqueue_job(job)
+    return retried
+
+
+def claim_job(job_id):
+    """Atomically move a job from pending to running. Returns False if another worker won."""
+    return NoteJob.objects.filter(pk=job_id, status=NoteJob.STATUS_PENDING).update(
+        status=NoteJob.STATUS_RUNNING,
+        started_at=timezone.now(),
+        updated_at=timezone.now()
+    ) == 1
+
+
+def resolve_audio_url(link, result):
+    """Return the result's audio URL, or the archived one if it was uploaded after the result was produced."""
+    video_id = parse_video_id(link)
+    audio_url = result['audio_url']
+    if not audio_url and video_id:
+        audio_url = (CachedResult.objects
+                     .filter(video_id=video_id)
+                     .exclude(audio_url='')
+                     .values_list('audio_url', flat=True)
+                     .first()) or ''
+    return audio_url
+
+
+def create_note_from_result(user, link, result, audio_url=None):
+    """Create the user's VideoNotes row from a pipeline (or cached) result."""
+    return VideoNotes.objects.create(
+        user=user,
+        youtube_title=result['title'],
+        youtube_link=link,
+        video_id=parse_video_id(link) or '',
+        notes_content=result['notes'],
+        transcription=result['transcription'],
+        transcript_source=result.get('transcript_source', ''),
+        transcript_offsets=result.get('transcript_offsets'),
+        audio_url=resolve_audio_url(link, result) if audio_url is None else audio_url
+    )
+
+
+def finish_pipeline_result(link, result):
+    """Cache a fresh pipeline result and hand its local audio file to the archiver."""
+    store_result(link, result)
+    audio_path = result.pop('audio_path', None)
+    if audio_path:
+        video_id = parse_video_id(link)
+        if video_id:
+            get_archive_executor().submit(archive_audio, video_id, audio_path)
+        else:
+            remove_audio_file(audio_path)
+
+
+def run_shared_pipeline(link, on_stage=None, on_wait=None, checkpoint=None, on_text=None):
+    """Return the result for a link, reusing the cache or a pipeline already running for the same video.
+
+    ``checkpoint`` and ``on_text`` are used when this call runs the pipeline
+    itself; a call that joins another job's run shares that job's progress
+    instead.
+    """
+    video_id = parse_video_id(link)
+    key = f"{video_id}:{pipeline_version()}" if video_id else link
+
+    def compute():
+        # An identical video may have finished while this job sat in the queue
+        result = get_cached_result(link)
+        if result is None:
+            with PIPELINES_IN_FLIGHT.track_inprogress():
+                result = run_pipeline(link, on_stage=on_stage, checkpoint=checkpoint, on_text=on_text)
+            finish_pipeline_result(link, result)
+        return result
+
+    return pipeline_flights.do(key, compute, on_wait=on_wait)
+
+
+def run_job(job_id):
+    """Run the pipeline for a job and store the resulting note or error."""
+    close_old_connections()
+    try:
+        if not claim_job(job_id):
+            return
+        with JOBS_IN_FLIGHT.track_inprogress():
+            try:
+                status = _run_claimed_job(job_id)
+            except Exception as e:
+                status = mark_job_crashed(job_id, e)
+        JOBS_FINISHED.inc(status=status)
+        job_events.finish(job_id)
+        start_next_batch_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def start_next_batch_job(finished_job_id):
+    """Release the finished job's batch slot by moving the batch's oldest held job to pending."""
+    batch_id = NoteJob.objects.filter(pk=finished_job_id).values_list('batch_id', flat=True).first()
+    if batch_id is None:
+        return None
+    held = NoteJob.objects.filter(batch_id=batch_id, status=NoteJob.STATUS_HELD)
+    for job in held.order_by('pk').only('pk', 'user_id', 'youtube_link', 'batch_id')[:10]:
+        # Another finishing job may promote the same row; only one update wins
+        if held.filter(pk=job.pk).update(status=NoteJob.STATUS_PENDING, updated_at=timezone.now()):
+            enqueue_job(job)
+            return job
+    return None
+
+
+def mark_job_crashed(job_id, exc):
+    """Fail a claimed job after an unexpected error so it is never left stuck in "running"."""
+    print(f"Note job {job_id} crashed: {str(exc)}")
+    print(''.join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
+    NoteJob.objects.filter(pk=job_id, status=NoteJob.STATUS_RUNNING).update(
+        status=NoteJob.STATUS_FAILED,
+        error='Processing error',
+        detail=str(exc),
+        finished_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+    return NoteJob.STATUS_FAILED
+
+
+def _run_claimed_job(job_id):
+    """Run a job this worker has claimed and return its final status."""
+    job = NoteJob.objects.select_related('user').get(pk=job_id)
+    print(f"Running note job {job.pk} for {job.youtube_link}")
+
+    def on_stage(stage):
+        NoteJob.objects.filter(pk=job.pk).update(stage=stage, updated_at=timezone.now())
+        job_events.publish(job.pk, 'stage', {'stage': stage})
+
+    # Stream the notes only when someone is following the job (see streaming.py)
+    on_text = None
+    if job_events.has_subscribers(job.pk):
+        on_text = lambda text: job_events.publish(job.pk, 'chunk', {'text': text})
+
+    try:
+        # No transaction is open here, so followers can wait on the leader safely
+        result = run_shared_pipeline(
+            job.youtube_link,
+            on_stage=on_stage,
+            on_wait=lambda: on_stage('waiting'),
+            checkpoint=JobCheckpoint(job),
+            on_text=on_text
+        )
+    except Exception as e:
+        return fail_job(job, e)
+    return complete_job(job, result)
+
+
+def fail_job(job, exc):
+    """Record a pipeline failure on a job and return its final status."""
+    print(f"Note job {job.pk} failed: {str(exc)}")
+    print(''.join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
+    payload, _ = describe_pipeline_error(exc)
+    NoteJob.objects.filter(pk=job.pk).update(
+        status=NoteJob.STATUS_FAILED,
+        error=payload['error'][:255],
+        detail=payload['detail'],
+        finished_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+    return NoteJob.STATUS_FAILED
+
+
+def complete_job(job, result):
+    """Create the job's note from a pipeline result and return its final status."""
+    # Read before opening the transaction: on SQLite a read followed by a write inside
+    # one transaction can fail with "database is locked" instead of waiting
+    audio_url = resolve_audio_url(job.youtube_link, result)
+    with transaction.atomic():
+        video_note = create_note_from_result(job.user, job.youtube_link, result, audio_url=audio_url)
+        NoteJob.objects.filter(pk=job.pk).update(
+            status=NoteJob.STATUS_COMPLETED,
+            note=video_note,
+            # The note holds everything the checkpoints did
+            checkpoint={},
+            finished_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+    print(f"Note job {job.pk} complete (note {video_note.pk})")
+    return NoteJob.STATUS_COMPLETED
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.models import NoteJob
+from api.scheduler import get_scheduler, schedule_job
+
+# Pending jobs read into the scheduler per poll; enough to see every user's backlog
+PENDING_SCAN_LIMIT = 500
+
+
+class Command(BaseCommand):
+    help = "Run pending note generation jobs (worker for NOTE_JOB_BACKEND='db')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs that are currently pending, then exit.')
+        parser.add_argument('--requeue-running', action='store_true',
+                            help='Reset jobs left in "running" by a crashed worker back to pending first.')
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            count = NoteJob.objects.filter(status=NoteJob.STATUS_RUNNING).update(
+                status=NoteJob.STATUS_PENDING, stage=''
+            )
+            self.stdout.write(f"Requeued {count} running job(s)")
+
+        # Pending rows join the fair-share scheduler, which starts them as worker slots free up
+        scheduler = get_scheduler()
+        self.stdout.write(f"Processing note jobs with {settings.NOTE_JOB_WORKERS} worker(s)")
+
+        while True:
+            pending = (NoteJob.objects
+                       .filter(status=NoteJob.STATUS_PENDING)
+                       .exclude(pk__in=scheduler.job_ids())
+                       .order_by('created_at')
+                       .only('pk', 'user_id', 'youtube_link', 'batch_id')[:PENDING_SCAN_LIMIT])
+            for job in pending:
+                schedule_job(job)
+
+            if options['once'] and not scheduler.job_ids() and not NoteJob.objects.filter(status=NoteJob.STATUS_PENDING).exists():
+                return
+
+            time.sleep(settings.NOTE_JOB_POLL_INTERVAL)
@@ -0,0 +1,93 @@
+import re
+import zlib
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.fields import ZDICT_V1
+from api.models import VideoNotes
+
+# zlib only looks back 32 KB, so a longer preset dictionary is never used
+MAX_ZDICT_BYTES = 32 * 1024
+
+# A token is a word or markdown marker with the whitespace before it, so "\n- **" and " of the" survive
+TOKEN_RE = re.compile(r'\s*\S+')
+
+
+def sample_notes(limit, max_chars):
+    """The bodies of the first ``limit`` notes by id: the same database always gives the same sample."""
+    notes = VideoNotes.objects.only('pk', 'notes_content', 'transcription').order_by('pk')[:limit]
+    for note in notes.iterator(chunk_size=100):
+        yield [text[:max_chars] for text in (note.notes_content, note.transcription) if text]
+
+
+def train_zdict(texts, size, max_words=4, min_count=4):
+    """Build a zlib preset dictionary from the word n-grams that would save the most bytes.
+
+    Candidates are scored by ``count * (len - 3)`` (a zlib match costs about
+    three bytes), picked greedily while they are not already inside a picked
+    string, and laid out with the best last, since zlib codes near matches
+    most cheaply. Ties are broken by the string itself, so the output depends
+    on the sample only.
+    """
+    counts = Counter()
+    for text in texts:
+        tokens = TOKEN_RE.findall(text)
+        for n in range(1, max_words + 1):
+            for start in range(len(tokens) - n + 1):
+                counts[''.join(tokens[start:start + n])] += 1
+
+    candidates = sorted(
+        ((count * (len(gram.encode('utf-8')) - 3), gram) for gram, count in counts.items() if count >= min_count),
+        key=lambda item: (-item[0], item[1])
+    )
+    picked = []
+    used = 0
+    for score, gram in candidates:
+        if score <= 0:
+            break
+        data = gram.encode('utf-8')
+        if used + len(data) > size:
+            continue
+        if any(gram in other for other in picked):
+            continue
+        picked.append(gram)
+        used += len(data)
+    return ''.join(reversed(picked)).encode('utf-8')
+
+
+def compressed_size(texts, zdict):
+    total = 0
+    for text in texts:
+        compressor = zlib.compressobj(level=6, wbits=-15, zdict=zdict)
+        total += len(compressor.compress(text.encode('utf-8')) + compressor.flush())
+    return total
+
+
+class Command(BaseCommand):
+    help = "Train a zlib preset dictionary for CompressedTextField from a sample of the stored notes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='File to write the dictionary to.')
+        parser.add_argument('--notes', type=int, default=1000, help='Notes to sample, oldest first.')
+        parser.add_argument('--max-chars', type=int, default=20000, help='Characters read from each body.')
+        parser.add_argument('--size', type=int, default=MAX_ZDICT_BYTES, help='Dictionary size in bytes.')
+
+    def handle(self, *args, **options):
+        if not 0 < options['size'] <= MAX_ZDICT_BYTES:
+            raise CommandError(f"--size must be between 1 and {MAX_ZDICT_BYTES}")
+        notes = [texts for texts in sample_notes(options['notes'], options['max_chars']) if texts]
+        if not notes:
+            raise CommandError("No notes to train on")
+
+        # Train on every other note and compare on the rest, so the ratio isn't measured on the training data
+        training = [text for texts in notes[::2] for text in texts]
+        held_out = [text for texts in (notes[1::2] or notes) for text in texts]
+        zdict = train_zdict(training, options['size'])
+        with open(options['output'], 'wb') as f:
+            f.write(zdict)
+
+        raw = sum(len(text.encode('utf-8')) for text in held_out)
+        self.stdout.write(f"Wrote a {len(zdict)} byte dictionary trained on {len(training)} bodies to {options['output']}")
+        self.stdout.write(f"Held-out sample: {raw} bytes, {compressed_size(held_out, ZDICT_V1)} with ZDICT_V1, "
+                          f"{compressed_size(held_out, zdict)} with the trained dictionary")
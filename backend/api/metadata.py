@@ -0,0 +1,253 @@
+"""
+Shared YouTube metadata lookups.
+
+yt-dlp extraction is the slowest and most rate-limited step of the pipeline,
+so every video is extracted once and the result is reused by the title lookup,
+the duration check and the audio download. Info dicts are cached per video id
+for ``VIDEO_INFO_TTL`` seconds, and concurrent lookups of the same video share
+one extraction.
+"""
+import copy
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse, parse_qs
+
+import yt_dlp
+from django.conf import settings
+
+from .resilience import call, provider_timeout
+from .singleflight import SingleFlight
+
+YOUTUBE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+_cache_lock = threading.Lock()
+_info_cache = {}
+_extractions = SingleFlight()
+
+
+def parse_video_id(link):
+    """Extract the canonical 11-character video id from a YouTube URL, or None."""
+    try:
+        parsed = urlparse(link.strip())
+    except (AttributeError, ValueError):
+        return None
+    host = (parsed.hostname or '').lower()
+    candidate = None
+    if host == 'youtu.be' or host.endswith('.youtu.be'):
+        candidate = parsed.path.lstrip('/').split('/')[0]
+    elif host == 'youtube.com' or host.endswith('.youtube.com'):
+        if parsed.path == '/watch':
+            candidate = parse_qs(parsed.query).get('v', [None])[0]
+        else:
+            parts = parsed.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v'):
+                candidate = parts[1]
+    if candidate and YOUTUBE_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+@dataclass
+class VideoInfo:
+    """The parts of a yt-dlp info dict the pipeline uses."""
+    video_id: str
+    title: str
+    duration: int
+    webpage_url: str
+    chapters: list = field(default_factory=list)
+    subtitles: dict = field(default_factory=dict)
+    automatic_captions: dict = field(default_factory=dict)
+    formats: list = field(default_factory=list)
+    raw: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def caption_languages(self):
+        """Languages with manual or automatic captions, manual first."""
+        languages = list(self.subtitles)
+        languages += [lang for lang in self.automatic_captions if lang not in self.subtitles]
+        return languages
+
+    @classmethod
+    def from_info_dict(cls, info):
+        return cls(
+            video_id=info.get('id') or '',
+            title=info.get('title') or '',
+            duration=int(info.get('duration') or 0),
+            webpage_url=info.get('webpage_url') or info.get('original_url') or '',
+            chapters=[
+                {
+                    'title': chapter.get('title'),
+                    'start_time': chapter.get('start_time'),
+                    'end_time': chapter.get('end_time'),
+                }
+                for chapter in info.get('chapters') or []
+            ],
+            subtitles=info.get('subtitles') or {},
+            automatic_captions=info.get('automatic_captions') or {},
+            formats=[
+                {
+                    'format_id': fmt.get('format_id'),
+                    'ext': fmt.get('ext'),
+                    'acodec': fmt.get('acodec'),
+                    'vcodec': fmt.get('vcodec'),
+                    'abr': fmt.get('abr'),
+                    'filesize': fmt.get('filesize') or fmt.get('filesize_approx'),
+                }
+                for fmt in info.get('formats') or []
+            ],
+            raw=info,
+        )
+
+
+def youtube_dl_options(**overrides):
+    """Base yt-dlp options shared by metadata extraction and downloads."""
+    cookie_file_path = os.path.join(settings.BASE_DIR, 'api', 'cookies.txt')
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'no_color': True,
+        'socket_timeout': provider_timeout('youtube'),
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-us,en;q=0.5',
+            'Sec-Fetch-Mode': 'navigate',
+            'Referer': 'https://www.youtube.com/',
+            'Origin': 'https://www.youtube.com',
+            'X-Forwarded-For': '203.0.113.1'  # Helps avoid IP-based blocks
+        },
+        'extractor_args': {
+            'youtube': {
+                'skip': ['dash', 'hls'],
+                'player_client': ['web']
+            }
+        }
+    }
+    if os.path.exists(cookie_file_path):
+        ydl_opts['cookiefile'] = cookie_file_path
+    ydl_opts.update(overrides)
+    return ydl_opts
+
+
+def _extract_info(link):
+    with yt_dlp.YoutubeDL(youtube_dl_options()) as ydl:
+        try:
+            # process=False skips format selection; the download step does it from this dict
+            info = call('youtube', ydl.extract_info, link, download=False, process=False)
+            if not info:
+                raise Exception("No video information returned")
+        except Exception as e:
+            error_msg = f"Error fetching YouTube video: {str(e)}"
+            if "Video unavailable" in str(e):
+                error_msg += "\nThe video may be private, deleted, or age-restricted."
+            elif "HTTP Error 429" in str(e):
+                error_msg += "\nYouTube is rate-limiting our requests. Try again later or add YouTube cookies."
+            print(error_msg)
+            raise Exception(error_msg)
+    return VideoInfo.from_info_dict(ydl.sanitize_info(info))
+
+
+def get_video_info(link):
+    """Return the VideoInfo for a link, extracting it at most once per TTL window."""
+    key = parse_video_id(link) or link
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _info_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+    def extract():
+        info = _extract_info(link)
+        with _cache_lock:
+            if len(_info_cache) >= settings.VIDEO_INFO_CACHE_SIZE:
+                # Drop expired entries first, then the oldest ones
+                for stale_key in sorted(_info_cache, key=lambda k: _info_cache[k][0])[:len(_info_cache) // 4 + 1]:
+                    del _info_cache[stale_key]
+            _info_cache[key] = (time.monotonic() + settings.VIDEO_INFO_TTL, info)
+        return info
+
+    return _extractions.do(key, extract)
+
+
+def info_dict_for_download(info):
+    """Return a private copy of the raw info dict that yt-dlp may mutate while downloading."""
+    return copy.deepcopy(info.raw)
+
+
+CHANNEL_PREFIXES = ('channel', 'c', 'user')
+CHANNEL_TABS = ('videos', 'streams', 'shorts')
+
+
+@dataclass
+class CollectionInfo:
+    """A playlist or channel tab flattened to its videos."""
+    title: str
+    webpage_url: str
+    # [{'video_id', 'title', 'duration'}] in playlist order; duration is 0 when YouTube omits it
+    entries: list = field(default_factory=list)
+
+
+def parse_collection_url(link):
+    """Return the canonical playlist or channel-tab URL for a link, or None if it isn't one.
+
+    ``watch?v=...&list=...`` links resolve to the playlist. Channel links
+    without a tab resolve to their ``/videos`` tab.
+    """
+    try:
+        parsed = urlparse(link.strip())
+    except (AttributeError, ValueError):
+        return None
+    host = (parsed.hostname or '').lower()
+    if not (host == 'youtube.com' or host.endswith('.youtube.com')):
+        return None
+    playlist_id = parse_qs(parsed.query).get('list', [None])[0]
+    if playlist_id and re.match(r'^[A-Za-z0-9_-]+$', playlist_id):
+        return f"https://www.youtube.com/playlist?list={playlist_id}"
+
+    parts = [part for part in parsed.path.split('/') if part]
+    if parts and parts[0].startswith('@'):
+        channel, rest = parts[:1], parts[1:]
+    elif len(parts) >= 2 and parts[0] in CHANNEL_PREFIXES:
+        channel, rest = parts[:2], parts[2:]
+    else:
+        return None
+    tab = rest[0] if rest and rest[0] in CHANNEL_TABS else 'videos'
+    return f"https://www.youtube.com/{'/'.join(channel)}/{tab}"
+
+
+def expand_collection(url, limit):
+    """List up to ``limit`` videos of a playlist or channel tab without extracting each video."""
+    ydl_opts = youtube_dl_options(extract_flat='in_playlist', playlistend=limit)
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        try:
+            info = call('youtube', ydl.extract_info, url, download=False)
+            if not info:
+                raise Exception("No playlist information returned")
+        except Exception as e:
+            error_msg = f"Error fetching YouTube playlist: {str(e)}"
+            if "HTTP Error 429" in str(e):
+                error_msg += "\nYouTube is rate-limiting our requests. Try again later or add YouTube cookies."
+            print(error_msg)
+            raise Exception(error_msg)
+
+    entries = []
+    for entry in info.get('entries') or []:
+        # Flat entries are unresolved video URLs; skip nested playlists and private/deleted placeholders
+        video_id = (entry or {}).get('id') or ''
+        if not YOUTUBE_ID_RE.match(video_id) or entry.get('ie_key') not in (None, 'Youtube'):
+            continue
+        entries.append({
+            'video_id': video_id,
+            'title': entry.get('title') or '',
+            'duration': int(entry.get('duration') or 0),
+        })
+        if len(entries) >= limit:
+            break
+    return CollectionInfo(
+        title=info.get('title') or '',
+        webpage_url=info.get('webpage_url') or url,
+        entries=entries,
+    )
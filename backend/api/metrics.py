@@ -0,0 +1,232 @@
+"""
+In-process pipeline metrics in the Prometheus text exposition format.
+
+A deliberately small registry (counters, gauges and histograms with labels)
+so we don't need an extra dependency. Values are per process: with several
+gunicorn workers, scrape each worker or aggregate in Prometheus.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+_registry = []
+_registry_lock = threading.Lock()
+
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+SIZE_BUCKETS = (2 ** 20, 5 * 2 ** 20, 10 * 2 ** 20, 25 * 2 ** 20, 50 * 2 ** 20, 100 * 2 ** 20, 250 * 2 ** 20)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value, None) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for name, key, value, extra in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def value(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state['count'] if state else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state['counts']):
+                    samples.append((f"{self.name}_bucket", key, count, ('le', _format_value(bound))))
+                samples.append((f"{self.name}_sum", key, state['sum'], None))
+                samples.append((f"{self.name}_count", key, state['count'], None))
+        return samples
+
+
+def render_metrics():
+    """Render every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# Pipeline metrics
+
+STAGE_DURATION = Histogram(
+    'ytnotes_stage_duration_seconds',
+    'Time spent in each pipeline stage.',
+    ['stage']
+)
+STAGE_FAILURES = Counter(
+    'ytnotes_stage_failures_total',
+    'Pipeline stage failures by stage and exception class.',
+    ['stage', 'error']
+)
+PIPELINES_IN_FLIGHT = Gauge(
+    'ytnotes_pipelines_in_flight',
+    'Pipeline runs currently executing in this process.'
+)
+JOBS_IN_FLIGHT = Gauge(
+    'ytnotes_jobs_in_flight',
+    'Note jobs currently being worked on by this process.'
+)
+JOBS_QUEUED = Gauge(
+    'ytnotes_jobs_queued',
+    'Note jobs waiting in this process\'s scheduler for a worker slot.'
+)
+JOB_QUEUE_WAIT = Histogram(
+    'ytnotes_job_queue_wait_seconds',
+    'Time a note job waited in the scheduler before starting, for single videos and batch items.',
+    ['kind']
+)
+JOBS_FINISHED = Counter(
+    'ytnotes_jobs_finished_total',
+    'Note jobs finished, by final status.',
+    ['status']
+)
+AUDIO_BYTES = Counter(
+    'ytnotes_audio_bytes_total',
+    'Bytes of audio downloaded from YouTube.'
+)
+AUDIO_SIZE = Histogram(
+    'ytnotes_audio_size_bytes',
+    'Size of each downloaded audio file.',
+    buckets=SIZE_BUCKETS
+)
+AUDIO_TRANSCODE_SAVED_BYTES = Counter(
+    'ytnotes_audio_transcode_saved_bytes_total',
+    'Bytes taken off downloaded audio by transcoding it for speech before upload.'
+)
+AUDIO_TRIMMED_SECONDS = Counter(
+    'ytnotes_audio_trimmed_seconds_total',
+    'Seconds of silence and non-speech cut from audio before transcription.'
+)
+RESULT_CACHE_EVENTS = Counter(
+    'ytnotes_result_cache_events_total',
+    'Result cache hits, misses, stores and evictions.',
+    ['event']
+)
+PROVIDER_RETRIES = Counter(
+    'ytnotes_provider_retries_total',
+    'External provider calls retried after a transient error, by provider and exception class.',
+    ['provider', 'error']
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    'ytnotes_circuit_breaker_state',
+    'Circuit breaker state per provider: 0 closed, 1 half-open, 2 open.',
+    ['provider']
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    'ytnotes_circuit_breaker_rejections_total',
+    'Provider calls failed fast because the provider\'s circuit breaker was open.',
+    ['provider']
+)
+
+
+@contextmanager
+def observe_stage(stage):
+    """Time a pipeline stage and count its failures by exception class."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_FAILURES.inc(stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, stage=stage)
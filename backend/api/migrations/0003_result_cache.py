@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:12
+
+import re
+from urllib.parse import parse_qs, urlparse
+
+from django.db import migrations, models
+
+YOUTUBE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+def parse_video_id(link):
+    """Frozen copy of the video id parser as of this migration."""
+    try:
+        parsed = urlparse(link.strip())
+    except (AttributeError, ValueError):
+        return None
+    host = (parsed.hostname or '').lower()
+    candidate = None
+    if host == 'youtu.be' or host.endswith('.youtu.be'):
+        candidate = parsed.path.lstrip('/').split('/')[0]
+    elif host == 'youtube.com' or host.endswith('.youtube.com'):
+        if parsed.path == '/watch':
+            candidate = parse_qs(parsed.query).get('v', [None])[0]
+        else:
+            parts = parsed.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v'):
+                candidate = parts[1]
+    if candidate and YOUTUBE_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def backfill_video_ids(apps, schema_editor):
+    VideoNotes = apps.get_model('api', 'VideoNotes')
+    for note in VideoNotes.objects.filter(video_id='').only('pk', 'youtube_link').iterator():
+        video_id = parse_video_id(note.youtube_link)
+        if video_id:
+            VideoNotes.objects.filter(pk=note.pk).update(video_id=video_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_notejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videonotes',
+            name='video_id',
+            field=models.CharField(blank=True, db_index=True, max_length=32),
+        ),
+        migrations.CreateModel(
+            name='CachedResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=32)),
+                ('version', models.CharField(max_length=64)),
+                ('youtube_title', models.CharField(max_length=255)),
+                ('audio_url', models.URLField(blank=True, null=True)),
+                ('transcription', models.TextField(blank=True, null=True)),
+                ('notes_content', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'unique_together': {('video_id', 'version')},
+            },
+        ),
+        migrations.RunPython(backfill_video_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cachedresult',
+            name='transcript_source',
+            field=models.CharField(blank=True, choices=[('captions', 'YouTube captions'), ('asr', 'Speech recognition')], max_length=16),
+        ),
+        migrations.AddField(
+            model_name='videonotes',
+            name='transcript_source',
+            field=models.CharField(blank=True, choices=[('captions', 'YouTube captions'), ('asr', 'Speech recognition')], max_length=16),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:34
+
+import re
+
+from django.db import migrations, models
+
+NOTES_PREVIEW_LENGTH = 200
+MARKDOWN_SYNTAX_RE = re.compile(r'[#*_`>\[\]]+|^\s*[-+]\s+', re.MULTILINE)
+
+
+def make_notes_preview(notes_content, length=NOTES_PREVIEW_LENGTH):
+    """Frozen copy of ``api.models.make_notes_preview`` as of this migration."""
+    text = ' '.join(MARKDOWN_SYNTAX_RE.sub(' ', notes_content or '').split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '…'
+
+
+def backfill_previews(apps, schema_editor):
+    VideoNotes = apps.get_model('api', 'VideoNotes')
+    batch = []
+    for note in VideoNotes.objects.only('pk', 'notes_content').iterator(chunk_size=500):
+        note.notes_preview = make_notes_preview(note.notes_content)
+        batch.append(note)
+        if len(batch) >= 500:
+            VideoNotes.objects.bulk_update(batch, ['notes_preview'])
+            batch = []
+    if batch:
+        VideoNotes.objects.bulk_update(batch, ['notes_preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_transcript_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videonotes',
+            name='notes_preview',
+            field=models.CharField(blank=True, max_length=201),
+        ),
+        migrations.RunPython(backfill_previews, migrations.RunPython.noop),
+    ]
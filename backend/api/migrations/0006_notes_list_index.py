@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_notes_preview'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='videonotes',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name_plural': 'Video Notes'},
+        ),
+        migrations.AddIndex(
+            model_name='videonotes',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='api_notes_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+from django.db import migrations
+
+# Frozen copies of api.search's schema and indexing as of this migration
+PG_TABLE = 'api_notes_search'
+FTS_TABLE = 'api_notes_fts'
+MAX_DOCUMENT_CHARS = 500000
+
+
+def _clip(text):
+    return (text or '')[:MAX_DOCUMENT_CHARS]
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {PG_TABLE} (
+                note_id bigint PRIMARY KEY REFERENCES api_videonotes (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+                user_id integer NOT NULL,
+                document tsvector NOT NULL
+            )
+        """)
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_document_idx ON {PG_TABLE} USING GIN (document)")
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_user_idx ON {PG_TABLE} (user_id)")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                title, notes, transcription, user_id UNINDEXED,
+                tokenize = 'porter unicode61'
+            )
+        """)
+    else:
+        return
+
+    # Backfill existing notes
+    VideoNotes = apps.get_model('api', 'VideoNotes')
+    fields = ['pk', 'user_id', 'youtube_title', 'notes_content', 'transcription']
+    notes = VideoNotes.objects.using(schema_editor.connection.alias).only(*fields)
+    with schema_editor.connection.cursor() as cursor:
+        for note in notes.iterator(chunk_size=200):
+            title, body, transcription = _clip(note.youtube_title), _clip(note.notes_content), _clip(note.transcription)
+            if vendor == 'postgresql':
+                cursor.execute(f"""
+                    INSERT INTO {PG_TABLE} (note_id, user_id, document)
+                    VALUES (
+                        %s, %s,
+                        setweight(to_tsvector('english', %s), 'A') ||
+                        setweight(to_tsvector('english', %s), 'B') ||
+                        setweight(to_tsvector('english', %s), 'C')
+                    )
+                    ON CONFLICT (note_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document
+                """, [note.pk, note.user_id, title, body, transcription])
+            else:
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [note.pk])
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, notes, transcription, user_id) VALUES (%s, %s, %s, %s, %s)",
+                    [note.pk, title, body, transcription, note.user_id]
+                )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_notes_list_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
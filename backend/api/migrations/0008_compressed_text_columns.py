@@ -0,0 +1,36 @@
+import api.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_notes_search'),
+    ]
+
+    operations = [
+        # The old columns become nullable so that, when migrating backwards, they can be
+        # re-added empty and refilled by 0009 before NOT NULL is restored here
+        migrations.AlterField(model_name='videonotes', name='notes_content', field=models.TextField(null=True)),
+        migrations.AlterField(model_name='cachedresult', name='notes_content', field=models.TextField(null=True)),
+        migrations.AddField(
+            model_name='videonotes',
+            name='notes_content_z',
+            field=api.fields.CompressedTextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='videonotes',
+            name='transcription_z',
+            field=api.fields.CompressedTextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cachedresult',
+            name='notes_content_z',
+            field=api.fields.CompressedTextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='cachedresult',
+            name='transcription_z',
+            field=api.fields.CompressedTextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+BATCH_SIZE = 200
+
+
+def _copy_in_batches(model, pairs):
+    source_fields = [source for source, _ in pairs]
+    target_fields = [target for _, target in pairs]
+    batch = []
+    for row in model.objects.only('pk', *source_fields).order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        for source, target in pairs:
+            setattr(row, target, getattr(row, source))
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, target_fields)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, target_fields)
+
+
+def compress_bodies(apps, schema_editor):
+    for model_name in ('VideoNotes', 'CachedResult'):
+        _copy_in_batches(apps.get_model('api', model_name), [
+            ('notes_content', 'notes_content_z'),
+            ('transcription', 'transcription_z'),
+        ])
+
+
+def decompress_bodies(apps, schema_editor):
+    for model_name in ('VideoNotes', 'CachedResult'):
+        _copy_in_batches(apps.get_model('api', model_name), [
+            ('notes_content_z', 'notes_content'),
+            ('transcription_z', 'transcription'),
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_compressed_text_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_bodies, decompress_bodies),
+    ]
@@ -0,0 +1,32 @@
+import api.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_compress_text_bodies'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='videonotes', name='notes_content'),
+        migrations.RemoveField(model_name='videonotes', name='transcription'),
+        migrations.RemoveField(model_name='cachedresult', name='notes_content'),
+        migrations.RemoveField(model_name='cachedresult', name='transcription'),
+        migrations.RenameField(model_name='videonotes', old_name='notes_content_z', new_name='notes_content'),
+        migrations.RenameField(model_name='videonotes', old_name='transcription_z', new_name='transcription'),
+        migrations.RenameField(model_name='cachedresult', old_name='notes_content_z', new_name='notes_content'),
+        migrations.RenameField(model_name='cachedresult', old_name='transcription_z', new_name='transcription'),
+        migrations.AlterField(
+            model_name='videonotes',
+            name='notes_content',
+            field=api.fields.CompressedTextField(default=''),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='cachedresult',
+            name='notes_content',
+            field=api.fields.CompressedTextField(default=''),
+            preserve_default=False,
+        ),
+    ]
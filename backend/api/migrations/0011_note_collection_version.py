@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    VideoNotes = apps.get_model('api', 'VideoNotes')
+    NoteCollectionVersion = apps.get_model('api', 'NoteCollectionVersion')
+    # Clear the default (-created_at, -id) ordering, or DISTINCT returns one row per note
+    user_ids = VideoNotes.objects.order_by().values_list('user_id', flat=True).distinct()
+    NoteCollectionVersion.objects.bulk_create(
+        [NoteCollectionVersion(user_id=user_id, version=1) for user_id in user_ids],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_swap_compressed_text_columns'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteCollectionVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_collection_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_note_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notebatch',
+            name='source_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='notebatch',
+            name='title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_note_job_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cachedresult',
+            name='transcript_offsets',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videonotes',
+            name='transcript_offsets',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# Frozen copies of api.search's SQLite schema and indexing as of this migration
+FTS_TABLE = 'api_notes_fts'
+MAX_DOCUMENT_CHARS = 500000
+
+
+def _clip(text):
+    return (text or '')[:MAX_DOCUMENT_CHARS]
+
+
+def _rebuild(apps, schema_editor, contentless):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    if contentless:
+        # The index only: note bodies are already stored (compressed) in api_videonotes
+        schema_editor.execute(f"""
+            CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                title, notes, transcription,
+                content = '', tokenize = 'porter unicode61'
+            )
+        """)
+    else:
+        schema_editor.execute(f"""
+            CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                title, notes, transcription, user_id UNINDEXED,
+                tokenize = 'porter unicode61'
+            )
+        """)
+
+    VideoNotes = apps.get_model('api', 'VideoNotes')
+    fields = ['pk', 'user_id', 'youtube_title', 'notes_content', 'transcription']
+    notes = VideoNotes.objects.using(schema_editor.connection.alias).only(*fields)
+    with schema_editor.connection.cursor() as cursor:
+        for note in notes.iterator(chunk_size=200):
+            values = [note.pk, _clip(note.youtube_title), _clip(note.notes_content), _clip(note.transcription)]
+            if contentless:
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, notes, transcription) VALUES (%s, %s, %s, %s)", values
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, notes, transcription, user_id) VALUES (%s, %s, %s, %s, %s)",
+                    values + [note.user_id]
+                )
+
+
+def make_contentless(apps, schema_editor):
+    _rebuild(apps, schema_editor, contentless=True)
+
+
+def restore_content(apps, schema_editor):
+    _rebuild(apps, schema_editor, contentless=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_transcript_offsets'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_contentless, restore_content),
+    ]
@@ -1,21 +1,166 @@
+import re
+
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .fields import CompressedTextField
 
 # Create your models here.
 
+TRANSCRIPT_SOURCE_CHOICES = [
+    ('captions', 'YouTube captions'),
+    ('asr', 'Speech recognition'),
+]
+
+NOTES_PREVIEW_LENGTH = 200
+MARKDOWN_SYNTAX_RE = re.compile(r'[#*_`>\[\]]+|^\s*[-+]\s+', re.MULTILINE)
+
+
+def make_notes_preview(notes_content, length=NOTES_PREVIEW_LENGTH):
+    """Plain-text opening of the notes for list views."""
+    text = ' '.join(MARKDOWN_SYNTAX_RE.sub(' ', notes_content or '').split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '…'
+
+
 class VideoNotes(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notes')
     youtube_title = models.CharField(max_length=255)
     youtube_link = models.URLField()
-    notes_content = models.TextField()
-    transcription = models.TextField(blank=True, null=True)
+    video_id = models.CharField(max_length=32, blank=True, db_index=True)
+    notes_content = CompressedTextField()
+    # Short plain-text copy of the start of notes_content, so lists never load the full bodies
+    notes_preview = models.CharField(max_length=NOTES_PREVIEW_LENGTH + 1, blank=True)
+    transcription = CompressedTextField(blank=True, null=True)
+    transcript_source = models.CharField(max_length=16, choices=TRANSCRIPT_SOURCE_CHOICES, blank=True)
+    # [trimmed_start, original_start, length] per span kept by silence trimming (see vad.py); null if nothing was cut
+    transcript_offsets = models.JSONField(null=True, blank=True)
     audio_url = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Columns needed to render a note in a list
+    LIST_FIELDS = ['id', 'youtube_title', 'youtube_link', 'video_id', 'notes_preview',
+                   'transcript_source', 'created_at', 'updated_at']
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         verbose_name_plural = 'Video Notes'
+        indexes = [
+            # Serves filter(user=...) ordered newest first, including keyset page lookups
+            models.Index(fields=['user', '-created_at', '-id'], name='api_notes_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.youtube_title} - {self.user.username}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'notes_content' in update_fields:
+            self.notes_preview = make_notes_preview(self.notes_content)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'notes_preview'}
+        super().save(*args, **kwargs)
+
+
+class NoteBatch(models.Model):
+    """Links submitted together through ``POST /api/notes/batch/``, or the videos of a playlist or channel (see batches.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='note_batches')
+    # Set for collections: the playlist or channel the links were expanded from
+    source_url = models.URLField(max_length=500, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    # One entry per submitted link: its outcome and the note or job it maps to
+    items = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Batch {self.pk} ({self.title or f'{len(self.items)} links'}) - {self.user_id}"
+
+
+class NoteJob(models.Model):
+    # Batch jobs wait as "held" until one of the batch's slots frees up
+    STATUS_HELD = 'held'
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_HELD, 'Held'),
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='note_jobs')
+    youtube_link = models.URLField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    stage = models.CharField(max_length=32, blank=True)
+    note = models.ForeignKey(VideoNotes, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    batch = models.ForeignKey(NoteBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    error = models.CharField(max_length=255, blank=True)
+    detail = models.TextField(blank=True)
+    # Output of each finished pipeline stage, so a retry resumes where this run stopped (see checkpoints.py)
+    checkpoint = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.status}) - {self.user.username}"
+
+
+class CachedResult(models.Model):
+    """Pipeline output for a video, shared by every user who submits it."""
+    video_id = models.CharField(max_length=32)
+    version = models.CharField(max_length=64)
+    youtube_title = models.CharField(max_length=255)
+    audio_url = models.URLField(blank=True, null=True)
+    transcription = CompressedTextField(blank=True, null=True)
+    transcript_source = models.CharField(max_length=16, choices=TRANSCRIPT_SOURCE_CHOICES, blank=True)
+    # [trimmed_start, original_start, length] per span kept by silence trimming (see vad.py); null if nothing was cut
+    transcript_offsets = models.JSONField(null=True, blank=True)
+    notes_content = CompressedTextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = [('video_id', 'version')]
+
+    def __str__(self):
+        return f"{self.video_id} ({self.version})"
+
+
+class NoteCollectionVersion(models.Model):
+    """Counter bumped whenever any of a user's notes changes; validates cached copies of the notes list."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='note_collection_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+    @classmethod
+    def bump(cls, user_ids, create=True):
+        """Increment the version for each user. Rows are only created when ``create`` is set."""
+        now = timezone.now()
+        for user_id in set(user_ids):
+            if cls.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now):
+                continue
+            if create:
+                _, created = cls.objects.get_or_create(user_id=user_id, defaults={'version': 1, 'updated_at': now})
+                if not created:
+                    # Another request created the row in the meantime
+                    cls.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now)
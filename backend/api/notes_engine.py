@@ -0,0 +1,322 @@
+"""
+Map-reduce note generation for long transcripts.
+
+Short transcripts are summarized with a single prompt. Longer ones are split
+into chunks that fit ``NOTES_CHUNK_TOKENS`` on sentence (or caption timestamp)
+boundaries, each chunk is summarized concurrently, and a reduce pass merges
+the section notes into one hierarchy. Every model call is cached by prompt in
+the Django cache, and chunk results are also saved on the run's checkpoint
+(``NoteJob.checkpoint`` for jobs), so a retried job does not pay again for
+chunks that already succeeded, even in another process or after a restart.
+
+The rounds are planned once (``notes_prompts``); ``generate_notes`` runs them
+on a thread pool and ``generate_notes_async`` as coroutines.
+"""
+import asyncio
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+NOTES_GUIDELINES = """The notes should:
+        1. Have a clear, hierarchical structure with headings and subheadings
+        2. Include key concepts, ideas, and important information
+        3. Be organized in a logical manner that makes the content easy to understand and review
+        4. Use bullet points for detailed information under each section
+        5. Be written in a clear, concise academic style"""
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def _split_long_unit(unit, max_tokens):
+    """Split a single sentence that exceeds the budget on word boundaries."""
+    words = unit.split()
+    max_chars = max_tokens * 4
+    pieces, current, length = [], [], 0
+    for word in words:
+        if current and length + len(word) + 1 > max_chars:
+            pieces.append(' '.join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def _group_units(units, max_tokens):
+    """Greedily group text units so each group has at most ``max_tokens``."""
+    groups, current, current_tokens = [], [], 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _pack_units(units, max_tokens):
+    """Greedily pack text units into chunks of at most ``max_tokens``."""
+    return [' '.join(group) for group in _group_units(units, max_tokens)]
+
+
+def split_transcript(transcript, max_tokens=None):
+    """Split transcript text into chunks on sentence boundaries."""
+    max_tokens = max_tokens or settings.NOTES_CHUNK_TOKENS
+    units = []
+    for sentence in SENTENCE_END_RE.split(transcript.strip()):
+        if estimate_tokens(sentence) > max_tokens:
+            # Unpunctuated text (e.g. auto captions) comes through as one huge "sentence"
+            units.extend(_split_long_unit(sentence, max_tokens))
+        elif sentence:
+            units.append(sentence)
+    return _pack_units(units, max_tokens)
+
+
+def _format_timestamp(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def split_segments(segments, max_tokens=None):
+    """Split timestamped caption segments into chunks on segment boundaries.
+
+    Each chunk is prefixed with the time range it covers so section notes can
+    reference where in the video they come from.
+    """
+    max_tokens = max_tokens or settings.NOTES_CHUNK_TOKENS
+    chunks, current, current_tokens = [], [], 0
+
+    def flush():
+        start, end = current[0].start, current[-1].end
+        text = ' '.join(segment.text for segment in current)
+        chunks.append(f"[{_format_timestamp(start)} - {_format_timestamp(end)}] {text}")
+
+    for segment in segments:
+        segment_tokens = estimate_tokens(segment.text)
+        if current and current_tokens + segment_tokens > max_tokens:
+            flush()
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += segment_tokens
+    if current:
+        flush()
+    return chunks
+
+
+def build_notes_prompt(transcript, title):
+    return f"""You are an expert note-taker. Create comprehensive, organized notes from the following transcript of a YouTube video titled: "{title}".
+
+        {NOTES_GUIDELINES}
+
+    Transcript:
+    {transcript}
+    """
+
+
+def build_chunk_prompt(chunk, title, index, total):
+    return f"""You are an expert note-taker. The following is part {index} of {total} of the transcript of a YouTube video titled: "{title}".
+
+        Write detailed notes for this part only. Use headings for the topics it covers and bullet points
+        for key concepts, definitions, examples and important information. Do not add an introduction
+        or conclusion for the whole video.
+
+    Transcript part {index}:
+    {chunk}
+    """
+
+
+def build_reduce_prompt(section_notes, title):
+    sections = '\n\n'.join(
+        f"--- Section {index} ---\n{notes}" for index, notes in enumerate(section_notes, start=1)
+    )
+    return f"""You are an expert note-taker. Below are notes taken on consecutive sections of a YouTube video titled: "{title}".
+        Merge them into one comprehensive, organized set of notes for the whole video, removing repetition
+        and keeping every important detail.
+
+        {NOTES_GUIDELINES}
+
+    Section notes:
+    {sections}
+    """
+
+
+def _cache_key(prompt, namespace):
+    return 'notes-gen:' + hashlib.sha256(f"{namespace}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+def cached_generate(generate, prompt, namespace='', checkpoint=None):
+    """Call ``generate(prompt)`` unless the same prompt already produced a result.
+
+    Results are read from and saved to ``checkpoint`` as well as the cache.
+    """
+    key = _cache_key(prompt, namespace)
+    result = checkpoint.chunk_result(key) if checkpoint is not None else None
+    if result is None:
+        result = cache.get(key)
+    if result is None:
+        result = generate(prompt)
+        cache.set(key, result, settings.NOTES_CHUNK_CACHE_TTL)
+    if checkpoint is not None and checkpoint.chunk_result(key) is None:
+        checkpoint.save_chunk_result(key, result)
+    return result
+
+
+def cached_stream(stream_generate, prompt, namespace=''):
+    """Stream ``stream_generate(prompt)``, or replay the cached result for the same prompt."""
+    key = _cache_key(prompt, namespace)
+    result = cache.get(key)
+    if result is not None:
+        yield result
+        return
+    parts = []
+    for text in stream_generate(prompt):
+        parts.append(text)
+        yield text
+    cache.set(key, ''.join(parts), settings.NOTES_CHUNK_CACHE_TTL)
+
+
+def _map(items, fn):
+    """Apply ``fn`` to every item concurrently, keeping order."""
+    with ThreadPoolExecutor(max_workers=settings.NOTES_MAP_CONCURRENCY, thread_name_prefix='notes-map') as pool:
+        return list(pool.map(fn, items))
+
+
+def notes_prompts(transcript, title, segments=None):
+    """The map-reduce plan for a transcript, shared by the sync and async engines.
+
+    Yields lists of prompts that can run concurrently and receives their
+    results (in order) back from the caller; returns the final prompt, whose
+    result is the notes. Short transcripts go straight to one prompt.
+    """
+    if estimate_tokens(transcript) <= settings.NOTES_CHUNK_TOKENS:
+        return build_notes_prompt(transcript, title)
+
+    chunks = split_segments(segments) if segments else split_transcript(transcript)
+    print(f"Generating notes in {len(chunks)} chunks")
+    section_notes = yield [
+        build_chunk_prompt(chunk, title, index, len(chunks)) for index, chunk in enumerate(chunks, start=1)
+    ]
+    # Pre-merge section notes until they fit in one reduce prompt
+    while True:
+        groups = _group_units(section_notes, settings.NOTES_CHUNK_TOKENS)
+        if len(groups) == 1 or len(groups) == len(section_notes):
+            # Everything fits, or grouping can't shrink the input any further
+            return build_reduce_prompt(section_notes, title)
+        section_notes = yield [build_reduce_prompt(group, title) for group in groups]
+
+
+def _final_prompt(transcript, title, generate, segments, namespace, checkpoint):
+    """Run every round of the plan but the last and return the final prompt."""
+    plan = notes_prompts(transcript, title, segments)
+    try:
+        prompts = next(plan)
+        while True:
+            prompts = plan.send(_map(prompts, lambda prompt: cached_generate(generate, prompt, namespace, checkpoint)))
+    except StopIteration as stop:
+        return stop.value
+
+
+def generate_notes(transcript, title, generate, segments=None, namespace='', checkpoint=None):
+    """Generate notes for a transcript with ``generate(prompt) -> text``.
+
+    ``segments`` (timestamped caption segments) are used for chunk boundaries
+    when available, and ``namespace`` (the model/prompt version) keys the cache.
+    Chunk results are kept on ``checkpoint`` (the final notes are the
+    pipeline's own ``notes`` stage). Exceptions from ``generate`` propagate
+    to the caller.
+    """
+    prompt = _final_prompt(transcript, title, generate, segments, namespace, checkpoint)
+    return cached_generate(generate, prompt, namespace)
+
+
+def stream_notes(transcript, title, generate, stream_generate, segments=None, namespace='', checkpoint=None):
+    """Like ``generate_notes`` but yields the final generation as it streams.
+
+    For long transcripts the chunk summaries are produced first (not streamed)
+    and only the final reduce pass is streamed.
+    """
+    prompt = _final_prompt(transcript, title, generate, segments, namespace, checkpoint)
+    yield from cached_stream(stream_generate, prompt, namespace)
+
+
+async def cached_generate_async(generate, prompt, namespace='', checkpoint=None):
+    """Async ``cached_generate`` for ``await generate(prompt)``."""
+    from .async_pipeline import database
+
+    key = _cache_key(prompt, namespace)
+    result = checkpoint.chunk_result(key) if checkpoint is not None else None
+    if result is None:
+        result = await cache.aget(key)
+    if result is None:
+        result = await generate(prompt)
+        await cache.aset(key, result, settings.NOTES_CHUNK_CACHE_TTL)
+    if checkpoint is not None and checkpoint.chunk_result(key) is None:
+        await database(checkpoint.save_chunk_result)(key, result)
+    return result
+
+
+async def cached_stream_async(stream_generate, prompt, namespace=''):
+    """Async ``cached_stream`` for an async iterator ``stream_generate(prompt)``."""
+    key = _cache_key(prompt, namespace)
+    result = await cache.aget(key)
+    if result is not None:
+        yield result
+        return
+    parts = []
+    async for text in stream_generate(prompt):
+        parts.append(text)
+        yield text
+    await cache.aset(key, ''.join(parts), settings.NOTES_CHUNK_CACHE_TTL)
+
+
+async def _map_async(items, fn):
+    """Await ``fn`` on every item with at most ``NOTES_MAP_CONCURRENCY`` in flight, keeping order."""
+    semaphore = asyncio.Semaphore(settings.NOTES_MAP_CONCURRENCY)
+
+    async def bounded(item):
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(bounded(item) for item in items))
+
+
+async def _final_prompt_async(transcript, title, generate, segments, namespace, checkpoint):
+    """``_final_prompt`` with ``generate`` a coroutine function."""
+    plan = notes_prompts(transcript, title, segments)
+    try:
+        prompts = next(plan)
+        while True:
+            results = await _map_async(
+                prompts, lambda prompt: cached_generate_async(generate, prompt, namespace, checkpoint)
+            )
+            prompts = plan.send(list(results))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def generate_notes_async(transcript, title, generate, segments=None, namespace='', checkpoint=None):
+    """Like ``generate_notes`` with ``generate`` a coroutine function."""
+    prompt = await _final_prompt_async(transcript, title, generate, segments, namespace, checkpoint)
+    return await cached_generate_async(generate, prompt, namespace)
+
+
+async def stream_notes_async(transcript, title, generate, stream_generate, segments=None, namespace='',
+                             checkpoint=None):
+    """Like ``stream_notes`` with ``generate`` a coroutine function and ``stream_generate`` an async iterator."""
+    prompt = await _final_prompt_async(transcript, title, generate, segments, namespace, checkpoint)
+    async for text in cached_stream_async(stream_generate, prompt, namespace):
+        yield text
@@ -0,0 +1,106 @@
+"""
+Keyset (cursor) pagination for the notes list.
+
+Pages are ordered newest first by ``(created_at, id)`` and each page is fetched
+with ``WHERE (created_at, id) < (cursor)`` rather than an OFFSET, so with the
+``(user, -created_at, -id)`` index every page costs the same no matter how deep
+into a large library it is.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, pk):
+    payload = json.dumps({'t': created_at.isoformat(), 'i': pk}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, id)`` from a cursor, raising NotFound if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = parse_datetime(payload['t'])
+        pk = int(payload['i'])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise NotFound('Invalid cursor')
+    if created_at is None:
+        raise NotFound('Invalid cursor')
+    return created_at, pk
+
+
+class NotesCursorPagination(BasePagination):
+    """Newest-first pagination on ``(created_at, id)`` with an opaque ``cursor`` query parameter.
+
+    Works on model querysets and on ``.values()`` querysets that include
+    ``id`` and ``created_at``. Responses look like
+    ``{"next": <url or null>, "results": [...]}``; page size
+    defaults to ``NOTES_PAGE_SIZE`` and can be lowered or raised (up to
+    ``MAX_PAGE_SIZE``) with ``?page_size=``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.NOTES_PAGE_SIZE))
+        except (TypeError, ValueError):
+            page_size = settings.NOTES_PAGE_SIZE
+        return max(1, min(page_size, MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            # The plain created_at bound lets the index range scan start at the cursor
+            queryset = queryset.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            )
+
+        # One extra row tells us whether there is a next page without a COUNT(*)
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        if isinstance(last, dict):
+            # .values() rows from the fast read path
+            created_at, pk = last['created_at'], last['id']
+        else:
+            created_at, pk = last.created_at, last.pk
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = encode_cursor(created_at, pk)
+        return self.request.build_absolute_uri(f"{self.request.path}?{params.urlencode()}")
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,45 @@
+"""
+Serializer-free read path for notes.
+
+Rows are fetched with ``.values()`` and returned as plain dicts, skipping
+ModelSerializer's per-field introspection; output matches VideoNotesSerializer
+/ VideoNotesListSerializer for the same fields. Clients can ask for a sparse
+fieldset with ``?fields=id,youtube_title``.
+"""
+from rest_framework.exceptions import ValidationError
+
+from .fields import CompressedValue, decompress_text
+from .models import VideoNotes
+from .serializers import VideoNotesSerializer
+
+NOTE_LIST_FIELDS = list(VideoNotes.LIST_FIELDS)
+NOTE_DETAIL_FIELDS = list(VideoNotesSerializer.Meta.fields)
+
+
+def requested_fields(request, allowed):
+    """Fields named in ``?fields=`` (in the order given), or all ``allowed`` fields."""
+    raw = request.query_params.get('fields')
+    if not raw:
+        return list(allowed)
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown or not fields:
+        raise ValidationError({
+            'fields': f"Unknown field(s): {', '.join(unknown) or raw}. Allowed: {', '.join(allowed)}"
+        })
+    return fields
+
+
+def project_row(row, fields):
+    """Pick ``fields`` from a ``.values()`` row, decompressing stored text bodies."""
+    out = {}
+    for name in fields:
+        value = row[name]
+        if isinstance(value, CompressedValue):
+            value = decompress_text(value)
+        out[name] = value
+    return out
+
+
+def project_rows(rows, fields):
+    return [project_row(row, fields) for row in rows]
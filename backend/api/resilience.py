@@ -0,0 +1,260 @@
+"""
+Timeouts, retries and circuit breakers for the external providers.
+
+Every network call to YouTube (yt-dlp), Cloudinary, AssemblyAI and Gemini
+goes through ``call`` (or ``acall`` from async code) with the provider's name:
+
+* **Timeouts** - each provider's client is given ``<PROVIDER>_TIMEOUT``
+  seconds (``provider_timeout``); for yt-dlp, Cloudinary and the HTTP clients
+  that bounds each network operation, so a stalled connection fails instead of
+  holding a worker forever, while a long download that keeps moving finishes.
+* **Retries** - rate limits (HTTP 429), 5xx responses, timeouts and dropped
+  connections are retried up to ``PROVIDER_RETRY_ATTEMPTS`` times in all, after
+  a jittered exponential delay (at least the server's ``Retry-After``). Other
+  errors (a private video, a bad request) are raised straight away.
+* **Circuit breakers** - after ``CIRCUIT_BREAKER_FAILURES`` retryable failures
+  in a row a provider's breaker opens and calls fail fast with
+  ``CircuitOpenError`` for ``CIRCUIT_BREAKER_RESET`` seconds; then one trial
+  call is let through and its outcome closes or re-opens the breaker.
+
+Wrap single requests rather than whole stages, so a retry repeats one request
+(e.g. a poll of an AssemblyAI transcript) and not the work before it.
+Breakers are per process. Retries and breaker states are exported as the
+``ytnotes_provider_retries_total`` and ``ytnotes_circuit_breaker_state``
+metrics.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import PROVIDER_RETRIES, CIRCUIT_BREAKER_STATE, CIRCUIT_BREAKER_REJECTIONS
+
+PROVIDER_NAMES = {
+    'youtube': 'YouTube',
+    'cloudinary': 'Cloudinary',
+    'assemblyai': 'AssemblyAI',
+    'gemini': 'Gemini',
+    'google': 'Google',
+}
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Exception classes (matched by name, so no provider SDK has to be imported here)
+# raised for timeouts, dropped connections and server-side overload
+RETRYABLE_ERROR_NAMES = {
+    'TimeoutError', 'ConnectionError', 'TimeoutException', 'TransportError',
+    'RemoteProtocolError', 'IncompleteRead', 'ProtocolError',
+    'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'TooManyRequests',
+}
+
+# yt-dlp and Cloudinary report HTTP failures only in the message
+RETRYABLE_MESSAGE = re.compile(
+    r'(?:HTTP Error|status code|Error)[: ]+(?:408|429|5\d\d)\b|too many requests|rate.?limit'
+    r'|timed out|temporarily unavailable|service unavailable|connection (?:reset|aborted|refused)',
+    re.IGNORECASE
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+    def __init__(self, provider, retry_in):
+        self.provider = provider
+        self.retry_in = retry_in
+        super().__init__(
+            f"{PROVIDER_NAMES.get(provider, provider)} is unavailable after repeated failures; "
+            f"try again in {max(int(retry_in), 1)} seconds"
+        )
+
+
+def provider_timeout(provider):
+    """The configured timeout (seconds) for one of ``provider``'s calls."""
+    return getattr(settings, f"{provider.upper()}_TIMEOUT")
+
+
+def _status_code(exc):
+    for code in (getattr(exc, 'status_code', None), getattr(getattr(exc, 'response', None), 'status_code', None),
+                 getattr(exc, 'code', None)):
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def _causes(exc):
+    """The exception and the ones it was raised from (yt-dlp wraps the real error)."""
+    seen = set()
+    while exc is not None and id(exc) not in seen and len(seen) < 5:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def is_retryable(exc):
+    """True for errors a later attempt may not hit: rate limits, 5xx, timeouts, dropped connections."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    for error in _causes(exc):
+        code = _status_code(error)
+        if code is not None:
+            return code in RETRYABLE_STATUS_CODES
+        if any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__):
+            return True
+        if RETRYABLE_MESSAGE.search(str(error)):
+            return True
+    return False
+
+
+def retry_delay(attempt, exc=None):
+    """Seconds to wait before retry number ``attempt`` (1-based): exponential with jitter, capped."""
+    ceiling = min(settings.PROVIDER_RETRY_MAX_DELAY, settings.PROVIDER_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    # "Equal jitter": at least half the backoff, so retries don't bunch up at zero
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    if headers is not None:
+        try:
+            delay = max(delay, float(headers.get('retry-after')))
+        except (TypeError, ValueError):
+            pass
+    return min(delay, settings.PROVIDER_RETRY_MAX_DELAY)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider (closed -> open -> half-open)."""
+
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+
+    # Values of the ytnotes_circuit_breaker_state gauge
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, provider):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        CIRCUIT_BREAKER_STATE.set(0, provider=provider)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            print(f"Circuit breaker for {PROVIDER_NAMES.get(self.provider, self.provider)}: {self._state} -> {state}")
+        self._state = state
+        CIRCUIT_BREAKER_STATE.set(self.STATE_VALUES[state], provider=self.provider)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead now."""
+        with self._lock:
+            if self._state == self.OPEN:
+                retry_in = self._opened_at + settings.CIRCUIT_BREAKER_RESET - time.monotonic()
+                if retry_in > 0:
+                    CIRCUIT_BREAKER_REJECTIONS.inc(provider=self.provider)
+                    raise CircuitOpenError(self.provider, retry_in)
+                self._set_state(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN:
+                # One trial call at a time decides whether the provider is back
+                if self._probing:
+                    CIRCUIT_BREAKER_REJECTIONS.inc(provider=self.provider)
+                    raise CircuitOpenError(self.provider, 1)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= settings.CIRCUIT_BREAKER_FAILURES:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def release(self):
+        """Forget an interrupted call (e.g. a cancelled coroutine) without judging the provider."""
+        with self._lock:
+            self._probing = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider)
+        return breaker
+
+
+def _settle(provider, breaker, exc, attempt):
+    """Record a failed attempt; return the delay before the next one, or None to give up."""
+    retryable = is_retryable(exc)
+    if retryable:
+        breaker.record_failure()
+    else:
+        # The provider answered; the request itself was bad
+        breaker.record_success()
+    if not retryable or attempt >= settings.PROVIDER_RETRY_ATTEMPTS:
+        return None
+    delay = retry_delay(attempt, exc)
+    PROVIDER_RETRIES.inc(provider=provider, error=type(exc).__name__)
+    print(f"{PROVIDER_NAMES.get(provider, provider)} call failed ({str(exc)[:200]}), retrying in {delay:.1f}s")
+    return delay
+
+
+def call(provider, fn, *args, **kwargs):
+    """Call ``fn(*args, **kwargs)`` through ``provider``'s circuit breaker, retrying transient errors."""
+    breaker = get_breaker(provider)
+    attempt = 1
+    while True:
+        breaker.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            delay = _settle(provider, breaker, e, attempt)
+            if delay is None:
+                raise
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
+        time.sleep(delay)
+        attempt += 1
+
+
+async def acall(provider, fn, *args, **kwargs):
+    """``call`` for coroutine functions: awaits a fresh ``fn(*args, **kwargs)`` per attempt."""
+    breaker = get_breaker(provider)
+    attempt = 1
+    while True:
+        breaker.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            delay = _settle(provider, breaker, e, attempt)
+            if delay is None:
+                raise
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,229 @@
+"""
+Fair sharing of the job workers between users.
+
+Handing jobs straight to the worker pool is first come, first served: a user
+who queues a few playlists keeps every worker busy and someone submitting one
+video waits behind all of it. The scheduler keeps a queue per user instead
+and gives each free worker slot out by deficit round robin (DRR):
+
+* every backlogged user earns ``NOTE_SCHEDULER_QUANTUM`` seconds of video per
+  round, and their next job starts once that credit covers its cost;
+* a job costs the duration of its video, so ten 10-minute lectures use the
+  same share as one 100-minute lecture;
+* no user has more than ``NOTE_SCHEDULER_USER_CONCURRENCY`` jobs running.
+
+A user who joins the round (nothing queued) starts with credit for their
+first job, so a single video starts on that user's first turn: after at most
+one job per backlogged user, however long their backlogs are.
+
+Durations come from playlist listings and metadata extraction
+(``record_duration``); a video that hasn't been seen yet is charged
+``NOTE_SCHEDULER_DEFAULT_COST`` and the user's credit is settled against the
+real duration when the job finishes.
+
+``NOTE_SCHEDULER = 'fifo'`` restores first come, first served (one shared
+queue, no per-user cap). Scheduling is per process: it orders the jobs this
+process runs, for the ``thread`` and ``async`` backends and for each
+``process_note_jobs`` worker.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+from .metrics import JOBS_QUEUED, JOB_QUEUE_WAIT
+from .metadata import parse_video_id
+
+# Most video durations remembered for cost estimates
+DURATION_CACHE_SIZE = 10000
+
+_durations = OrderedDict()
+_durations_lock = threading.Lock()
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def record_duration(video_id, seconds):
+    """Remember a video's duration (seconds) so its jobs are charged what they cost."""
+    if not video_id or not seconds:
+        return
+    with _durations_lock:
+        _durations[video_id] = seconds
+        _durations.move_to_end(video_id)
+        while len(_durations) > DURATION_CACHE_SIZE:
+            _durations.popitem(last=False)
+
+
+def known_duration(video_id):
+    with _durations_lock:
+        return _durations.get(video_id)
+
+
+def job_cost(link):
+    """Estimated cost of a job in seconds of video."""
+    return known_duration(parse_video_id(link)) or settings.NOTE_SCHEDULER_DEFAULT_COST
+
+
+@dataclass
+class ScheduledJob:
+    job_id: int
+    user_id: int
+    cost: float
+    kind: str
+    video_id: str = ''
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class FairScheduler:
+    """Start at most ``capacity`` jobs at once through ``dispatch``, sharing the slots fairly between users.
+
+    ``dispatch(job_id)`` must return a ``concurrent.futures.Future`` that
+    completes when the job is done.
+    """
+
+    def __init__(self, capacity, dispatch, fair=True, user_concurrency=None, quantum=None):
+        self.capacity = capacity
+        self.dispatch = dispatch
+        self.fair = fair
+        self.user_concurrency = user_concurrency or settings.NOTE_SCHEDULER_USER_CONCURRENCY
+        self.quantum = quantum or settings.NOTE_SCHEDULER_QUANTUM
+        self._lock = threading.Lock()
+        self._queues = {}       # queue key -> deque of ScheduledJob
+        self._ring = deque()    # keys of non-empty queues, in round-robin order
+        self._deficit = {}      # queue key -> unspent credit, in seconds of video
+        self._running = {}      # user id -> jobs running
+        self._jobs = {}         # job id -> ScheduledJob, queued or running
+        self._in_flight = 0
+
+    def __contains__(self, job_id):
+        with self._lock:
+            return job_id in self._jobs
+
+    def job_ids(self):
+        """Ids of the jobs queued or running here."""
+        with self._lock:
+            return list(self._jobs)
+
+    def submit(self, job_id, user_id, cost, kind='single', video_id=''):
+        """Queue a job. Returns False if it is already queued or running."""
+        entry = ScheduledJob(job_id, user_id, max(float(cost), 1.0), kind, video_id)
+        with self._lock:
+            if job_id in self._jobs:
+                return False
+            self._jobs[job_id] = entry
+            key = self._key(user_id)
+            queue = self._queues.get(key)
+            if queue is None:
+                # A user joining the round gets credit for their first job, so a
+                # single video is started on their first turn
+                queue = self._queues[key] = deque()
+                self._ring.append(key)
+                self._deficit[key] = entry.cost
+            queue.append(entry)
+            JOBS_QUEUED.inc()
+        self._pump()
+        return True
+
+    def _key(self, user_id):
+        return user_id if self.fair else None
+
+    def _pick(self):
+        """Remove and return the next job to start, or None. Call with the lock held."""
+        if self._in_flight >= self.capacity:
+            return None
+        while self._ring:
+            eligible = False
+            # One pass visits every backlogged queue once; repeat until a job's cost is covered
+            for _ in range(len(self._ring)):
+                key = self._ring[0]
+                queue = self._queues[key]
+                if self.fair and self._running.get(key, 0) >= self.user_concurrency:
+                    self._ring.rotate(-1)
+                    continue
+                eligible = True
+                head = queue[0]
+                if not self.fair or self._deficit[key] >= head.cost:
+                    queue.popleft()
+                    if not queue:
+                        # Unspent credit isn't kept once the user's queue is empty, as in DRR
+                        del self._queues[key], self._deficit[key]
+                        self._ring.popleft()
+                    else:
+                        self._deficit[key] -= head.cost
+                    return head
+                self._deficit[key] += self.quantum
+                self._ring.rotate(-1)
+            if not eligible:
+                return None
+        return None
+
+    def _pump(self):
+        """Start queued jobs while there are free slots."""
+        while True:
+            with self._lock:
+                entry = self._pick()
+                if entry is None:
+                    return
+                self._in_flight += 1
+                self._running[entry.user_id] = self._running.get(entry.user_id, 0) + 1
+            JOBS_QUEUED.dec()
+            JOB_QUEUE_WAIT.observe(time.monotonic() - entry.queued_at, kind=entry.kind)
+            try:
+                future = self.dispatch(entry.job_id)
+            except Exception as e:
+                print(f"Could not start note job {entry.job_id}: {str(e)}")
+                self._finished(entry, pump=False)
+                continue
+            future.add_done_callback(lambda _, entry=entry: self._finished(entry))
+
+    def _finished(self, entry, pump=True):
+        actual = known_duration(entry.video_id)
+        with self._lock:
+            self._in_flight -= 1
+            self._jobs.pop(entry.job_id, None)
+            running = self._running.get(entry.user_id, 0) - 1
+            if running > 0:
+                self._running[entry.user_id] = running
+            else:
+                self._running.pop(entry.user_id, None)
+            key = self._key(entry.user_id)
+            if actual and key in self._deficit:
+                # Settle the estimate against the duration the metadata reported
+                self._deficit[key] += entry.cost - actual
+        if pump:
+            self._pump()
+
+
+def get_scheduler():
+    """Return this process's scheduler for the configured job backend."""
+    backend = settings.NOTE_JOB_BACKEND
+    with _schedulers_lock:
+        scheduler = _schedulers.get(backend)
+        if scheduler is None:
+            if backend == 'async':
+                from .async_pipeline import submit_job
+                capacity, dispatch = settings.NOTE_JOB_ASYNC_CONCURRENCY, submit_job
+            else:
+                from .jobs import get_executor, run_job
+                capacity = settings.NOTE_JOB_WORKERS
+
+                def dispatch(job_id):
+                    return get_executor().submit(run_job, job_id)
+            scheduler = _schedulers[backend] = FairScheduler(
+                capacity, dispatch, fair=settings.NOTE_SCHEDULER != 'fifo'
+            )
+        return scheduler
+
+
+def schedule_job(job):
+    """Queue a pending ``NoteJob`` on this process's scheduler."""
+    video_id = parse_video_id(job.youtube_link) or ''
+    return get_scheduler().submit(
+        job.pk,
+        job.user_id,
+        job_cost(job.youtube_link),
+        kind='batch' if job.batch_id else 'single',
+        video_id=video_id
+    )
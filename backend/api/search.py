@@ -0,0 +1,242 @@
+"""
+Full-text search over a user's notes and transcripts.
+
+The index lives in a side table so list and detail queries never touch it:
+
+* PostgreSQL: ``api_notes_search`` with a weighted ``tsvector`` (title > notes >
+  transcript) and a GIN index, queried with ``websearch_to_tsquery`` and
+  ranked with ``ts_rank_cd``. Snippets are cut in Python from the (compressed)
+  note bodies of the returned page only.
+* SQLite: a contentless FTS5 table ``api_notes_fts`` (``content=''``), ranked
+  with ``bm25`` and joined to ``api_videonotes`` for the owner. It keeps only
+  the index, so snippets are cut in Python as for PostgreSQL. A contentless
+  row can only be removed by handing FTS5 the text it was indexed with, so
+  notes are unindexed *before* a save or delete changes them.
+
+Rows are written from the VideoNotes save/delete signals (see signals.py). The tables
+are created and backfilled by migrations, which keep their own copy of the DDL.
+Other database backends fall back to an unindexed scan in Python.
+
+Snippets are HTML-escaped with matches wrapped in ``<mark>``.
+"""
+import html
+import re
+
+from django.db import connection, connections
+
+from .models import VideoNotes
+
+PG_TABLE = 'api_notes_search'
+FTS_TABLE = 'api_notes_fts'
+
+# Keeps to_tsvector below PostgreSQL's 1 MB tsvector limit for very long transcripts
+MAX_DOCUMENT_CHARS = 500000
+
+SNIPPET_WORDS = 24
+# Private-use characters mark matches so the text can be escaped before adding <mark> tags
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+_ELLIPSIS = '…'
+
+SEARCH_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+WORD_RE = re.compile(r'\S+')
+
+
+def search_backend():
+    """Return 'postgresql', 'sqlite' or None for the default database."""
+    if connection.vendor in ('postgresql', 'sqlite'):
+        return connection.vendor
+    return None
+
+
+# Index maintenance
+
+def _clip(text):
+    return (text or '')[:MAX_DOCUMENT_CHARS]
+
+
+def _indexed_text(note):
+    return _clip(note.youtube_title), _clip(note.notes_content), _clip(note.transcription)
+
+
+def index_note(note, using=None):
+    """Insert or refresh the search row for a note (after ``unindex_note`` on SQLite)."""
+    conn = connections[using] if using else connection
+    title, notes, transcription = _indexed_text(note)
+
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"""
+                INSERT INTO {PG_TABLE} (note_id, user_id, document)
+                VALUES (
+                    %s, %s,
+                    setweight(to_tsvector('english', %s), 'A') ||
+                    setweight(to_tsvector('english', %s), 'B') ||
+                    setweight(to_tsvector('english', %s), 'C')
+                )
+                ON CONFLICT (note_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document
+            """, [note.pk, note.user_id, title, notes, transcription])
+        elif conn.vendor == 'sqlite':
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, notes, transcription) VALUES (%s, %s, %s, %s)",
+                [note.pk, title, notes, transcription]
+            )
+
+
+def unindex_note(note_id, using=None):
+    """Remove a note's search row; on SQLite, call it while the stored note is still the indexed one."""
+    conn = connections[using] if using else connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"DELETE FROM {PG_TABLE} WHERE note_id = %s", [note_id])
+        elif conn.vendor == 'sqlite':
+            cursor.execute(f"SELECT 1 FROM {FTS_TABLE} WHERE rowid = %s", [note_id])
+            if cursor.fetchone() is None:
+                return
+            fields = ['pk', 'youtube_title', 'notes_content', 'transcription']
+            note = VideoNotes.objects.using(conn.alias).only(*fields).filter(pk=note_id).first()
+            if note is None:
+                return
+            # Contentless FTS5 deletes by un-counting the tokens of the text the row was indexed with
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, notes, transcription) VALUES ('delete', %s, %s, %s, %s)",
+                [note_id, *_indexed_text(note)]
+            )
+
+
+# Querying
+
+def format_snippet(text):
+    """HTML-escape a snippet and turn the match markers into <mark> tags."""
+    if not text:
+        return ''
+    escaped = html.escape(text)
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_terms(query):
+    return SEARCH_TERM_RE.findall(query or '')
+
+
+def _fts5_query(query):
+    # Quote every term so user input can't use (or break) FTS5 query syntax
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in search_terms(query))
+
+
+def make_snippet(text, terms, words=SNIPPET_WORDS):
+    """Cut a window of ``words`` words around the first match, with matches between markers.
+
+    Words are matched by prefix so simple inflections ("optimizer" / "optimizers")
+    are highlighted too.
+    """
+    if not text:
+        return ''
+    prefixes = tuple(term.lower() for term in terms)
+    tokens = WORD_RE.findall(text)
+
+    def matches(token):
+        return ''.join(SEARCH_TERM_RE.findall(token)).lower().startswith(prefixes)
+
+    first = next((index for index, token in enumerate(tokens) if matches(token)), None)
+    if first is None:
+        return ''
+    start = max(0, first - words // 3)
+    window = tokens[start:start + words]
+    marked = ' '.join(f"{_MARK_START}{token}{_MARK_END}" if matches(token) else token for token in window)
+    prefix = _ELLIPSIS + ' ' if start > 0 else ''
+    suffix = ' ' + _ELLIPSIS if start + words < len(tokens) else ''
+    return prefix + marked + suffix
+
+
+def _python_snippets(query, hits):
+    """Fill in snippets for ``(note_id, rank)`` hits from the (compressed) note bodies."""
+    terms = search_terms(query)
+    bodies = VideoNotes.objects.filter(pk__in=[note_id for note_id, _ in hits]).only('pk', 'notes_content', 'transcription')
+    bodies = {note.pk: note for note in bodies}
+    results = []
+    for note_id, rank in hits:
+        note = bodies.get(note_id)
+        if note is None:
+            continue
+        results.append((note_id, rank, make_snippet(note.notes_content, terms), make_snippet(note.transcription, terms)))
+    return results
+
+
+def _search_postgresql(user_id, query, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT s.note_id, ts_rank_cd(s.document, q) AS rank
+            FROM {PG_TABLE} s, websearch_to_tsquery('english', %s) q
+            WHERE s.user_id = %s AND s.document @@ q
+            ORDER BY rank DESC, s.note_id DESC
+            LIMIT %s
+        """, [query, user_id, limit])
+        rows = cursor.fetchall()
+    # The note bodies are stored compressed, so snippets are cut in Python for just this page of hits
+    return _python_snippets(query, [(note_id, float(rank)) for note_id, rank in rows])
+
+
+def _search_sqlite(user_id, query, limit):
+    match = _fts5_query(query)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        # bm25 weights per column: title, notes, transcription
+        cursor.execute(f"""
+            SELECT {FTS_TABLE}.rowid, bm25({FTS_TABLE}, 10.0, 4.0, 1.0) AS rank
+            FROM {FTS_TABLE}
+            JOIN api_videonotes n ON n.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND n.user_id = %s
+            ORDER BY rank
+            LIMIT %s
+        """, [match, user_id, limit])
+        rows = cursor.fetchall()
+    # bm25 is "lower is better"; flip the sign so callers always sort rank descending
+    return _python_snippets(query, [(note_id, -float(rank)) for note_id, rank in rows])
+
+
+def _search_fallback(user_id, query, limit):
+    # No index on this backend and the bodies are compressed, so scan the user's notes in Python
+    terms = [term.lower() for term in search_terms(query)]
+    hits = []
+    notes = VideoNotes.objects.filter(user_id=user_id).only('pk', 'youtube_title', 'notes_content', 'transcription')
+    for note in notes.iterator(chunk_size=200):
+        haystack = ' '.join([note.youtube_title, note.notes_content or '', note.transcription or '']).lower()
+        if all(term in haystack for term in terms):
+            hits.append((note.pk, 0.0))
+            if len(hits) >= limit:
+                break
+    return _python_snippets(query, hits)
+
+
+def search_notes(user, query, limit=20):
+    """Search a user's notes.
+
+    Returns a list of dicts, best match first, with the note's list fields plus
+    ``rank``, ``notes_snippet`` and ``transcription_snippet``.
+    """
+    if not search_terms(query):
+        return []
+    backend = search_backend()
+    if backend == 'postgresql':
+        hits = _search_postgresql(user.pk, query, limit)
+    elif backend == 'sqlite':
+        hits = _search_sqlite(user.pk, query, limit)
+    else:
+        hits = _search_fallback(user.pk, query, limit)
+
+    notes = VideoNotes.objects.filter(user=user, pk__in=[hit[0] for hit in hits]).only(*VideoNotes.LIST_FIELDS)
+    notes_by_id = {note.pk: note for note in notes}
+    results = []
+    for note_id, rank, notes_snippet, transcription_snippet in hits:
+        note = notes_by_id.get(note_id)
+        if note is None:
+            continue
+        results.append({
+            'note': note,
+            'rank': rank,
+            'notes_snippet': format_snippet(notes_snippet),
+            'transcription_snippet': format_snippet(transcription_snippet),
+        })
+    return results
@@ -0,0 +1,242 @@
+"""
+Segmented transcription: long audio transcribed in parallel pieces.
+
+AssemblyAI takes time proportional to the length of what it is sent, so one
+file per video means wall time grows with the video. With
+``TRANSCRIBE_SEGMENTS`` above 1, a local audio file is instead:
+
+1. split into up to that many segments (none shorter than
+   ``MIN_SEGMENT_SECONDS``), each cut at the quietest point within
+   ``CUT_SEARCH_SECONDS`` of the even split, so cuts fall in pauses rather
+   than mid-word;
+2. widened by ``TRANSCRIBE_SEGMENT_OVERLAP`` seconds around every cut, so a
+   word the cut clips is heard whole by at least one side;
+3. transcribed concurrently, with word timestamps;
+4. stitched: each segment's words are moved to the file's timeline, and the
+   overlap is resolved by aligning the words both sides heard (same word,
+   timestamps within ``WORD_TOLERANCE``) or, failing that, by splitting it
+   at its midpoint;
+5. mapped back to video time through the silence-trimming offsets (vad.py)
+   and grouped into timestamped ``TranscriptSegment``s, which the notes
+   engine chunks on like caption segments.
+
+The stitching is pure (``stitch_words``) and can be checked without a
+provider; see api/tests.py and test/benchmark_segmented_transcription.py.
+Finding cuts needs ffmpeg and numpy; without them, or for audio too short to
+split, the file is transcribed in one piece.
+"""
+import asyncio
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from django.conf import settings
+
+from .captions import TranscriptSegment
+from .metrics import observe_stage
+from .transcode import FORMATS, SPEECH_SAMPLE_RATE, TRANSCODE_TIMEOUT, find_ffmpeg, get_executor
+from .vad import FRAME_SECONDS, frame_levels, to_video_time, np
+
+MIN_SEGMENT_SECONDS = 60
+# How far from the even split point a cut may move to find a pause
+CUT_SEARCH_SECONDS = 15
+# Levels are averaged over this many frames (~0.3 s) when looking for the quietest point
+CUT_SMOOTHING_FRAMES = 10
+# Two sides' copies of a word in an overlap start within this many seconds of each other
+WORD_TOLERANCE = 0.5
+# Transcript segments end at a sentence once they have MIN words, and always at MAX
+SEGMENT_MIN_WORDS = 15
+SEGMENT_MAX_WORDS = 40
+
+_PUNCTUATION_RE = re.compile(r"[^\w']+")
+
+
+@dataclass
+class Word:
+    text: str
+    start: float   # seconds
+    end: float
+
+
+@dataclass
+class AudioSegment:
+    path: str
+    start: float   # seconds into the source file
+    end: float
+
+
+def segment_count(duration):
+    """How many segments to split ``duration`` seconds of audio into (1 = don't split)."""
+    return max(min(settings.TRANSCRIBE_SEGMENTS, int(duration // MIN_SEGMENT_SECONDS)), 1)
+
+
+def plan_segments(levels, count, overlap):
+    """``(start, end)`` seconds of ``count`` overlapping segments cut at quiet points of ``levels``."""
+    duration = len(levels) * FRAME_SECONDS
+    if count <= 1:
+        return [(0.0, duration)]
+    smoothed = np.convolve(levels, np.ones(CUT_SMOOTHING_FRAMES) / CUT_SMOOTHING_FRAMES, mode='same')
+    search = int(CUT_SEARCH_SECONDS / FRAME_SECONDS)
+    cuts = []
+    for index in range(1, count):
+        target = int(len(levels) * index / count)
+        low, high = max(target - search, 1), min(target + search, len(levels) - 1)
+        cuts.append(float(low + int(np.argmin(smoothed[low:high]))) * FRAME_SECONDS)
+    bounds = [0.0] + cuts + [duration]
+    return [
+        (max(bounds[index] - overlap / 2, 0.0), min(bounds[index + 1] + overlap / 2, duration))
+        for index in range(count)
+    ]
+
+
+def _normalize(text):
+    return _PUNCTUATION_RE.sub('', text).lower()
+
+
+def stitch_words(pieces):
+    """Merge ``[(segment_start, segment_end, words)]``, word times relative to each segment, into one timeline."""
+    stitched = []
+    previous_end = None
+    for start, end, words in pieces:
+        words = [Word(word.text, word.start + start, word.end + start) for word in words]
+        if not stitched:
+            stitched, previous_end = words, end
+            continue
+
+        # The words each side heard in the overlap [start, previous_end]
+        tail = next((index for index, word in enumerate(stitched) if word.end > start), len(stitched))
+        head = next((index for index, word in enumerate(words) if word.start >= previous_end), len(words))
+        left = [_normalize(word.text) for word in stitched[tail:]]
+        right = [_normalize(word.text) for word in words[:head]]
+        match = SequenceMatcher(None, left, right, autojunk=False).find_longest_match(0, len(left), 0, len(right))
+        if match.size and abs(stitched[tail + match.a].start - words[match.b].start) <= WORD_TOLERANCE:
+            # Both sides heard these words: switch sides halfway through them, away from either cut
+            half = match.size // 2
+            stitched = stitched[:tail + match.a + half] + words[match.b + half:]
+        else:
+            middle = (start + previous_end) / 2
+            stitched = ([word for word in stitched if (word.start + word.end) / 2 < middle]
+                        + [word for word in words if (word.start + word.end) / 2 >= middle])
+        previous_end = end
+    return stitched
+
+
+def words_to_segments(words, offsets=None):
+    """Group words into ``TranscriptSegment``s on sentence ends, in video time."""
+    segments = []
+    current = []
+    for word in words:
+        current.append(word)
+        sentence_end = word.text.endswith(('.', '?', '!'))
+        if len(current) >= SEGMENT_MAX_WORDS or (sentence_end and len(current) >= SEGMENT_MIN_WORDS):
+            segments.append(current)
+            current = []
+    if current:
+        segments.append(current)
+    return [
+        TranscriptSegment(
+            start=round(to_video_time(group[0].start, offsets), 3),
+            end=round(to_video_time(group[-1].end, offsets), 3),
+            text=' '.join(word.text for word in group),
+        )
+        for group in segments
+    ]
+
+
+def split_audio(ffmpeg, file_path, bounds):
+    """Write each ``(start, end)`` of ``file_path`` to its own file."""
+    codec, extension = FORMATS.get(settings.AUDIO_TRANSCODE, FORMATS['opus'])
+    base = os.path.splitext(file_path)[0]
+    segments = []
+    try:
+        for index, (start, end) in enumerate(bounds):
+            path = f"{base}.part{index}{extension}"
+            subprocess.run(
+                [ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+                 '-ss', f"{start:.3f}", '-i', file_path, '-t', f"{end - start:.3f}",
+                 '-vn', '-ac', '1', '-ar', str(SPEECH_SAMPLE_RATE), '-c:a', codec, '-b:a', settings.AUDIO_TRANSCODE_BITRATE, path],
+                check=True, capture_output=True, timeout=TRANSCODE_TIMEOUT
+            )
+            segments.append(AudioSegment(path=path, start=start, end=end))
+    except BaseException:
+        remove_segments(segments)
+        raise
+    return segments
+
+
+def remove_segments(segments):
+    for segment in segments:
+        try:
+            os.remove(segment.path)
+        except OSError:
+            pass
+
+
+def prepare_segments(file_path, levels=None):
+    """Split ``file_path`` for parallel transcription; returns AudioSegments, or None to send it whole.
+
+    ``levels`` are the file's frame levels if silence trimming already measured
+    them; otherwise the file is decoded to measure them.
+    """
+    if settings.TRANSCRIBE_SEGMENTS <= 1 or np is None:
+        return None
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        return None
+    if levels is None:
+        levels = frame_levels(ffmpeg, file_path)
+    count = segment_count(len(levels) * FRAME_SECONDS)
+    if count <= 1:
+        return None
+    bounds = plan_segments(levels, count, settings.TRANSCRIBE_SEGMENT_OVERLAP)
+    print(f"Transcribing in {count} segments: " + ', '.join(f"{start:.0f}-{end:.0f}s" for start, end in bounds))
+    return split_audio(ffmpeg, file_path, bounds)
+
+
+def _stitched_transcript(segments, results, offsets):
+    words = stitch_words([(segment.start, segment.end, words) for segment, words in zip(segments, results)])
+    transcript_segments = words_to_segments(words, offsets)
+    return ' '.join(word.text for word in words), transcript_segments
+
+
+def transcribe_segmented(file_path, transcribe_words, offsets=None, levels=None):
+    """Transcribe a local file in concurrent segments with ``transcribe_words(path) -> [Word]``.
+
+    Returns ``(text, segments)``, or None if the file should be sent in one
+    piece. ``offsets`` (from silence trimming) map timestamps to video time,
+    and ``levels`` (also from silence trimming) spare decoding the file again.
+    """
+    try:
+        segments = get_executor().submit(prepare_segments, file_path, levels).result()
+    except Exception as e:
+        print(f"Could not split audio, transcribing it whole: {str(e)}")
+        return None
+    if segments is None:
+        return None
+    try:
+        with observe_stage('segmented_transcription'):
+            with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix='transcribe') as pool:
+                results = list(pool.map(lambda segment: transcribe_words(segment.path), segments))
+    finally:
+        remove_segments(segments)
+    return _stitched_transcript(segments, results, offsets)
+
+
+async def transcribe_segmented_async(file_path, transcribe_words, offsets=None, levels=None):
+    """``transcribe_segmented`` for async callers, with ``transcribe_words`` a coroutine function."""
+    try:
+        segments = await asyncio.wrap_future(get_executor().submit(prepare_segments, file_path, levels))
+    except Exception as e:
+        print(f"Could not split audio, transcribing it whole: {str(e)}")
+        return None
+    if segments is None:
+        return None
+    try:
+        with observe_stage('segmented_transcription'):
+            results = await asyncio.gather(*(transcribe_words(segment.path) for segment in segments))
+    finally:
+        remove_segments(segments)
+    return _stitched_transcript(segments, results, offsets)
@@ -5,7 +5,7 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import VideoNotes
+from .models import VideoNotes, NoteJob
 import os
 from dotenv import load_dotenv
 
@@ -246,10 +246,30 @@ class VideoNotesSerializer(serializers.ModelSerializer):
     class Meta:
         model = VideoNotes
         fields = ['id', 'youtube_title', 'youtube_link', 'notes_content', 
-                 'transcription', 'audio_url', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+                 'transcription', 'transcript_source', 'transcript_offsets', 'audio_url', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'transcript_source', 'transcript_offsets', 'created_at', 'updated_at']
         
     def create(self, validated_data):
         request = self.context.get('request')
         validated_data['user'] = request.user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class VideoNotesListSerializer(serializers.ModelSerializer):
+    """Slim representation for note lists; the full bodies come from the detail endpoint."""
+    class Meta:
+        model = VideoNotes
+        fields = VideoNotes.LIST_FIELDS
+        read_only_fields = fields
+
+class NoteJobSerializer(serializers.ModelSerializer):
+    # Names of the checkpointed stages only; the checkpoint itself holds the transcript
+    completed_stages = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = NoteJob
+        fields = ['id', 'youtube_link', 'status', 'stage', 'note', 'error', 'detail', 'attempts',
+                 'completed_stages', 'created_at', 'updated_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+    
+    def get_completed_stages(self, obj):
+        return list(obj.checkpoint or {})
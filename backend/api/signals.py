@@ -0,0 +1,66 @@
+"""
+Signal handlers, connected in ApiConfig.ready().
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import VideoNotes, NoteCollectionVersion
+from .search import index_note, unindex_note
+
+SEARCHABLE_FIELDS = {'youtube_title', 'notes_content', 'transcription'}
+
+
+def _changes_search_text(raw, update_fields):
+    return not raw and (update_fields is None or bool(SEARCHABLE_FIELDS & set(update_fields)))
+
+
+@receiver(pre_save, sender=VideoNotes, dispatch_uid='api_unindex_note_before_save')
+def unindex_before_save(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    """Drop the old search row while the stored text still matches it (see search.py)."""
+    if instance.pk is None or not _changes_search_text(raw, update_fields):
+        return
+    unindex_note(instance.pk, using=using)
+
+
+@receiver(post_save, sender=VideoNotes, dispatch_uid='api_index_note')
+def update_search_index(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    """Keep the full-text index in step with a saved note."""
+    if not _changes_search_text(raw, update_fields):
+        return
+    index_note(instance, using=using)
+
+
+@receiver(pre_delete, sender=VideoNotes, dispatch_uid='api_unindex_note')
+def remove_from_search_index(sender, instance, using=None, **kwargs):
+    """Drop a note from the full-text index before it is deleted."""
+    unindex_note(instance.pk, using=using)
+
+
+@receiver(post_save, sender=VideoNotes, dispatch_uid='api_bump_collection_on_save')
+def bump_collection_on_save(sender, instance, raw=False, **kwargs):
+    """Invalidate ETags of the owner's notes list."""
+    if raw:
+        return
+    NoteCollectionVersion.bump([instance.user_id])
+
+
+@receiver(post_delete, sender=VideoNotes, dispatch_uid='api_bump_collection_on_delete')
+def bump_collection_on_delete(sender, instance, **kwargs):
+    # Never create a row here: the user may be the one being deleted
+    NoteCollectionVersion.bump([instance.user_id], create=False)
+
+
+@receiver(request_started, dispatch_uid='api_recover_note_jobs')
+def recover_note_jobs(sender, **kwargs):
+    """Re-schedule jobs left behind by a restart, on the process's first request.
+
+    Waiting for a request keeps migrate, shell and other commands off the job table.
+    """
+    if settings.NOTE_JOB_BACKEND not in ('thread', 'async'):
+        return
+    from .jobs import recover_jobs
+
+    request_started.disconnect(dispatch_uid='api_recover_note_jobs')
+    recover_jobs()
@@ -0,0 +1,107 @@
+"""
+Single-flight coalescing of duplicate work.
+
+When several callers ask for the same key at once, only the first (the leader)
+runs the function; the others (followers) block until it finishes and receive
+the same result, or the same exception if it failed.
+
+The registry is per process. Callers should not hold a database transaction
+while calling ``do``: followers can wait for minutes while the leader runs.
+``AsyncSingleFlight`` does the same for coroutines on one event loop.
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, on_wait=None):
+        """Run ``fn()`` once per key among concurrent callers and share its outcome.
+
+        ``on_wait`` is called (without arguments) by followers right before they
+        start waiting on the leader.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.followers += 1
+
+        if not leader:
+            if on_wait is not None:
+                on_wait()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """Return the number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines; all callers must run on the same event loop."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn, on_wait=None):
+        """Await ``fn()`` once per key among concurrent callers and share its outcome.
+
+        ``on_wait`` may be a coroutine function; followers await it before waiting.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            if on_wait is not None:
+                waited = on_wait()
+                if asyncio.iscoroutine(waited):
+                    await waited
+            # shield() so a cancelled follower doesn't cancel the leader's result
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when there were no followers
+            future.exception()
+            raise
+        finally:
+            del self._calls[key]
+
+    def in_flight(self):
+        return len(self._calls)
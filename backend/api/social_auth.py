@@ -8,6 +8,7 @@ from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import SocialLoginView
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.utils.crypto import get_random_string
 import random
 import string
 import requests
@@ -16,6 +17,9 @@ import logging
 
 User = get_user_model()
 
+# Reuse keep-alive connections to Google across logins
+google_session = requests.Session()
+
 def generate_username(email):
     """Generate a unique username from email"""
     base_username = email.split('@')[0]
@@ -28,6 +32,41 @@ def generate_username(email):
     
     return username
 
+def exchange_google_code(request, code):
+    """Exchange a Google authorization code for an access token, raising on failure."""
+    from allauth.socialaccount.models import SocialApp
+
+    app = SocialApp.objects.get(provider='google')
+    token_data = GoogleLoginView().get_client(request, app).get_access_token(code)
+    access_token = token_data if isinstance(token_data, str) else token_data.get('access_token')
+    if not access_token:
+        raise Exception('No access token in response from Google')
+    return access_token
+
+def login_google_user(email):
+    """Get or create the user for a Google email and return the JWT login response body."""
+    if not User.objects.filter(email=email).exists():
+        username = generate_username(email)
+        user = User.objects.create_user(
+            username=username,
+            email=email,
+            password=get_random_string(32)
+        )
+    else:
+        user = User.objects.get(email=email)
+
+    # Generate JWT tokens
+    refresh = RefreshToken.for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email
+        }
+    }
+
 class GoogleLoginView(SocialLoginView):
     adapter_class = GoogleOAuth2Adapter
     callback_url = "postmessage"  # This is crucial for Google One Tap / Sign-in With Google
@@ -53,7 +92,7 @@ class GoogleLoginView(SocialLoginView):
     def get_google_user_info(self, access_token):
         """Manually fetch user info from Google API."""
         headers = {'Authorization': f'Bearer {access_token}'}
-        resp = requests.get('https://www.googleapis.com/oauth2/v2/userinfo', headers=headers)
+        resp = google_session.get('https://www.googleapis.com/oauth2/v2/userinfo', headers=headers, timeout=10)
         
         if resp.status_code == 200:
             return resp.json()
@@ -146,28 +185,7 @@ class GoogleLoginView(SocialLoginView):
                     'exception_type': str(type(e).__name__)
                 }, status=400)
 
-            # Get or create user
-            if not User.objects.filter(email=email).exists():
-                username = generate_username(email)
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=User.objects.make_random_password()
-                )
-            else:
-                user = User.objects.get(email=email)
-            
-            # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
-            return Response({
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-                'user': {
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email
-                }
-            })
+            return Response(login_google_user(email))
         except SocialApp.DoesNotExist:
             return Response({'error': 'Google OAuth configuration not found'}, status=500)
         except Exception as e:
@@ -0,0 +1,208 @@
+"""
+The pipeline's stages, written once for the sync and async pipelines.
+
+``transcript_stages`` and ``pipeline_stages`` hold the control flow:
+checkpoints, the captions/ASR choice, direct vs Cloudinary transfer,
+segmented transcription and cleanup on failure. They never call a provider
+themselves. Each provider call, database write or progress report is
+*yielded* as an operation, ``(name, *args)``, and the value of the ``yield``
+is its result; a failed operation is raised at the ``yield``, so ``try``
+blocks around it behave as usual.
+
+``drive`` performs the operations with ``utils.SyncPerformer`` and ``adrive``
+with ``async_pipeline.AsyncPerformer``. A performer has one method per
+operation:
+
+* ``stage(name)``                        - report progress
+* ``video_info(link)``                   - ``VideoInfo``
+* ``captions(info)``                     - ``CaptionTranscript`` or None
+* ``download(link)``                     - ``(path, offsets, levels)`` of the audio, ready to transcribe
+* ``upload(path)``                       - Cloudinary URL (the file is removed)
+* ``transcribe_segmented(path, offsets, levels)`` - ``(text, segments)`` or None (see segmented.py)
+* ``transcribe(source, transcript_id)``  - text; checkpoints the id of a new submission
+* ``generate(transcription, title, segments)`` - notes
+* ``save(stage, values)`` / ``save_transcript(text, source, segments)`` - checkpoint writes
+"""
+from django.conf import settings
+
+from .metrics import observe_stage
+from .scheduler import record_duration
+
+# Where a note's transcript came from
+TRANSCRIPT_SOURCE_CAPTIONS = 'captions'
+TRANSCRIPT_SOURCE_ASR = 'asr'
+
+
+def drive(stages, performer):
+    """Run a stage generator, performing each operation it yields with ``performer``."""
+    try:
+        operation = next(stages)
+        while True:
+            name, *args = operation
+            try:
+                result = getattr(performer, name)(*args)
+            except Exception as e:
+                operation = stages.throw(e)
+            else:
+                operation = stages.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def adrive(stages, performer):
+    """``drive`` with an async ``performer``."""
+    try:
+        operation = next(stages)
+        while True:
+            name, *args = operation
+            try:
+                result = await getattr(performer, name)(*args)
+            except BaseException as e:
+                # Cancellation is raised in the stages too, so they clean up local audio
+                operation = stages.throw(e)
+            else:
+                operation = stages.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+def transcript_stages(link, checkpoint):
+    """Run the metadata and transcription stages for a YouTube link, raising on failure.
+
+    Returns the title, audio location, transcript text, transcript source,
+    the offset map of trimmed audio (``transcript_offsets``, see vad.py) and,
+    for caption and segmented ASR transcripts, the timestamped ``segments``.
+    Stages already in ``checkpoint`` are skipped and new stage outputs are
+    saved to it.
+    """
+    from .utils import remove_audio_file
+
+    info = None
+    metadata = checkpoint.get('metadata')
+    if metadata is None:
+        yield ('stage', 'metadata')
+        with observe_stage('metadata'):
+            info = yield ('video_info', link)
+        # The scheduler charges the user for the real duration
+        record_duration(info.video_id, info.duration)
+        if info.duration > settings.MAX_VIDEO_DURATION:
+            raise Exception("Video too long")
+        metadata = {'title': info.title, 'duration': info.duration}
+        yield ('save', 'metadata', metadata)
+    title = metadata['title']
+    print(f"Video title: {title}")
+
+    transcript = checkpoint.transcript()
+    if transcript is not None:
+        print("Resuming from the checkpointed transcript")
+        transcription, transcript_source, segments = transcript
+        audio = checkpoint.get('audio') or {}
+        return {
+            'title': title,
+            'audio_url': audio.get('audio_url') or '',
+            'audio_path': None,
+            'transcription': transcription,
+            'transcript_source': transcript_source,
+            'transcript_offsets': audio.get('offsets'),
+            'segments': segments,
+        }
+
+    captions = None
+    if settings.CAPTIONS_MODE != 'forbid':
+        yield ('stage', 'transcribing')
+        if info is None:
+            info = yield ('video_info', link)
+        with observe_stage('captions'):
+            captions = yield ('captions', info)
+
+    audio_url = ''
+    audio_path = None
+    offsets = None
+    levels = None
+    segments = None
+    if captions is not None:
+        # Caption fast path: no audio download and no ASR
+        transcription = captions.text
+        transcript_source = TRANSCRIPT_SOURCE_CAPTIONS
+        segments = captions.segments
+        yield ('save_transcript', transcription, transcript_source, segments)
+    else:
+        audio_source = checkpoint.audio_source()
+        if audio_source is None:
+            yield ('stage', 'downloading')
+            # Transcoding and silence trimming sit between the download and the transcription
+            audio_path, offsets, levels = yield ('download', link)
+            if settings.AUDIO_TRANSFER_MODE == 'cloudinary':
+                audio_url = yield ('upload', audio_path)
+                audio_path = None
+                yield ('save', 'audio', {'audio_url': audio_url, 'offsets': offsets})
+            else:
+                # Direct mode: AssemblyAI receives the local file, archiving happens later off the critical path
+                yield ('save', 'audio', {'audio_path': audio_path, 'offsets': offsets})
+        else:
+            offsets = (checkpoint.get('audio') or {}).get('offsets')
+            if audio_source.startswith(('http://', 'https://')):
+                audio_url = audio_source
+            else:
+                audio_path = audio_source
+
+        yield ('stage', 'transcribing')
+        transcript_id = (checkpoint.get('asr') or {}).get('transcript_id')
+        try:
+            segmented = None
+            if audio_path and transcript_id is None:
+                # Long local files can be transcribed in parallel segments (see segmented.py)
+                # Frame levels measured by silence trimming are only at hand right after the download
+                segmented = yield ('transcribe_segmented', audio_path, offsets, levels)
+            if segmented is not None:
+                transcription, segments = segmented
+            else:
+                transcription = yield ('transcribe', audio_url or audio_path, transcript_id)
+        except BaseException:
+            if audio_path:
+                remove_audio_file(audio_path)
+            raise
+        if audio_path and not settings.ARCHIVE_AUDIO_TO_CLOUDINARY:
+            remove_audio_file(audio_path)
+            audio_path = None
+        transcript_source = TRANSCRIPT_SOURCE_ASR
+        yield ('save_transcript', transcription, transcript_source, segments)
+
+    return {
+        'title': title,
+        'audio_url': audio_url,
+        'audio_path': audio_path,
+        'transcription': transcription,
+        'transcript_source': transcript_source,
+        'transcript_offsets': offsets,
+        'segments': segments,
+    }
+
+
+def pipeline_stages(link, checkpoint, version):
+    """Every pipeline stage for a YouTube link: the transcript stages, then note generation.
+
+    Notes checkpointed by the same pipeline ``version`` are reused.
+    """
+    from .utils import remove_audio_file
+
+    result = yield from transcript_stages(link, checkpoint)
+    segments = result.pop('segments')
+
+    notes = checkpoint.notes(version)
+    if notes is not None:
+        result['notes'] = notes
+        return result
+
+    yield ('stage', 'generating')
+    try:
+        with observe_stage('generation'):
+            notes = yield ('generate', result['transcription'], result['title'], segments)
+    except BaseException:
+        if result['audio_path']:
+            remove_audio_file(result['audio_path'])
+        raise
+
+    yield ('save', 'notes', {'notes': notes, 'version': version})
+    result['notes'] = notes
+    return result
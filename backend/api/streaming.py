@@ -0,0 +1,114 @@
+"""
+Server-Sent Events delivery of generated notes.
+
+A stream follows an ordinary ``NoteJob``: the request queues the job like
+``POST /api/notes/generate/`` does, so streamed generations share the job
+workers, the fair-share scheduler, single-flight runs per video and
+checkpoints with every other job. The response relays the job's events
+(job_events.py) as they arrive:
+
+* ``stage``  - ``{"stage": "metadata" | "transcribing" | "downloading" | "waiting" | "generating" | "cached"}``
+* ``chunk``  - ``{"text": "..."}`` pieces of the notes as Gemini streams them
+* ``done``   - the saved note, serialized like ``GET /api/notes/<id>/``
+* ``error``  - ``{"error": "...", "detail": "..."}``
+
+Notes are streamed piece by piece when this process runs the job's pipeline
+itself; when the job joins another job's run or runs elsewhere, the notes
+arrive as one ``chunk`` when the job completes. The job (and its note) carries
+on if the client disconnects.
+"""
+import json
+import queue
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from .job_events import job_events, JOB_FINISHED
+from .jobs import enqueue_job
+from .models import NoteJob, VideoNotes
+from .serializers import VideoNotesSerializer
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients ask for ``text/event-stream``; plain error responses become an ``error`` event."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return sse_event('error', data).encode(self.charset)
+
+
+def stream_cached_note(video_note):
+    """Events for a note served straight from the result cache."""
+    yield sse_event('stage', {'stage': 'cached'})
+    yield sse_event('chunk', {'text': video_note.notes_content})
+    yield sse_event('done', VideoNotesSerializer(video_note).data)
+
+
+class JobEventStream:
+    """Iterate over a job's SSE events until it finishes.
+
+    Subscribes before the job is queued so no streamed text is missed, and
+    unsubscribes when Django closes the response (also if it is never iterated).
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.events = job_events.subscribe(job.pk)
+        enqueue_job(job)
+
+    def close(self):
+        job_events.unsubscribe(self.job.pk, self.events)
+
+    def __iter__(self):
+        stage = ''
+        streamed = False
+        idle_since = time.monotonic()
+        while True:
+            try:
+                item = self.events.get(timeout=settings.NOTES_STREAM_POLL_INTERVAL)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not JOB_FINISHED:
+                event, data = item
+                if event == 'stage':
+                    if data['stage'] == stage:
+                        continue
+                    stage = data['stage']
+                streamed = streamed or event == 'chunk'
+                idle_since = time.monotonic()
+                yield sse_event(event, data)
+                continue
+
+            job = NoteJob.objects.filter(pk=self.job.pk).values('status', 'stage', 'note_id', 'error', 'detail').first()
+            if job is None:
+                yield sse_event('error', {'error': 'Processing error', 'detail': 'The job was deleted'})
+                return
+            if job['stage'] and job['stage'] != stage:
+                stage = job['stage']
+                idle_since = time.monotonic()
+                yield sse_event('stage', {'stage': stage})
+            if job['status'] == NoteJob.STATUS_COMPLETED:
+                video_note = VideoNotes.objects.get(pk=job['note_id'])
+                if not streamed:
+                    yield sse_event('chunk', {'text': video_note.notes_content})
+                yield sse_event('done', VideoNotesSerializer(video_note).data)
+                return
+            if job['status'] == NoteJob.STATUS_FAILED:
+                yield sse_event('error', {'error': job['error'], 'detail': job['detail']})
+                return
+            if time.monotonic() - idle_since >= settings.NOTES_STREAM_KEEPALIVE:
+                # Comment line keeps proxies from closing an idle connection during long stages
+                idle_since = time.monotonic()
+                yield ": keep-alive\n\n"
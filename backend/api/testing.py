@@ -0,0 +1,293 @@
+"""
+Local stand-ins for YouTube (videos, playlists and channels), Cloudinary, AssemblyAI and Gemini.
+
+Each fake sleeps (or, for the async provider layer, awaits) for a configurable
+latency, produces a payload of a configurable size and fails at a configurable
+rate, so the pipeline can be exercised and benchmarked without network access
+or API keys.
+
+Used by the unit tests in tests.py and the benchmarks in backend/test:
+
+    from api.testing import FakeProviderConfig, ProviderProfile, install_fake_providers
+
+    with install_fake_providers(FakeProviderConfig(gemini=ProviderProfile(latency=0.5))):
+        process_youtube_link("https://www.youtube.com/watch?v=aaaaaaaaaaa")
+"""
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from unittest import mock
+
+WORDS = (
+    "lecture gradient descent matrix proof theorem example energy protein market history "
+    "function variable network signal memory language culture system model data"
+).split()
+
+
+class FakeProviderError(Exception):
+    """Raised by a fake provider to simulate an outage or rejected request."""
+
+
+@dataclass
+class ProviderProfile:
+    latency: float = 0.0        # seconds per call
+    jitter: float = 0.0         # +/- uniform seconds added to latency
+    failure_rate: float = 0.0   # probability in [0, 1] that a call raises FakeProviderError
+
+    def call(self, name, rng):
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and rng.random() < self.failure_rate:
+            raise FakeProviderError(f"Simulated {name} failure")
+
+    async def acall(self, name, rng):
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and rng.random() < self.failure_rate:
+            raise FakeProviderError(f"Simulated {name} failure")
+
+
+@dataclass
+class FakeProviderConfig:
+    youtube: ProviderProfile = field(default_factory=ProviderProfile)
+    download: ProviderProfile = field(default_factory=ProviderProfile)
+    cloudinary: ProviderProfile = field(default_factory=ProviderProfile)
+    assemblyai: ProviderProfile = field(default_factory=ProviderProfile)
+    gemini: ProviderProfile = field(default_factory=ProviderProfile)
+    video_duration: int = 600             # seconds reported by the fake metadata
+    audio_bytes: int = 2 * 1024 * 1024    # size of the fake downloaded file
+    transcript_words: int = 1500          # words returned by the fake transcriber
+    notes_chars: int = 4000               # characters returned per fake Gemini call
+    captions: bool = False                # whether fake videos expose a caption track
+    playlist_videos: int = 20             # videos listed by a fake playlist or channel
+    seed: int = 0
+
+
+def fake_transcript(video_id, words, rng=None):
+    """Deterministic pseudo-text for a video, with sentences so chunking behaves realistically."""
+    rng = rng or random.Random(video_id)
+    out = []
+    for index in range(words):
+        out.append(rng.choice(WORDS))
+        if index % 12 == 11:
+            out[-1] += '.'
+    return f"{video_id} " + ' '.join(out)
+
+
+def fake_words(text, words_per_second=2.5):
+    """Time ``text``'s words evenly, as a word-level transcript would."""
+    from .segmented import Word
+
+    step = 1 / words_per_second
+    return [Word(word, index * step, index * step + step * 0.8) for index, word in enumerate(text.split())]
+
+
+class FakeTranscriber:
+    """A synthetic recording with known words, and a transcriber that hears any stretch of it.
+
+    ``transcribe(start, end)`` returns the words at least half inside the
+    stretch, timed from its start with up to ``timing_jitter`` seconds of
+    error, and mishears a word at ``mishear_rate``, as a real transcriber
+    might near a cut. ``levels()`` gives the per-frame loudness that
+    ``segmented.plan_segments`` looks for pauses in, and ``latency(start, end)``
+    how long a provider would take on the stretch.
+    """
+
+    def __init__(self, seconds, seed=0, words_per_second=2.5, timing_jitter=0.05, mishear_rate=0.0,
+                 latency=2.0, real_time_factor=0.1):
+        from .segmented import Word
+
+        self.rng = random.Random(seed)
+        self.seconds = seconds
+        self.timing_jitter = timing_jitter
+        self.mishear_rate = mishear_rate
+        self.base_latency = latency
+        self.real_time_factor = real_time_factor
+        self.words = []
+        position = self.rng.uniform(0.5, 2.0)
+        sentence = 0
+        while True:
+            length = self.rng.uniform(0.6, 1.6) / words_per_second
+            if position + length > seconds:
+                break
+            text = self.rng.choice(WORDS)
+            sentence += 1
+            if sentence >= self.rng.randint(8, 20):
+                text += '.'
+                sentence = 0
+            self.words.append(Word(text, round(position, 3), round(position + length, 3)))
+            # Short gaps between words, longer pauses between sentences
+            position += length + (self.rng.uniform(0.6, 1.5) if not sentence else self.rng.uniform(0.02, 0.15))
+
+    def levels(self):
+        import numpy as np
+
+        from .vad import FRAME_SECONDS
+
+        levels = np.full(int(self.seconds / FRAME_SECONDS), -60.0, dtype=np.float32)
+        for word in self.words:
+            levels[int(word.start / FRAME_SECONDS):int(word.end / FRAME_SECONDS) + 1] = -20.0
+        noise = np.random.default_rng(self.rng.randrange(2 ** 32)).normal(0, 2, len(levels))
+        return levels + noise.astype(np.float32)
+
+    def transcribe(self, start, end):
+        from .segmented import Word
+
+        heard = []
+        for word in self.words:
+            inside = min(word.end, end) - max(word.start, start)
+            if inside < (word.end - word.start) / 2:
+                continue
+            text = word.text
+            if self.mishear_rate and self.rng.random() < self.mishear_rate:
+                text = self.rng.choice(WORDS)
+            shift = self.rng.uniform(-self.timing_jitter, self.timing_jitter)
+            heard.append(Word(text, max(word.start - start + shift, 0.0), max(word.end - start + shift, 0.0)))
+        return heard
+
+    def latency(self, start, end):
+        return self.base_latency + (end - start) * self.real_time_factor
+
+
+@contextmanager
+def install_fake_providers(config=None):
+    """Patch the pipeline's provider calls with fakes for the duration of the block."""
+    from . import async_providers, batches, jobs, utils
+    from .captions import CaptionTranscript, TranscriptSegment
+    from .metadata import CollectionInfo, VideoInfo, parse_video_id
+
+    config = config or FakeProviderConfig()
+    rng_lock = threading.Lock()
+    master_rng = random.Random(config.seed)
+    temp_dir = tempfile.mkdtemp(prefix='ytnotes-fake-')
+
+    def rng():
+        with rng_lock:
+            return random.Random(master_rng.random())
+
+    def get_video_info(link):
+        config.youtube.call('youtube metadata', rng())
+        video_id = parse_video_id(link) or 'fakevideo00'
+        return VideoInfo(
+            video_id=video_id,
+            title=f"Fake lecture {video_id}",
+            duration=config.video_duration,
+            webpage_url=link,
+        )
+
+    def expand_collection(url, limit):
+        config.youtube.call('youtube playlist', rng())
+        prefix = ''.join(ch for ch in url.rsplit('/', 1)[-1].split('=')[-1] if ch.isalnum())[:4].ljust(4, 'p')
+        return CollectionInfo(
+            title=f"Fake course {prefix}",
+            webpage_url=url,
+            entries=[
+                {'video_id': f"{prefix}{index:07d}", 'title': f"Fake lecture {index + 1}", 'duration': config.video_duration}
+                for index in range(min(config.playlist_videos, limit))
+            ],
+        )
+
+    def fetch_caption_transcript(info, languages=None):
+        if not config.captions:
+            return None
+        config.youtube.call('youtube captions', rng())
+        text = fake_transcript(info.video_id, config.transcript_words)
+        words = text.split()
+        per_segment = 12
+        segments = [
+            TranscriptSegment(start=i / 2.5, end=(i + per_segment) / 2.5, text=' '.join(words[i:i + per_segment]))
+            for i in range(0, len(words), per_segment)
+        ]
+        return CaptionTranscript(language='en', automatic=True, segments=segments)
+
+    def download_audio_file(link):
+        config.download.call('youtube download', rng())
+        video_id = parse_video_id(link) or 'fakevideo00'
+        fd, path = tempfile.mkstemp(prefix=f"{video_id}-", suffix='.m4a', dir=temp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(min(config.audio_bytes, 1024)) * (config.audio_bytes // 1024 or 1))
+        return path
+
+    def upload_audio_to_cloudinary(file_path):
+        config.cloudinary.call('cloudinary', rng())
+        name = os.path.basename(file_path)
+        utils.remove_audio_file(file_path)
+        return f"https://res.cloudinary.invalid/youtube_audio/{name}"
+
+    def get_transcription_from_audio(audio_source, transcript_id=None, on_submitted=None):
+        video_id = os.path.basename(str(audio_source)).split('-')[0]
+        if not transcript_id and on_submitted is not None:
+            on_submitted(f"fake-{video_id}")
+        config.assemblyai.call('assemblyai', rng())
+        return fake_transcript(video_id, config.transcript_words)
+
+    def get_words_from_audio(file_path):
+        video_id = os.path.basename(str(file_path)).split('-')[0]
+        config.assemblyai.call('assemblyai', rng())
+        return fake_words(fake_transcript(video_id, config.transcript_words))
+
+    def generate_text(prompt):
+        config.gemini.call('gemini', rng())
+        return ('# Notes\n' + '- point\n' * (config.notes_chars // 8))[:config.notes_chars]
+
+    def stream_text(prompt):
+        text = generate_text(prompt)
+        for start in range(0, len(text), 200):
+            yield text[start:start + 200]
+
+    async def upload_audio_to_cloudinary_async(file_path):
+        await config.cloudinary.acall('cloudinary', rng())
+        name = os.path.basename(file_path)
+        utils.remove_audio_file(file_path)
+        return f"https://res.cloudinary.invalid/youtube_audio/{name}"
+
+    async def transcribe_audio(audio_source, transcript_id=None, on_submitted=None):
+        video_id = os.path.basename(str(audio_source)).split('-')[0]
+        if not transcript_id and on_submitted is not None:
+            await on_submitted(f"fake-{video_id}")
+        await config.assemblyai.acall('assemblyai', rng())
+        return fake_transcript(video_id, config.transcript_words)
+
+    async def transcribe_words(file_path):
+        video_id = os.path.basename(str(file_path)).split('-')[0]
+        await config.assemblyai.acall('assemblyai', rng())
+        return fake_words(fake_transcript(video_id, config.transcript_words))
+
+    async def generate_text_async(prompt, model=None):
+        await config.gemini.acall('gemini', rng())
+        return ('# Notes\n' + '- point\n' * (config.notes_chars // 8))[:config.notes_chars]
+
+    async def stream_text_async(prompt, model=None):
+        text = await generate_text_async(prompt)
+        for start in range(0, len(text), 200):
+            yield text[start:start + 200]
+
+    with ExitStack() as stack:
+        patches = [
+            (utils, 'get_video_info', get_video_info),
+            (utils, 'fetch_caption_transcript', fetch_caption_transcript),
+            (batches, 'expand_collection', expand_collection),
+            (utils, 'download_audio_file', download_audio_file),
+            (utils, 'upload_audio_to_cloudinary', upload_audio_to_cloudinary),
+            (jobs, 'upload_audio_to_cloudinary', upload_audio_to_cloudinary),
+            (utils, 'get_transcription_from_audio', get_transcription_from_audio),
+            (utils, 'get_words_from_audio', get_words_from_audio),
+            (utils, 'generate_text', generate_text),
+            (utils, 'stream_text', stream_text),
+            (utils, 'genai', getattr(utils, 'genai', None) or object()),
+            (async_providers, 'upload_audio_to_cloudinary', upload_audio_to_cloudinary_async),
+            (async_providers, 'transcribe_audio', transcribe_audio),
+            (async_providers, 'transcribe_words', transcribe_words),
+            (async_providers, 'generate_text', generate_text_async),
+            (async_providers, 'stream_text', stream_text_async),
+        ]
+        for module, name, fake in patches:
+            stack.enter_context(mock.patch.object(module, name, fake))
+        yield config
@@ -1,3 +1,64 @@
-from django.test import TestCase
+import bisect
+import unittest
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .segmented import MIN_SEGMENT_SECONDS, Word, plan_segments, segment_count, stitch_words
+from .testing import FakeTranscriber
+from .vad import FRAME_SECONDS, np
+
+TIMING_JITTER = 0.05
+
+
+def pair_words(truth, stitched):
+    """For each true word, the stitched words whose midpoint falls inside it, and how many stitched words fell between."""
+    middles = [(word.start + word.end) / 2 for word in stitched]
+    heard = [stitched[bisect.bisect_left(middles, word.start):bisect.bisect_right(middles, word.end)] for word in truth]
+    return heard, len(stitched) - sum(len(words) for words in heard)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class SegmentedTranscriptionTests(SimpleTestCase):
+    def transcribe(self, transcriber, count, overlap):
+        bounds = plan_segments(transcriber.levels(), count, overlap)
+        self.assertEqual(len(bounds), count)
+        return stitch_words([(start, end, transcriber.transcribe(start, end)) for start, end in bounds])
+
+    def assert_stitched(self, truth, stitched):
+        heard, stray = pair_words(truth, stitched)
+        missing = [word.text for word, words in zip(truth, heard) if not words]
+        duplicated = sum(max(len(words) - 1, 0) for words in heard) + stray
+        self.assertEqual(missing, [])
+        self.assertEqual(duplicated, 0)
+        self.assertEqual([word.text for word in stitched], [word.text for word in truth])
+        worst = max(abs(words[0].start - word.start) for word, words in zip(truth, heard))
+        self.assertLessEqual(worst, TIMING_JITTER + 0.001)
+
+    def test_segments_stitch_to_the_recording(self):
+        for seed in range(5):
+            transcriber = FakeTranscriber(600, seed=seed, timing_jitter=TIMING_JITTER)
+            for count in (2, 4, 8):
+                with self.subTest(seed=seed, segments=count):
+                    self.assert_stitched(transcriber.words, self.transcribe(transcriber, count, overlap=4))
+
+    def test_segments_without_overlap(self):
+        for seed in range(5):
+            transcriber = FakeTranscriber(600, seed=seed, timing_jitter=TIMING_JITTER)
+            with self.subTest(seed=seed):
+                self.assert_stitched(transcriber.words, self.transcribe(transcriber, 4, overlap=0))
+
+    def test_short_audio_is_one_segment(self):
+        transcriber = FakeTranscriber(MIN_SEGMENT_SECONDS * 1.5, seed=1, timing_jitter=TIMING_JITTER)
+        with override_settings(TRANSCRIBE_SEGMENTS=4):
+            self.assertEqual(segment_count(transcriber.seconds), 1)
+        levels = transcriber.levels()
+        self.assertEqual(plan_segments(levels, 1, 4), [(0.0, len(levels) * FRAME_SECONDS)])
+        self.assert_stitched(transcriber.words, self.transcribe(transcriber, 1, overlap=4))
+
+    def test_overlap_without_agreement_splits_at_its_midpoint(self):
+        # The sides hear different words in the overlap [10, 14], so each keeps its words on its side of 12
+        left = [Word('one', 1.0, 1.5), Word('two', 9.0, 9.5), Word('alpha', 10.5, 11.0), Word('beta', 12.5, 13.0)]
+        right = [Word('gamma', 0.5, 1.0), Word('delta', 2.5, 3.0), Word('three', 5.0, 5.5)]
+        stitched = stitch_words([(0.0, 14.0, left), (10.0, 20.0, right)])
+        self.assertEqual([word.text for word in stitched], ['one', 'two', 'alpha', 'delta', 'three'])
+        self.assertEqual([(word.start, word.end) for word in stitched[-2:]], [(12.5, 13.0), (15.0, 15.5)])
@@ -0,0 +1,143 @@
+"""
+Transcoding downloaded audio to a compact speech format.
+
+YouTube's best audio stream is usually 128-160 kbps stereo; speech
+recognition needs none of that. With ``AUDIO_TRANSCODE`` set to ``'opus'``
+(Ogg Opus) or ``'aac'`` (M4A), each download is downmixed to mono 16 kHz at
+``AUDIO_TRANSCODE_BITRATE`` before it goes to AssemblyAI or Cloudinary, which
+makes the upload 5-8x smaller.
+
+ffmpeg does the work in a child process. At most ``AUDIO_TRANSCODE_WORKERS``
+run at once, each waited on from a small thread pool, so request threads and
+the async event loop never block on one. Transcoding is best effort: if the
+ffmpeg binary is missing or fails, the original file is used.
+"""
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .metrics import observe_stage, AUDIO_TRANSCODE_SAVED_BYTES
+
+# Codec and file extension for each AUDIO_TRANSCODE mode
+FORMATS = {
+    'opus': ('libopus', '.ogg'),
+    'aac': ('aac', '.m4a'),
+}
+SPEECH_SAMPLE_RATE = 16000
+# Longest a single ffmpeg run may take (seconds); an hour of audio takes well under a minute
+TRANSCODE_TIMEOUT = 600
+
+_executor = None
+_executor_lock = threading.Lock()
+_ffmpeg_path = None
+
+
+def get_executor():
+    """Return the pool that waits on ffmpeg processes."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.AUDIO_TRANSCODE_WORKERS, thread_name_prefix='transcode')
+        return _executor
+
+
+def find_ffmpeg():
+    """Path of the ffmpeg binary, or None (warns once)."""
+    global _ffmpeg_path
+    if _ffmpeg_path is None:
+        _ffmpeg_path = shutil.which('ffmpeg') or ''
+        if not _ffmpeg_path:
+            print("WARNING: ffmpeg not found; audio will be sent without transcoding.")
+    return _ffmpeg_path or None
+
+
+def ffmpeg_command(ffmpeg, source, output, codec, bitrate):
+    command = [
+        ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+        '-i', source,
+        '-vn', '-ac', '1', '-ar', str(SPEECH_SAMPLE_RATE),
+        '-c:a', codec, '-b:a', bitrate,
+    ]
+    if codec == 'libopus':
+        # Opus's speech-tuned mode keeps low bitrates intelligible
+        command += ['-application', 'voip']
+    return command + [output]
+
+
+def _transcode(ffmpeg, source, codec, extension, bitrate):
+    output = f"{os.path.splitext(source)[0]}.speech{extension}"
+    try:
+        subprocess.run(
+            ffmpeg_command(ffmpeg, source, output, codec, bitrate),
+            check=True, capture_output=True, timeout=TRANSCODE_TIMEOUT
+        )
+    except subprocess.CalledProcessError as e:
+        _remove(output)
+        raise Exception(f"ffmpeg failed: {e.stderr.decode(errors='replace').strip()[-500:]}")
+    except BaseException:
+        _remove(output)
+        raise
+    return output
+
+
+def _remove(file_path):
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+def _submit(file_path):
+    """Start transcoding ``file_path``; returns a Future, or None if transcoding is off."""
+    fmt = FORMATS.get(settings.AUDIO_TRANSCODE)
+    if fmt is None:
+        return None
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        return None
+    return get_executor().submit(_transcode, ffmpeg, file_path, *fmt, settings.AUDIO_TRANSCODE_BITRATE)
+
+
+def _keep_smaller(file_path, output):
+    """Delete whichever of the original and the transcoded file is bigger and return the other."""
+    original, transcoded = os.path.getsize(file_path), os.path.getsize(output)
+    if transcoded >= original:
+        _remove(output)
+        return file_path
+    AUDIO_TRANSCODE_SAVED_BYTES.inc(original - transcoded)
+    print(f"Transcoded audio: {original / 2 ** 20:.1f} MB -> {transcoded / 2 ** 20:.1f} MB")
+    _remove(file_path)
+    return output
+
+
+def transcode_audio(file_path):
+    """Return a mono 16 kHz copy of ``file_path`` (removing the original), or ``file_path`` itself."""
+    future = _submit(file_path)
+    if future is None:
+        return file_path
+    try:
+        with observe_stage('transcode'):
+            output = future.result()
+    except Exception as e:
+        print(f"Transcoding failed, sending the original audio: {str(e)}")
+        return file_path
+    return _keep_smaller(file_path, output)
+
+
+async def transcode_audio_async(file_path):
+    """``transcode_audio`` for async callers."""
+    future = _submit(file_path)
+    if future is None:
+        return file_path
+    try:
+        with observe_stage('transcode'):
+            output = await asyncio.wrap_future(future)
+    except Exception as e:
+        print(f"Transcoding failed, sending the original audio: {str(e)}")
+        return file_path
+    return _keep_smaller(file_path, output)
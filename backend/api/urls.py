@@ -1,8 +1,11 @@
 from django.urls import path
 from .views import (
-    sample, PasswordResetView, PasswordResetConfirmView,
-    GenerateNotesView, ListUserNotesView, NoteDetailView
+    sample, metrics_view, PasswordResetView, PasswordResetConfirmView,
+    GenerateNotesView, ListUserNotesView, NoteDetailView, NoteJobDetailView, NoteJobRetryView,
+    StreamNotesView, SearchNotesView, NoteBatchView, NoteBatchDetailView,
+    NoteBatchResumeView, NoteBatchNotesView, NoteCollectionView
 )
+from .async_views import AsyncGenerateNotesView, AsyncNoteJobDetailView, AsyncGoogleLoginView
 from .social_auth import GoogleLoginView
 from django.http import JsonResponse
 from rest_framework.decorators import api_view, permission_classes
@@ -54,9 +57,22 @@ urlpatterns = [
     path("password-reset/", PasswordResetView.as_view(), name="password-reset"),
     path("password-reset-confirm/", PasswordResetConfirmView.as_view(), name="password-reset-confirm"),
     path("auth/google/", GoogleLoginView.as_view(), name="google_login"),
+    path("auth/async/google/", AsyncGoogleLoginView.as_view(), name="async_google_login"),
     path("notes/generate/", GenerateNotesView.as_view(), name="generate_notes"),
+    path("notes/generate/stream/", StreamNotesView.as_view(), name="stream_notes"),
     path("notes/", ListUserNotesView.as_view(), name="list_notes"),
+    path("notes/search/", SearchNotesView.as_view(), name="search_notes"),
     path("notes/<int:pk>/", NoteDetailView.as_view(), name="note_detail"),
+    path("notes/jobs/<int:pk>/", NoteJobDetailView.as_view(), name="note_job_detail"),
+    path("notes/jobs/<int:pk>/retry/", NoteJobRetryView.as_view(), name="note_job_retry"),
+    path("notes/batch/", NoteBatchView.as_view(), name="note_batch"),
+    path("notes/batch/<int:pk>/", NoteBatchDetailView.as_view(), name="note_batch_detail"),
+    path("notes/batch/<int:pk>/resume/", NoteBatchResumeView.as_view(), name="note_batch_resume"),
+    path("notes/batch/<int:pk>/notes/", NoteBatchNotesView.as_view(), name="note_batch_notes"),
+    path("notes/collections/", NoteCollectionView.as_view(), name="note_collection"),
+    path("notes/async/generate/", AsyncGenerateNotesView.as_view(), name="async_generate_notes"),
+    path("notes/async/jobs/<int:pk>/", AsyncNoteJobDetailView.as_view(), name="async_note_job_detail"),
+    path("metrics/", metrics_view, name="metrics"),
     
     # Debug endpoints
     path("ping/", ping, name="ping"),
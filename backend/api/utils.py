@@ -12,6 +12,18 @@ from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
 import logging
+from .metadata import parse_video_id, get_video_info, youtube_dl_options, info_dict_for_download
+from .captions import fetch_caption_transcript
+from .checkpoints import Checkpoint
+from .notes_engine import generate_notes, stream_notes
+from .metrics import observe_stage, AUDIO_BYTES, AUDIO_SIZE
+from .resilience import call, provider_timeout, CircuitOpenError
+from .segmented import Word, transcribe_segmented
+from .stages import (
+    TRANSCRIPT_SOURCE_CAPTIONS, TRANSCRIPT_SOURCE_ASR, drive, transcript_stages, pipeline_stages
+)
+from .transcode import transcode_audio
+from .vad import trim_silence
 
 logger = logging.getLogger('django')
 
@@ -42,6 +54,15 @@ cloudinary.config(
 
 # Configure AssemblyAI
 aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+aai.settings.http_timeout = provider_timeout('assemblyai')
+
+# Bump NOTES_PROMPT_VERSION whenever the prompt changes so cached results are regenerated
+NOTES_MODEL = 'gemini-1.5-flash'
+NOTES_PROMPT_VERSION = 2
+
+def pipeline_version():
+    """Identify the model and prompt that produced a result, used to key cached outputs."""
+    return f"{NOTES_MODEL}:p{NOTES_PROMPT_VERSION}"
 
 # Custom exception handler for REST framework
 def custom_exception_handler(exc, context):
@@ -72,188 +93,297 @@ def custom_exception_handler(exc, context):
 
 def yt_title(link):
     """Fetch the YouTube video title."""
-    cookie_file_path = os.path.join(settings.BASE_DIR, 'api', 'cookies.txt')
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': True,
-        'no_color': True,
-        'http_headers': {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-us,en;q=0.5',
-            'Sec-Fetch-Mode': 'navigate',
-            'Referer': 'https://www.youtube.com/',
-            'Origin': 'https://www.youtube.com',
-            'X-Forwarded-For': '203.0.113.1'  # Helps avoid IP-based blocks
-        },
-        'cookiefile': cookie_file_path if os.path.exists(cookie_file_path) else None,
-        'extractor_args': {
-            'youtube': {
-                'skip': ['dash', 'hls'],
-                'player_client': ['web']
-            }
-        }
-    }
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(link, download=False)
-            if not info:
-                raise Exception("No video information returned")
-            return info.get('title')
-        except Exception as e:
-            error_msg = f"Error fetching YouTube video: {str(e)}"
-            if "Video unavailable" in str(e):
-                error_msg += "\nThe video may be private, deleted, or age-restricted."
-            elif "HTTP Error 429" in str(e):
-                error_msg += "\nYouTube is rate-limiting our requests. Try again later or add YouTube cookies."
-            print(error_msg)
-            raise Exception(error_msg)
+    return get_video_info(link).title
 
-def download_audio(link):
-    import yt_dlp, os
-    from django.conf import settings
-    import cloudinary.uploader
-
-    cookie_file_path = os.path.join(settings.BASE_DIR, 'api', 'cookies.txt')
+@observe_stage('download')
+def download_audio_file(link):
+    """Download the audio track of a YouTube video and return the local file path."""
     temp_dir = '/tmp' if not settings.DEBUG else settings.MEDIA_ROOT
     os.makedirs(temp_dir, exist_ok=True)
 
     try:
-        ydl_opts = {
-            'format': 'bestaudio[ext=m4a]/bestaudio[ext=mp3]/bestaudio/best',
-            'outtmpl': os.path.join(temp_dir, '%(id)s.%(ext)s'),
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True,
-        }
+        # Reuse the metadata extraction instead of asking YouTube again
+        info = get_video_info(link)
 
-        if os.path.exists(cookie_file_path):
-            ydl_opts['cookiefile'] = cookie_file_path
+        if info.duration > settings.MAX_VIDEO_DURATION:
+            raise Exception("Video too long")
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            print("Fetching info...")
-            info = ydl.extract_info(link, download=False)
-
-            if info.get('duration', 0) > 3600:
-                raise Exception("Video too long")
+        ydl_opts = youtube_dl_options(
+            format='bestaudio[ext=m4a]/bestaudio[ext=mp3]/bestaudio/best',
+            outtmpl=os.path.join(temp_dir, '%(id)s.%(ext)s'),
+            noprogress=True,
+        )
 
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             print("Downloading audio...")
-            ydl.download([link])
+            downloaded = call('youtube', ydl.process_ie_result, info_dict_for_download(info), download=True)
 
-            audio_ext = info['ext'] if 'ext' in info else 'm4a'
-            file_path = os.path.join(temp_dir, f"{info['id']}.{audio_ext}")
+            requested = downloaded.get('requested_downloads') or []
+            file_path = requested[0].get('filepath') if requested else ydl.prepare_filename(downloaded)
 
-            if not os.path.exists(file_path):
+            if not file_path or not os.path.exists(file_path):
                 raise Exception("Download failed")
 
-            print("Uploading to Cloudinary...")
-            result = cloudinary.uploader.upload(
-                file_path,
-                resource_type="auto",
-                folder="youtube_audio"
-            )
+            size = os.path.getsize(file_path)
+            AUDIO_BYTES.inc(size)
+            AUDIO_SIZE.observe(size)
+            return file_path
+
+    except Exception as e:
+        print(f"Error in download_audio_file: {str(e)}")
+        raise
+
+@observe_stage('cloudinary_upload')
+def upload_audio_to_cloudinary(file_path):
+    """Upload a local audio file to Cloudinary, delete it, and return its public URL."""
+    print("Uploading to Cloudinary...")
+    result = call(
+        'cloudinary',
+        cloudinary.uploader.upload,
+        file_path,
+        resource_type="auto",
+        folder="youtube_audio",
+        timeout=provider_timeout('cloudinary')
+    )
+    remove_audio_file(file_path)
+    return result['url']
+
+def remove_audio_file(file_path):
+    """Delete a downloaded audio file, ignoring cleanup errors."""
+    try:
+        os.remove(file_path)
+    except Exception as cleanup_err:
+        print(f"Cleanup failed: {cleanup_err}")
 
-            try:
-                os.remove(file_path)
-            except Exception as cleanup_err:
-                print(f"Cleanup failed: {cleanup_err}")
+def download_speech_audio(link):
+    """Download a video's audio and shrink it for transcription (transcoding and trimming, when enabled).
 
-            return result['url']
+    Returns ``(file_path, offsets, levels)``; ``offsets`` maps the file's
+    timeline back to the video's (see ``vad.to_video_time``) and is None if
+    nothing was cut, and ``levels`` are the file's frame levels if silence
+    trimming measured them (reused by segmented transcription).
+    """
+    file_path = transcode_audio(download_audio_file(link))
+    trimmed = trim_silence(file_path)
+    if trimmed is None:
+        return file_path, None, None
+    return trimmed.path, trimmed.offsets or None, trimmed.levels
 
+def download_audio(link):
+    """Download a video's audio, ready for transcription, and return its Cloudinary URL."""
+    try:
+        return upload_audio_to_cloudinary(download_speech_audio(link)[0])
     except Exception as e:
         print(f"Error in download_audio: {str(e)}")
         raise
 
-def get_transcription_from_audio(audio_url):
-    """Get transcription using AssemblyAI."""
+@observe_stage('transcription')
+def get_transcription_from_audio(audio_source, transcript_id=None, on_submitted=None):
+    """Get transcription using AssemblyAI.
+
+    ``audio_source`` can be a public URL or a local file path; local files are
+    sent straight to AssemblyAI's upload endpoint by the SDK. Pass the
+    ``transcript_id`` of an earlier submission to wait for it instead of
+    submitting again; ``on_submitted`` is called with the id of a new one.
+    """
     try:
-        # Create a transcriber
-        transcriber = aai.Transcriber()
-        
-        # Start transcription
-        transcript = transcriber.transcribe(audio_url)
-        
-        # Wait for completion and return text
+        transcript = None
+        if transcript_id:
+            # Blocks until the earlier submission finishes
+            transcript = call('assemblyai', aai.Transcript.get_by_id, transcript_id)
+            if transcript.status == aai.TranscriptStatus.error:
+                print(f"Transcript {transcript_id} failed, submitting the audio again")
+                transcript = None
+
+        if transcript is None:
+            # Start transcription
+            transcript = call('assemblyai', aai.Transcriber().submit, audio_source)
+            if on_submitted is not None:
+                on_submitted(transcript.id)
+            # Wait for completion
+            transcript = call('assemblyai', transcript.wait_for_completion)
+
+        if transcript.status == aai.TranscriptStatus.error:
+            raise Exception(f"Transcription failed: {transcript.error}")
         return transcript.text
     except Exception as e:
         print(f"Error in get_transcription_from_audio: {str(e)}")
         raise
 
-def generate_notes_from_transcript(transcript, title):
-    """Generate notes from transcript using Google Gemini."""
+def get_words_from_audio(file_path):
+    """Transcribe one audio file with AssemblyAI and return its words, timed in seconds."""
+    transcript = call('assemblyai', aai.Transcriber().submit, file_path)
+    transcript = call('assemblyai', transcript.wait_for_completion)
+    if transcript.status == aai.TranscriptStatus.error:
+        raise Exception(f"Transcription failed: {transcript.error}")
+    return [Word(word.text, word.start / 1000, word.end / 1000) for word in transcript.words or []]
+
+def generate_text(prompt):
+    """Send one prompt to Gemini and return the response text, raising on failure."""
     try:
-        if genai is None:
-            return "Note generation is currently unavailable. Please check the Google Generative AI configuration."
-            
-        # Create prompt for Gemini
-        prompt = f"""You are an expert note-taker. Create comprehensive, organized notes from the following transcript of a YouTube video titled: "{title}".
-        
-        The notes should:
-        1. Have a clear, hierarchical structure with headings and subheadings
-        2. Include key concepts, ideas, and important information
-        3. Be organized in a logical manner that makes the content easy to understand and review
-        4. Use bullet points for detailed information under each section
-        5. Be written in a clear, concise academic style
-
-    Transcript:
-    {transcript}
+        # For newer genai library
+        model = genai.GenerativeModel(NOTES_MODEL)
+        response = call('gemini', model.generate_content, prompt, request_options={'timeout': provider_timeout('gemini')})
+        return response.text
+    except (AttributeError, NameError, TypeError):
+        # For older genai library
+        response = call(
+            'gemini',
+            genai.generate_text,
+            model="gemini-pro",
+            prompt=prompt
+        )
+        return response.text
+
+def stream_text(prompt):
+    """Stream one Gemini response, yielding text pieces as they arrive."""
+    model = genai.GenerativeModel(NOTES_MODEL)
+    response = call('gemini', model.generate_content, prompt, stream=True,
+                    request_options={'timeout': provider_timeout('gemini')})
+    for chunk in response:
+        text = chunk.text
+        if text:
+            yield text
+
+def generate_notes_from_transcript(transcript, title, segments=None, checkpoint=None):
+    """Generate notes from transcript using Google Gemini, raising on failure.
+
+    Long transcripts are summarized chunk by chunk in parallel and merged
+    (see ``notes_engine``); ``segments`` lets chunks follow caption timestamps
+    and chunk results are saved on ``checkpoint``.
+    Provider errors (including ``CircuitOpenError``) propagate to the caller.
     """
-        
-        # Try with different Gemini models
-        try:
-            # For newer genai library
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            return response.text
-        except (AttributeError, NameError, TypeError):
-            try:
-                # For older genai library
-                response = genai.generate_text(
-                    model="gemini-pro",
-                    prompt=prompt
-                )
-                return response.text
-            except Exception as e:
-                print(f"Error with alternative model: {str(e)}")
-                return "Note generation failed. Please try again later."
-                
+    if genai is None:
+        raise PipelineError("Note generation is currently unavailable. Please check the Google Generative AI configuration.")
+    try:
+        return generate_notes(transcript, title, generate_text, segments=segments, namespace=pipeline_version(),
+                              checkpoint=checkpoint)
     except Exception as e:
         print(f"Error in generate_notes_from_transcript: {str(e)}")
-        return "Note generation failed. Please try again later."
+        raise
+
+def stream_notes_from_transcript(transcript, title, segments=None, checkpoint=None):
+    """Yield the notes for a transcript piece by piece, raising on failure."""
+    if genai is None:
+        raise PipelineError("Note generation is currently unavailable. Please check the Google Generative AI configuration.")
+    yield from stream_notes(transcript, title, generate_text, stream_text, segments=segments,
+                            namespace=pipeline_version(), checkpoint=checkpoint)
+
+class PipelineError(Exception):
+    """Raised when a stage of the YouTube-to-notes pipeline fails."""
+
+
+def describe_pipeline_error(exc):
+    """Map a pipeline exception to an API error payload and HTTP status code."""
+    error_message = str(exc)
+    if isinstance(exc, CircuitOpenError):
+        return {
+            'error': 'Service unavailable',
+            'detail': error_message
+        }, status.HTTP_503_SERVICE_UNAVAILABLE
+    if "Video unavailable" in error_message:
+        return {
+            'error': 'Video unavailable',
+            'detail': 'The video is not available or is private'
+        }, status.HTTP_400_BAD_REQUEST
+    if "Video too long" in error_message:
+        return {
+            'error': 'Video too long',
+            'detail': 'The video is too long to process. Please try a shorter video.'
+        }, status.HTTP_400_BAD_REQUEST
+    return {
+        'error': 'Processing error',
+        'detail': error_message
+    }, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+def enter_stage(on_stage, stage):
+    """Log the start of a pipeline stage and notify the caller's progress callback."""
+    print(f"Pipeline stage: {stage}")
+    if on_stage is not None:
+        on_stage(stage)
+
+class SyncPerformer:
+    """Performs the operations of the pipeline stages (see stages.py) with blocking provider calls."""
+
+    def __init__(self, checkpoint, on_stage=None, on_text=None):
+        self.checkpoint = checkpoint
+        self.on_stage = on_stage
+        self.on_text = on_text
+
+    def stage(self, stage):
+        enter_stage(self.on_stage, stage)
+
+    def video_info(self, link):
+        return get_video_info(link)
+
+    def captions(self, info):
+        return fetch_caption_transcript(info)
+
+    def download(self, link):
+        return download_speech_audio(link)
+
+    def upload(self, file_path):
+        return upload_audio_to_cloudinary(file_path)
+
+    def transcribe_segmented(self, file_path, offsets, levels):
+        return transcribe_segmented(file_path, get_words_from_audio, offsets=offsets, levels=levels)
+
+    def transcribe(self, audio_source, transcript_id):
+        return get_transcription_from_audio(
+            audio_source,
+            transcript_id=transcript_id,
+            on_submitted=lambda transcript_id: self.checkpoint.save('asr', transcript_id=transcript_id)
+        )
+
+    def generate(self, transcription, title, segments):
+        if self.on_text is None:
+            return generate_notes_from_transcript(transcription, title, segments=segments, checkpoint=self.checkpoint)
+        parts = []
+        for text in stream_notes_from_transcript(transcription, title, segments=segments, checkpoint=self.checkpoint):
+            parts.append(text)
+            self.on_text(text)
+        return ''.join(parts)
+
+    def save(self, stage, values):
+        self.checkpoint.save(stage, **values)
+
+    def save_transcript(self, transcription, transcript_source, segments):
+        self.checkpoint.save_transcript(transcription, transcript_source, segments)
+
+def prepare_transcript(link, on_stage=None, checkpoint=None):
+    """Run the metadata and transcription stages for a YouTube link, raising on failure.
+
+    Returns the title, audio location, transcript text, transcript source and,
+    for caption and segmented ASR transcripts, the timestamped ``segments``. Stages already in
+    ``checkpoint`` are skipped and new stage outputs are saved to it.
+    """
+    checkpoint = checkpoint or Checkpoint()
+    return drive(transcript_stages(link, checkpoint), SyncPerformer(checkpoint, on_stage=on_stage))
+
+def run_pipeline(link, on_stage=None, checkpoint=None, on_text=None):
+    """Run every pipeline stage for a YouTube link, raising on failure.
+
+    ``on_stage`` is called with the name of each stage as it starts so callers
+    (e.g. the job worker) can report progress, and ``on_text``, if given, with
+    each piece of the notes as Gemini streams them. In direct transfer mode with
+    archiving enabled, the result's ``audio_path`` is a local file the caller
+    must archive (see ``upload_audio_to_cloudinary``) or delete. With a
+    ``checkpoint`` (see checkpoints.py) finished stages are skipped and each
+    stage's output is saved as it completes.
+    """
+    checkpoint = checkpoint or Checkpoint()
+    performer = SyncPerformer(checkpoint, on_stage=on_stage, on_text=on_text)
+    return drive(pipeline_stages(link, checkpoint, pipeline_version()), performer)
 
 def process_youtube_link(link):
     """Process YouTube link to get transcription and notes."""
     try:
         print("Starting YouTube link processing...")
-        
-        # Get title
-        print("Fetching video title...")
-        title = yt_title(link)
-        print(f"Video title: {title}")
-        
-        # Download audio
-        print("Downloading audio...")
-        audio_url = download_audio(link)
-        print("Audio download complete")
-        
-        # Get transcription
-        print("Getting transcription...")
-        transcription = get_transcription_from_audio(audio_url)
-        print("Transcription complete")
-        
-        # Generate notes
-        print("Generating notes...")
-        notes = generate_notes_from_transcript(transcription, title)
-        print("Notes generation complete")
-        
-        return {
-            'title': title,
-            'audio_url': audio_url,
-            'transcription': transcription,
-            'notes': notes
-        }
+        result = run_pipeline(link)
+        audio_path = result.pop('audio_path', None)
+        if audio_path:
+            result['audio_url'] = upload_audio_to_cloudinary(audio_path)
+        return result
     except Exception as e:
         error_message = f"Error in process_youtube_link: {str(e)}"
         print(error_message)
@@ -263,4 +393,4 @@ def process_youtube_link(link):
             'transcription': 'Transcription failed. Please try again.',
             'notes': error_message,
             'error': True
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,250 @@
+"""
+Cutting silence and non-speech from audio before transcription.
+
+Lectures often open with minutes of dead air or a holding slide, and we pay
+for and wait on the transcription of all of it. With ``AUDIO_VAD`` enabled,
+downloaded audio goes through an energy-based voice activity detector first:
+
+1. ffmpeg decodes the file to 16 kHz mono PCM, streamed in chunks;
+2. NumPy computes the level (dBFS) of every 30 ms frame;
+3. frames louder than the noise floor (10th percentile) plus
+   ``AUDIO_VAD_MARGIN_DB`` count as speech, and anything over -35 dBFS always
+   does, so loud recordings are left alone rather than cut into;
+4. quiet gaps shorter than ``AUDIO_VAD_MIN_SILENCE`` seconds are kept, and
+   each kept span gets ``AUDIO_VAD_PADDING`` seconds either side;
+5. a second ffmpeg pass writes just the kept spans (in the
+   ``AUDIO_TRANSCODE`` format, Opus when transcoding is off).
+
+No model is involved, so steady music as loud as speech is kept. Files that
+would lose less than ``MIN_SAVING`` are sent as they are.
+
+The trimmed file's timeline differs from the video's. ``TrimResult.offsets``
+maps one to the other (``to_video_time``); it is saved with the job's
+``audio`` checkpoint and then stored with the note and the cached result
+(``transcript_offsets``) so timestamps from the trimmed audio can be mapped
+back to video time.
+"""
+import asyncio
+import bisect
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+from .metrics import observe_stage, AUDIO_TRIMMED_SECONDS
+from .transcode import FORMATS, SPEECH_SAMPLE_RATE, TRANSCODE_TIMEOUT, find_ffmpeg, get_executor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FRAME_SECONDS = 0.03
+NOISE_FLOOR_PERCENTILE = 10
+# Frames at least this loud are always speech, however high the noise floor is
+SPEECH_DB = -35.0
+# Voiced runs shorter than this between long silences are clicks, not speech
+MIN_SPEECH = 0.2
+# Only re-encode when at least this much (seconds, or fraction of the file) goes
+MIN_SAVING = (5.0, 0.05)
+# PCM read per chunk while measuring levels (about 30 s)
+READ_FRAMES = 1000
+
+
+@dataclass
+class TrimResult:
+    path: str
+    duration: float                              # seconds of audio before trimming
+    removed: float                               # seconds cut
+    offsets: list = field(default_factory=list)  # [trimmed_start, original_start, length] per kept span
+    levels: object = None                        # dBFS per frame of the audio at ``path``, for segmented.py
+
+
+def frame_levels(ffmpeg, file_path):
+    """Level in dBFS of each FRAME_SECONDS frame of ``file_path``, decoded to 16 kHz mono."""
+    frame = int(SPEECH_SAMPLE_RATE * FRAME_SECONDS)
+    frame_bytes = frame * 2
+    levels = []
+    pending = b''
+    # stderr goes to a file: a full stderr pipe would block ffmpeg while we wait on stdout
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-i', file_path,
+             '-vn', '-ac', '1', '-ar', str(SPEECH_SAMPLE_RATE), '-f', 's16le', '-'],
+            stdout=subprocess.PIPE, stderr=stderr
+        )
+        try:
+            while True:
+                data = process.stdout.read(frame_bytes * READ_FRAMES)
+                if not data:
+                    break
+                data = pending + data
+                usable = len(data) - len(data) % frame_bytes
+                pending = data[usable:]
+                samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32).reshape(-1, frame)
+                rms = np.sqrt(np.mean(samples * samples, axis=1))
+                levels.append(20 * np.log10(np.maximum(rms, 1.0) / 32768.0))
+            if process.wait(timeout=TRANSCODE_TIMEOUT) != 0:
+                stderr.seek(0)
+                error = stderr.read().decode(errors='replace').strip()
+                raise Exception(f"ffmpeg failed to decode audio: {error[-500:]}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+    return np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+
+
+def speech_spans(levels, margin_db, min_silence, padding):
+    """``(start, end)`` seconds of the spans to keep, from per-frame levels."""
+    if not len(levels):
+        return []
+    threshold = min(np.percentile(levels, NOISE_FLOOR_PERCENTILE) + margin_db, SPEECH_DB)
+    voiced = np.concatenate(([False], levels > threshold, [False]))
+    edges = np.flatnonzero(voiced[1:] != voiced[:-1])
+    runs = [[float(start) * FRAME_SECONDS, float(end) * FRAME_SECONDS] for start, end in zip(edges[::2], edges[1::2])]
+
+    # Bridge short pauses, then drop isolated clicks
+    merged = []
+    for run in runs:
+        if merged and run[0] - merged[-1][1] < min_silence:
+            merged[-1][1] = run[1]
+        else:
+            merged.append(run)
+    merged = [run for run in merged if run[1] - run[0] >= MIN_SPEECH]
+
+    duration = len(levels) * FRAME_SECONDS
+    spans = []
+    for start, end in merged:
+        start, end = max(start - padding, 0.0), min(end + padding, duration)
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def offset_map(spans):
+    """``[trimmed_start, original_start, length]`` for each kept span."""
+    offsets = []
+    position = 0.0
+    for start, end in spans:
+        offsets.append([round(position, 3), round(start, 3), round(end - start, 3)])
+        position += end - start
+    return offsets
+
+
+def kept_levels(levels, spans):
+    """The frame levels of the kept spans, i.e. of the trimmed audio."""
+    return np.concatenate([
+        levels[int(round(start / FRAME_SECONDS)):int(round(end / FRAME_SECONDS))] for start, end in spans
+    ])
+
+
+def to_video_time(seconds, offsets):
+    """Map a time in the trimmed audio back to the original (video) time."""
+    if not offsets:
+        return seconds
+    index = max(bisect.bisect_right([offset[0] for offset in offsets], seconds) - 1, 0)
+    trimmed_start, original_start, length = offsets[index]
+    return original_start + min(max(seconds - trimmed_start, 0.0), length)
+
+
+def write_spans(ffmpeg, file_path, spans):
+    """Write the kept spans of ``file_path`` to a new file and return its path."""
+    codec, extension = FORMATS.get(settings.AUDIO_TRANSCODE, FORMATS['opus'])
+    output = f"{os.path.splitext(file_path)[0]}.trimmed{extension}"
+    select = '+'.join(f"between(t,{start:.3f},{end:.3f})" for start, end in spans)
+    # 10 ms audio frames so cuts land within 10 ms of the span edges
+    audio_filter = (f"aresample={SPEECH_SAMPLE_RATE},asetnsamples=n={SPEECH_SAMPLE_RATE // 100}:p=0,"
+                    f"aselect='{select}',asetpts=N/SR/TB")
+    try:
+        subprocess.run(
+            [ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', '-i', file_path,
+             '-vn', '-af', audio_filter, '-ac', '1', '-c:a', codec, '-b:a', settings.AUDIO_TRANSCODE_BITRATE, output],
+            check=True, capture_output=True, timeout=TRANSCODE_TIMEOUT
+        )
+    except subprocess.CalledProcessError as e:
+        _remove(output)
+        raise Exception(f"ffmpeg failed to trim audio: {e.stderr.decode(errors='replace').strip()[-500:]}")
+    except BaseException:
+        _remove(output)
+        raise
+    return output
+
+
+def _remove(file_path):
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+def _trim(ffmpeg, file_path):
+    levels = frame_levels(ffmpeg, file_path)
+    duration = len(levels) * FRAME_SECONDS
+    spans = speech_spans(levels, settings.AUDIO_VAD_MARGIN_DB, settings.AUDIO_VAD_MIN_SILENCE, settings.AUDIO_VAD_PADDING)
+    removed = float(duration - sum(end - start for start, end in spans))
+    if not spans or removed < max(MIN_SAVING[0], MIN_SAVING[1] * duration):
+        print(f"Speech detection: nothing worth cutting ({removed:.1f}s of {duration:.1f}s is silence)")
+        return TrimResult(path=file_path, duration=round(duration, 3), removed=0.0, levels=levels)
+    output = write_spans(ffmpeg, file_path, spans)
+    return TrimResult(path=output, duration=round(duration, 3), removed=round(removed, 3), offsets=offset_map(spans),
+                      levels=kept_levels(levels, spans))
+
+
+def _submit(file_path):
+    """Start trimming ``file_path``; returns a Future, or None if trimming is off or unavailable."""
+    if not settings.AUDIO_VAD:
+        return None
+    if np is None:
+        print("WARNING: numpy is not installed; audio will be transcribed without trimming silence.")
+        return None
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        return None
+    return get_executor().submit(_trim, ffmpeg, file_path)
+
+
+def _finish(file_path, result):
+    if result is None or result.path == file_path:
+        return result
+    AUDIO_TRIMMED_SECONDS.inc(result.removed)
+    print(f"Speech detection: cut {result.removed:.1f}s of {result.duration:.1f}s ({len(result.offsets)} spans kept)")
+    _remove(file_path)
+    return result
+
+
+def trim_silence(file_path):
+    """Cut non-speech from ``file_path``, replacing it.
+
+    Returns a TrimResult (whose ``path`` is ``file_path`` if nothing was worth
+    cutting), or None if trimming is off or failed.
+    """
+    future = _submit(file_path)
+    if future is None:
+        return None
+    try:
+        with observe_stage('vad'):
+            result = future.result()
+    except Exception as e:
+        print(f"Speech detection failed, sending the untrimmed audio: {str(e)}")
+        return None
+    return _finish(file_path, result)
+
+
+async def trim_silence_async(file_path):
+    """``trim_silence`` for async callers."""
+    future = _submit(file_path)
+    if future is None:
+        return None
+    try:
+        with observe_stage('vad'):
+            result = await asyncio.wrap_future(future)
+    except Exception as e:
+        print(f"Speech detection failed, sending the untrimmed audio: {str(e)}")
+        return None
+    return _finish(file_path, result)
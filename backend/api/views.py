@@ -1,16 +1,29 @@
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from django.contrib.auth.models import User
 from rest_framework import generics
-from .serializers import UserSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer, VideoNotesSerializer
+from .serializers import UserSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer, VideoNotesSerializer, VideoNotesListSerializer, NoteJobSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from .renderers import FastJSONRenderer
 from rest_framework import status
 import json
 from urllib.parse import unquote
-from .models import VideoNotes
-from .utils import process_youtube_link
+from .models import VideoNotes, NoteJob, NoteBatch
+from .jobs import enqueue_job, create_note_from_result, retry_job
+from .batches import create_batch, create_collection, resume_batch, describe_batch, batch_note_ids
+from .pagination import NotesCursorPagination
+from .conditional import NoteConditionalMixin, NoteListConditionalMixin
+from .projections import requested_fields, project_row, project_rows, NOTE_LIST_FIELDS, NOTE_DETAIL_FIELDS
+from .search import search_notes, search_terms
+from .cache import get_cached_result
+from .streaming import JobEventStream, EventStreamRenderer, stream_cached_note
+from .metrics import render_metrics
+from .utils import describe_pipeline_error
 from rest_framework_simplejwt.views import TokenObtainPairView
 import os
 
@@ -36,6 +49,18 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 def sample():
     return HttpResponse("Welcome to YT Notes Generator API.")
 
+def metrics_view(request):
+    """Expose pipeline metrics in the Prometheus text format.
+
+    Plain Django view so scrapers don't need a JWT; when METRICS_TOKEN is set
+    the request must carry ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), expected):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 class CreateUserView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -76,6 +101,71 @@ class PasswordResetConfirmView(APIView):
             return Response({'detail': 'Password has been reset successfully.'}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def parse_generate_request(request):
+    """Validate a note generation request.
+
+    Returns ``(youtube_link, None)`` on success or ``(None, error_response)``.
+    """
+    # Parse request data
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return None, Response({
+            'error': 'Invalid JSON data',
+            'detail': 'The request body must be valid JSON'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Check if link exists in data
+    if 'link' not in data:
+        return None, Response({
+            'error': 'Missing YouTube link',
+            'required_fields': ['link'],
+            'received_fields': list(data.keys())
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    yt_link = unquote(data['link'])
+    print(f"Processing YouTube link: {yt_link}")
+    
+    # Validate YouTube URL
+    if not ('youtube.com' in yt_link or 'youtu.be' in yt_link):
+        return None, Response({
+            'error': 'Invalid YouTube URL',
+            'detail': 'The URL must be a valid YouTube video link'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    error_response = check_provider_keys()
+    if error_response is not None:
+        return None, error_response
+    
+    return yt_link, None
+
+def check_provider_keys():
+    """Return a 500 response naming any missing provider API keys, or None."""
+    aai_key = os.getenv("ASSEMBLYAI_API_KEY")
+    gemini_key = os.getenv("GOOGLE_GEMINI_API_KEY")
+    cloudinary_name = os.getenv("CLOUDINARY_CLOUD_NAME")
+    cloudinary_key = os.getenv("CLOUDINARY_API_KEY")
+    cloudinary_secret = os.getenv("CLOUDINARY_API_SECRET")
+    
+    # Cloudinary is only needed when audio is uploaded or archived there
+    needs_cloudinary = settings.AUDIO_TRANSFER_MODE == 'cloudinary' or settings.ARCHIVE_AUDIO_TO_CLOUDINARY
+    
+    missing_keys = []
+    if not aai_key: missing_keys.append('ASSEMBLYAI_API_KEY')
+    if not gemini_key: missing_keys.append('GOOGLE_GEMINI_API_KEY')
+    if needs_cloudinary:
+        if not cloudinary_name: missing_keys.append('CLOUDINARY_CLOUD_NAME')
+        if not cloudinary_key: missing_keys.append('CLOUDINARY_API_KEY')
+        if not cloudinary_secret: missing_keys.append('CLOUDINARY_API_SECRET')
+    
+    if missing_keys:
+        return Response({
+            'error': 'Server configuration error',
+            'detail': 'Missing required API keys',
+            'missing_keys': missing_keys
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return None
+
 class GenerateNotesView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -87,103 +177,29 @@ class GenerateNotesView(APIView):
         print(f"Request content type: {request.content_type}")
         
         try:
-            # Parse request data
-            try:
-                data = json.loads(request.body)
-            except json.JSONDecodeError:
-                return Response({
-                    'error': 'Invalid JSON data',
-                    'detail': 'The request body must be valid JSON'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Check if link exists in data
-            if 'link' not in data:
-                return Response({
-                    'error': 'Missing YouTube link',
-                    'required_fields': ['link'],
-                    'received_fields': list(data.keys())
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            yt_link = unquote(data['link'])
-            print(f"Processing YouTube link: {yt_link}")
-            
-            # Validate YouTube URL
-            if not ('youtube.com' in yt_link or 'youtu.be' in yt_link):
-                return Response({
-                    'error': 'Invalid YouTube URL',
-                    'detail': 'The URL must be a valid YouTube video link'
-                }, status=status.HTTP_400_BAD_REQUEST)
+            yt_link, error_response = parse_generate_request(request)
+            if error_response is not None:
+                return error_response
             
-            # Check API key configuration
-            aai_key = os.getenv("ASSEMBLYAI_API_KEY")
-            gemini_key = os.getenv("GOOGLE_GEMINI_API_KEY")
-            cloudinary_name = os.getenv("CLOUDINARY_CLOUD_NAME")
-            cloudinary_key = os.getenv("CLOUDINARY_API_KEY")
-            cloudinary_secret = os.getenv("CLOUDINARY_API_SECRET")
-            
-            missing_keys = []
-            if not aai_key: missing_keys.append('ASSEMBLYAI_API_KEY')
-            if not gemini_key: missing_keys.append('GOOGLE_GEMINI_API_KEY')
-            if not cloudinary_name: missing_keys.append('CLOUDINARY_CLOUD_NAME')
-            if not cloudinary_key: missing_keys.append('CLOUDINARY_API_KEY')
-            if not cloudinary_secret: missing_keys.append('CLOUDINARY_API_SECRET')
-            
-            if missing_keys:
-                return Response({
-                    'error': 'Server configuration error',
-                    'detail': 'Missing required API keys',
-                    'missing_keys': missing_keys
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            try:
-                # Process the YouTube link
-                print("Starting to process YouTube link...")
-                result = process_youtube_link(yt_link)
-                
-                if 'error' in result:
-                    return Response({
-                        'error': 'Processing error',
-                        'detail': result['notes']  # The error message is stored in notes field
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
-                # Save to database
-                print("Saving to database...")
-                video_note = VideoNotes.objects.create(
-                    user=request.user,
-                    youtube_title=result['title'],
-                    youtube_link=yt_link,
-                    notes_content=result['notes'],
-                    transcription=result['transcription'],
-                    audio_url=result['audio_url']
-                )
-                
-                # Serialize and return the data
+            # Another user already processed this video: reuse their result
+            cached = get_cached_result(yt_link)
+            if cached is not None:
+                print("Serving notes from the result cache")
+                video_note = create_note_from_result(request.user, yt_link, cached)
                 serializer = VideoNotesSerializer(video_note)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
-                
-            except Exception as e:
-                import traceback
-                error_trace = traceback.format_exc()
-                print(f"Processing error: {str(e)}")
-                print(error_trace)
-                
-                # Try to identify the specific error
-                error_message = str(e)
-                if "Video unavailable" in error_message:
-                    return Response({
-                        'error': 'Video unavailable',
-                        'detail': 'The video is not available or is private'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                elif "Video too long" in error_message:
-                    return Response({
-                        'error': 'Video too long',
-                        'detail': 'The video is too long to process. Please try a shorter video.'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    return Response({
-                        'error': 'Processing error',
-                        'detail': str(e)
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            # Queue the pipeline instead of running it on the request thread
+            job = NoteJob.objects.create(user=request.user, youtube_link=yt_link)
+            enqueue_job(job)
+            print(f"Queued note job {job.pk}")
+
+            serializer = NoteJobSerializer(job)
+            return Response(
+                serializer.data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': reverse('note_job_detail', args=[job.pk])}
+            )
                 
         except Exception as e:
             import traceback
@@ -194,18 +210,219 @@ class GenerateNotesView(APIView):
                 'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ListUserNotesView(generics.ListAPIView):
-    serializer_class = VideoNotesSerializer
+class StreamNotesView(APIView):
+    """Generate notes and stream progress and the notes text as Server-Sent Events."""
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, EventStreamRenderer]
+    
+    def post(self, request):
+        print("===== Request received at StreamNotesView =====")
+        print(f"User: {request.user.username}")
+        
+        yt_link, error_response = parse_generate_request(request)
+        if error_response is not None:
+            return error_response
+        
+        cached = get_cached_result(yt_link)
+        if cached is not None:
+            events = stream_cached_note(create_note_from_result(request.user, yt_link, cached))
+        else:
+            # The stream follows an ordinary job, so it is scheduled and shared like any other
+            job = NoteJob.objects.create(user=request.user, youtube_link=yt_link)
+            events = JobEventStream(job)
+            print(f"Streaming note job {job.pk}")
+        
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx-style proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class NoteBatchView(APIView):
+    """Submit many links at once: ``POST /api/notes/batch/`` with ``{"links": [...]}``."""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        links = request.data.get('links') if isinstance(request.data, dict) else None
+        if not isinstance(links, list) or not links:
+            return Response({
+                'error': 'Missing links',
+                'detail': 'Send a non-empty list of YouTube links as "links"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(links) > settings.NOTE_BATCH_MAX_LINKS:
+            return Response({
+                'error': 'Too many links',
+                'detail': f"A batch can contain at most {settings.NOTE_BATCH_MAX_LINKS} links"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        error_response = check_provider_keys()
+        if error_response is not None:
+            return error_response
+        
+        batch = create_batch(request.user, links)
+        data = describe_batch(batch)
+        return Response(
+            data,
+            status=status.HTTP_202_ACCEPTED if data['status'] == 'running' else status.HTTP_201_CREATED,
+            headers={'Location': reverse('note_batch_detail', args=[batch.pk])}
+        )
+
+class NoteBatchDetailView(APIView):
+    """Progress of a batch: ``GET /api/notes/batch/<id>/``."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        batch = get_object_or_404(NoteBatch, user=request.user, pk=pk)
+        return Response(describe_batch(batch))
+
+class NoteCollectionView(APIView):
+    """Generate notes for every video of a playlist or channel: ``POST /api/notes/collections/`` with ``{"link": ...}``.
+    
+    The videos become one batch, so progress, resume and the grouped notes
+    are served by the batch endpoints.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        link = request.data.get('link') if isinstance(request.data, dict) else None
+        if not link:
+            return Response({
+                'error': 'Missing playlist link',
+                'required_fields': ['link']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        error_response = check_provider_keys()
+        if error_response is not None:
+            return error_response
+        
+        try:
+            batch = create_collection(request.user, unquote(str(link)))
+        except ValueError as e:
+            return Response({'error': 'Invalid playlist URL', 'detail': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            payload, status_code = describe_pipeline_error(e)
+            return Response(payload, status=status_code)
+        data = describe_batch(batch)
+        return Response(
+            data,
+            status=status.HTTP_202_ACCEPTED if data['status'] == 'running' else status.HTTP_201_CREATED,
+            headers={'Location': reverse('note_batch_detail', args=[batch.pk])}
+        )
+
+class NoteBatchResumeView(APIView):
+    """Retry a batch's failed videos and restart interrupted ones: ``POST /api/notes/batch/<id>/resume/``."""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, pk):
+        batch = get_object_or_404(NoteBatch, user=request.user, pk=pk)
+        error_response = check_provider_keys()
+        if error_response is not None:
+            return error_response
+        
+        data = describe_batch(resume_batch(batch))
+        return Response(data, status=status.HTTP_202_ACCEPTED if data['status'] == 'running' else status.HTTP_200_OK)
+
+class NoteBatchNotesView(APIView):
+    """The notes of a batch or collection in playlist order: ``GET /api/notes/batch/<id>/notes/``.
+    
+    Rows have the note list's fields and accept the same ``?fields=``.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        batch = get_object_or_404(NoteBatch, user=request.user, pk=pk)
+        fields = requested_fields(request, NOTE_LIST_FIELDS)
+        note_ids = batch_note_ids(batch)
+        rows = {
+            row['id']: row
+            for row in VideoNotes.objects.filter(user=request.user, pk__in=note_ids).values(*dict.fromkeys(fields + ['id']))
+        }
+        return Response({
+            'id': batch.pk,
+            'title': batch.title,
+            'source_url': batch.source_url,
+            'results': project_rows([rows[note_id] for note_id in note_ids if note_id in rows], fields),
+        })
+
+class SearchNotesView(APIView):
+    """Full-text search over the user's notes and transcripts: ``GET /api/notes/search/?q=...``."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not search_terms(query):
+            return Response({'error': 'Missing search query', 'detail': 'Pass the words to search for as ?q='},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            limit = 20
+        
+        results = []
+        for hit in search_notes(request.user, query, limit=limit):
+            item = VideoNotesListSerializer(hit['note']).data
+            item['rank'] = hit['rank']
+            item['notes_snippet'] = hit['notes_snippet']
+            item['transcription_snippet'] = hit['transcription_snippet']
+            results.append(item)
+        return Response({'query': query, 'results': results})
+
+class NoteJobDetailView(generics.RetrieveAPIView):
+    serializer_class = NoteJobSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_queryset(self):
+        return NoteJob.objects.filter(user=self.request.user)
+
+class NoteJobRetryView(APIView):
+    """Run a failed job again from its last checkpoint: ``POST /api/notes/jobs/<id>/retry/``."""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, pk):
+        job = get_object_or_404(NoteJob, user=request.user, pk=pk)
+        error_response = check_provider_keys()
+        if error_response is not None:
+            return error_response
+        
+        if not retry_job(job):
+            return Response({'error': 'Job not failed', 'detail': f"Only failed jobs can be retried (this one is {job.status})"},
+                            status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(
+            NoteJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('note_job_detail', args=[job.pk])}
+        )
+
+class ListUserNotesView(NoteListConditionalMixin, generics.ListAPIView):
+    serializer_class = VideoNotesListSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotesCursorPagination
+    
     def get_queryset(self):
         return VideoNotes.objects.filter(user=self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        fields = requested_fields(request, NOTE_LIST_FIELDS)
+        # Only list fields are selectable, so the transcription and notes bodies stay in the
+        # database; the cursor needs id and created_at even when the client didn't ask for them
+        columns = list(dict.fromkeys(fields + ['id', 'created_at']))
+        rows = self.paginate_queryset(self.get_queryset().values(*columns))
+        return self.get_paginated_response(project_rows(rows, fields))
 
-class NoteDetailView(generics.RetrieveUpdateDestroyAPIView):
+class NoteDetailView(NoteConditionalMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = VideoNotesSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         return VideoNotes.objects.filter(user=self.request.user)
+    
+    def retrieve(self, request, *args, **kwargs):
+        fields = requested_fields(request, NOTE_DETAIL_FIELDS)
+        row = self.get_queryset().filter(pk=kwargs['pk']).values(*fields).first()
+        if row is None:
+            raise Http404
+        return Response(project_row(row, fields))
 
 
@@ -50,10 +50,10 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'dj_rest_auth.jwt_auth.JWTCookieAuthentication',
       ],
+     # orjson-backed JSON; the browsable API is only offered in development
      'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+        'api.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
      'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
       ],
@@ -153,6 +153,10 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Seconds to wait for a lock held by another worker thread before failing
+                'timeout': 20,
+            }
         }
     }
 
@@ -247,6 +251,109 @@ CORS_ALLOW_HEADERS = [
 # Set to True to allow preflight requests to be cached for longer
 CORS_PREFLIGHT_MAX_AGE = 86400  # 24 hours
 
+# Note generation jobs
+# 'thread' runs jobs in an in-process pool; 'db' leaves them for `manage.py process_note_jobs`;
+# 'async' runs them as coroutines on an in-process event loop (see api/async_pipeline.py).
+# Only 'db' survives a restart unattended: 'thread' and 'async' queue in memory, so a restarted
+# process re-schedules pending jobs on its first request (api.jobs.recover_jobs)
+NOTE_JOB_BACKEND = os.getenv('NOTE_JOB_BACKEND', 'thread')
+NOTE_JOB_WORKERS = int(os.getenv('NOTE_JOB_WORKERS', '2'))
+NOTE_JOB_POLL_INTERVAL = float(os.getenv('NOTE_JOB_POLL_INTERVAL', '2'))
+# Seconds without an update after which recovery treats a 'running' job as orphaned by a dead
+# process and requeues it; use 0 when a single process runs the jobs
+NOTE_JOB_STALE_AFTER = int(os.getenv('NOTE_JOB_STALE_AFTER', '3600'))
+# Jobs the 'async' backend runs at once; they mostly wait on providers, so this can be large
+NOTE_JOB_ASYNC_CONCURRENCY = int(os.getenv('NOTE_JOB_ASYNC_CONCURRENCY', '200'))
+
+# Fair sharing of job workers between users (see api/scheduler.py): 'fair' or 'fifo'.
+# Costs are seconds of video; each backlogged user earns QUANTUM per round and
+# jobs for videos of unknown length are charged DEFAULT_COST
+NOTE_SCHEDULER = os.getenv('NOTE_SCHEDULER', 'fair')
+NOTE_SCHEDULER_QUANTUM = float(os.getenv('NOTE_SCHEDULER_QUANTUM', '600'))
+NOTE_SCHEDULER_DEFAULT_COST = float(os.getenv('NOTE_SCHEDULER_DEFAULT_COST', '900'))
+NOTE_SCHEDULER_USER_CONCURRENCY = int(os.getenv('NOTE_SCHEDULER_USER_CONCURRENCY', '4'))
+
+# POST /api/notes/batch/: most links per request, and how many of a batch's jobs may run at once
+NOTE_BATCH_MAX_LINKS = int(os.getenv('NOTE_BATCH_MAX_LINKS', '50'))
+NOTE_BATCH_CONCURRENCY = int(os.getenv('NOTE_BATCH_CONCURRENCY', '4'))
+# POST /api/notes/collections/: most videos taken from one playlist or channel
+NOTE_COLLECTION_MAX_VIDEOS = int(os.getenv('NOTE_COLLECTION_MAX_VIDEOS', '200'))
+
+# Async provider layer: pooled keep-alive HTTP connections and request timeout (seconds)
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '100'))
+ASYNC_HTTP_TIMEOUT = float(os.getenv('ASYNC_HTTP_TIMEOUT', '120'))
+# Threads for blocking yt-dlp calls made from async code
+YTDLP_WORKERS = int(os.getenv('YTDLP_WORKERS', '8'))
+
+# External providers (see api/resilience.py): timeout (seconds) for each network operation,
+# attempts per call for rate limits and transient errors, with jittered exponential backoff,
+# and a circuit breaker that fails fast for RESET seconds after FAILURES straight failures
+YOUTUBE_TIMEOUT = float(os.getenv('YOUTUBE_TIMEOUT', '30'))
+CLOUDINARY_TIMEOUT = float(os.getenv('CLOUDINARY_TIMEOUT', '120'))
+ASSEMBLYAI_TIMEOUT = float(os.getenv('ASSEMBLYAI_TIMEOUT', '60'))
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', '120'))
+GOOGLE_TIMEOUT = float(os.getenv('GOOGLE_TIMEOUT', '10'))
+PROVIDER_RETRY_ATTEMPTS = int(os.getenv('PROVIDER_RETRY_ATTEMPTS', '3'))
+PROVIDER_RETRY_BASE_DELAY = float(os.getenv('PROVIDER_RETRY_BASE_DELAY', '1'))
+PROVIDER_RETRY_MAX_DELAY = float(os.getenv('PROVIDER_RETRY_MAX_DELAY', '30'))
+CIRCUIT_BREAKER_FAILURES = int(os.getenv('CIRCUIT_BREAKER_FAILURES', '5'))
+CIRCUIT_BREAKER_RESET = float(os.getenv('CIRCUIT_BREAKER_RESET', '30'))
+
+# YouTube metadata: extracted info dicts are reused for this many seconds
+VIDEO_INFO_TTL = int(os.getenv('VIDEO_INFO_TTL', '1800'))
+VIDEO_INFO_CACHE_SIZE = int(os.getenv('VIDEO_INFO_CACHE_SIZE', '256'))
+MAX_VIDEO_DURATION = int(os.getenv('MAX_VIDEO_DURATION', '3600'))  # seconds
+
+# Captions: 'prefer' uses YouTube captions when a usable track exists and falls back
+# to audio transcription, 'forbid' always transcribes the audio
+CAPTIONS_MODE = os.getenv('CAPTIONS_MODE', 'prefer')
+CAPTION_LANGUAGES = [lang.strip() for lang in os.getenv('CAPTION_LANGUAGES', 'en').split(',') if lang.strip()]
+
+# Note generation: transcripts longer than NOTES_CHUNK_TOKENS are summarized in
+# parallel chunks (map) and merged (reduce); model calls are cached by prompt in the
+# default Django cache (per process unless CACHES is set), and jobs also keep chunk results on their checkpoint
+NOTES_CHUNK_TOKENS = int(os.getenv('NOTES_CHUNK_TOKENS', '6000'))
+NOTES_MAP_CONCURRENCY = int(os.getenv('NOTES_MAP_CONCURRENCY', '4'))
+NOTES_CHUNK_CACHE_TTL = int(os.getenv('NOTES_CHUNK_CACHE_TTL', str(24 * 3600)))
+
+# Seconds between keep-alive comments on idle Server-Sent Events streams
+NOTES_STREAM_KEEPALIVE = int(os.getenv('NOTES_STREAM_KEEPALIVE', '15'))
+# Seconds between checks of a streamed job's row (progress from other processes or shared runs)
+NOTES_STREAM_POLL_INTERVAL = float(os.getenv('NOTES_STREAM_POLL_INTERVAL', '2'))
+
+# Audio transfer: 'direct' sends the downloaded file straight to AssemblyAI,
+# 'cloudinary' uploads it to Cloudinary first and transcribes from the public URL
+AUDIO_TRANSFER_MODE = os.getenv('AUDIO_TRANSFER_MODE', 'direct')
+# In direct mode, archive the audio to Cloudinary in the background after transcription
+ARCHIVE_AUDIO_TO_CLOUDINARY = os.getenv('ARCHIVE_AUDIO_TO_CLOUDINARY', 'True') == 'True'
+# Transcode downloads to mono 16 kHz speech before upload (see api/transcode.py; needs ffmpeg):
+# 'off', 'opus' (Ogg Opus) or 'aac' (M4A), at AUDIO_TRANSCODE_BITRATE, with up to WORKERS ffmpeg runs at once
+AUDIO_TRANSCODE = os.getenv('AUDIO_TRANSCODE', 'off')
+AUDIO_TRANSCODE_BITRATE = os.getenv('AUDIO_TRANSCODE_BITRATE', '24k')
+AUDIO_TRANSCODE_WORKERS = int(os.getenv('AUDIO_TRANSCODE_WORKERS', '2'))
+# Cut silence and non-speech before transcription (see api/vad.py; needs ffmpeg and numpy):
+# speech is MARGIN_DB above the noise floor, pauses under MIN_SILENCE seconds are kept,
+# and kept spans get PADDING seconds either side
+AUDIO_VAD = os.getenv('AUDIO_VAD', 'False') == 'True'
+AUDIO_VAD_MARGIN_DB = float(os.getenv('AUDIO_VAD_MARGIN_DB', '12'))
+AUDIO_VAD_MIN_SILENCE = float(os.getenv('AUDIO_VAD_MIN_SILENCE', '1.0'))
+AUDIO_VAD_PADDING = float(os.getenv('AUDIO_VAD_PADDING', '0.25'))
+# Transcribe local audio in up to this many parallel segments cut at pauses (see api/segmented.py;
+# needs ffmpeg and numpy; 1 = off), overlapping by OVERLAP seconds around each cut
+TRANSCRIBE_SEGMENTS = int(os.getenv('TRANSCRIBE_SEGMENTS', '1'))
+TRANSCRIBE_SEGMENT_OVERLAP = float(os.getenv('TRANSCRIBE_SEGMENT_OVERLAP', '2'))
+
+# Cross-user cache of pipeline results, keyed by video id and prompt/model version
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True') == 'True'
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', str(30 * 24 * 3600)))  # 30 days
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '5000'))
+
+# Default number of notes per page in GET /api/notes/ (clients may ask for up to 200)
+NOTES_PAGE_SIZE = int(os.getenv('NOTES_PAGE_SIZE', '50'))
+
+# Bearer token required to scrape /api/metrics/ (left open when unset)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Email settings
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT'))
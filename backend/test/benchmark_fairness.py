@@ -0,0 +1,200 @@
+"""
+Offline benchmark for fair sharing of job workers between users.
+
+Bulk users each submit a large batch (a playlist's worth of videos) while
+interactive users submit single videos at a steady rate, all through the real
+job queue (``NOTE_JOB_BACKEND = 'thread'``) and the fake providers. Each
+scenario reports how long jobs waited for a worker (``started_at -
+created_at``):
+
+* ``idle`` - interactive users only, the baseline
+* ``fifo`` - with the bulk load, ``NOTE_SCHEDULER = 'fifo'``
+* ``fair`` - with the bulk load, ``NOTE_SCHEDULER = 'fair'``
+
+With fair sharing the interactive p95 wait should stay close to ``idle``.
+Example:
+
+    cd backend
+    python test/benchmark_fairness.py --workers 4 --bulk-users 2 --bulk-videos 40 --output fairness.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+
+from benchmark_pipeline import (
+    git_commit, percentile, peak_rss_mb, setup_database, drain_background_work, _ms
+)
+from api.testing import FakeProviderConfig, ProviderProfile, install_fake_providers
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.test.utils import override_settings
+
+import api.jobs
+import api.scheduler
+from api.batches import create_batch
+from api.jobs import enqueue_job
+from api.models import NoteJob
+
+SCENARIOS = {
+    'idle': (False, 'fair'),
+    'fifo': (True, 'fifo'),
+    'fair': (True, 'fair'),
+}
+
+
+def video_link(prefix, index):
+    # Exactly 11 characters, like a real YouTube id (5-character prefix)
+    return f"https://www.youtube.com/watch?v={prefix}{index:06d}"
+
+
+def run_filter(run):
+    return Q(youtube_link__contains=f"v=r{run}")
+
+
+def submit_interactive(user, prefix, args, stop_at):
+    for index in range(args.interactive_jobs):
+        job = NoteJob.objects.create(user=user, youtube_link=video_link(prefix, index))
+        enqueue_job(job)
+        time.sleep(args.interval)
+        if time.monotonic() > stop_at:
+            return
+
+
+def wait_for_jobs(job_filter, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not NoteJob.objects.filter(job_filter).exclude(status__in=['completed', 'failed']).exists():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def wait_stats(jobs):
+    waits = [(job.started_at - job.created_at).total_seconds() for job in jobs if job.started_at]
+    return {
+        'jobs': len(jobs),
+        'failed': sum(1 for job in jobs if job.status == 'failed'),
+        'wait_ms': {
+            'p50': _ms(percentile(waits, 50)),
+            'p95': _ms(percentile(waits, 95)),
+            'max': _ms(max(waits)) if waits else None,
+        },
+    }
+
+
+def run_scenario(run, name, args):
+    bulk, scheduler = SCENARIOS[name]
+    bulk_users = [
+        User.objects.get_or_create(username=f"bulk{index}")[0] for index in range(args.bulk_users)
+    ] if bulk else []
+    interactive_users = [
+        User.objects.get_or_create(username=f"interactive{index}")[0] for index in range(args.interactive_users)
+    ]
+
+    with override_settings(NOTE_JOB_BACKEND='thread', NOTE_JOB_WORKERS=args.workers, NOTE_SCHEDULER=scheduler,
+                           NOTE_BATCH_CONCURRENCY=args.batch_concurrency, NOTE_BATCH_MAX_LINKS=args.bulk_videos):
+        api.jobs._executor = None
+        api.scheduler._schedulers.clear()
+        started = time.perf_counter()
+        try:
+            for index, user in enumerate(bulk_users):
+                create_batch(user, [video_link(f"r{run}b{index:02d}", video) for video in range(args.bulk_videos)])
+            # Let the bulk backlog build before interactive users arrive
+            time.sleep(args.interval)
+            stop_at = time.monotonic() + args.job_timeout
+            threads = [
+                threading.Thread(target=submit_interactive, args=(user, f"r{run}i{index:02d}", args, stop_at))
+                for index, user in enumerate(interactive_users)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            finished = wait_for_jobs(run_filter(run), args.job_timeout)
+        finally:
+            if api.jobs._executor is not None:
+                api.jobs._executor.shutdown(wait=True)
+            api.jobs._executor = None
+            api.scheduler._schedulers.clear()
+        elapsed = time.perf_counter() - started
+
+    jobs = list(NoteJob.objects.filter(run_filter(run)))
+    interactive = [job for job in jobs if job.batch_id is None]
+    batch = [job for job in jobs if job.batch_id is not None]
+    return {
+        'scenario': name,
+        'scheduler': scheduler,
+        'finished': finished,
+        'elapsed_s': round(elapsed, 3),
+        'interactive': wait_stats(interactive),
+        'bulk': wait_stats(batch) if batch else None,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark fair sharing of job workers under bulk load.")
+    parser.add_argument('--scenarios', default='idle,fifo,fair', help="comma-separated: idle, fifo, fair")
+    parser.add_argument('--workers', type=int, default=4, help="NOTE_JOB_WORKERS")
+    parser.add_argument('--bulk-users', type=int, default=2)
+    parser.add_argument('--bulk-videos', type=int, default=40, help="videos in each bulk user's batch")
+    parser.add_argument('--batch-concurrency', type=int, default=8, help="NOTE_BATCH_CONCURRENCY")
+    parser.add_argument('--interactive-users', type=int, default=2)
+    parser.add_argument('--interactive-jobs', type=int, default=8, help="single videos per interactive user")
+    parser.add_argument('--interval', type=float, default=1.5, help="seconds between an interactive user's submissions")
+    parser.add_argument('--job-latency', type=float, default=0.3, help="latency of each fake provider call")
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--job-timeout', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--verbose', action='store_true', help="show the pipeline's own log output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    profile = ProviderProfile(latency=args.job_latency, jitter=args.jitter)
+    config = FakeProviderConfig(download=profile, assemblyai=profile, gemini=profile, seed=args.seed)
+
+    setup_database()
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    results = []
+    with install_fake_providers(config):
+        for run, name in enumerate(name.strip() for name in args.scenarios.split(',') if name.strip()):
+            print(f"Running scenario {name}...", file=sys.stderr)
+            with quiet:
+                results.append(run_scenario(run, name, args))
+                drain_background_work()
+
+    report = {
+        'commit': git_commit(),
+        'settings': {
+            'NOTE_JOB_WORKERS': args.workers,
+            'NOTE_BATCH_CONCURRENCY': args.batch_concurrency,
+            'NOTE_SCHEDULER_QUANTUM': api.scheduler.settings.NOTE_SCHEDULER_QUANTUM,
+            'NOTE_SCHEDULER_USER_CONCURRENCY': api.scheduler.settings.NOTE_SCHEDULER_USER_CONCURRENCY,
+        },
+        'load': {
+            'bulk_users': args.bulk_users,
+            'bulk_videos': args.bulk_videos,
+            'interactive_users': args.interactive_users,
+            'interactive_jobs': args.interactive_jobs,
+            'interval_s': args.interval,
+            'job_latency_s': args.job_latency,
+        },
+        'scenarios': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Offline end-to-end benchmark for the notes pipeline.
+
+Runs the real pipeline code (metadata, transcript, chunked generation, result
+cache, job queue, views) against the fake providers in api/testing.py, so
+results are reproducible and need no network access or API keys.
+
+Two targets are measured at each concurrency level:
+
+* ``process``  - ``process_youtube_link`` called directly from N threads
+* ``endpoint`` - ``POST /api/notes/generate/`` (202 + job) then polling the job
+  until it completes, with N clients and N job workers (``--job-backend async``
+  uses ``/api/notes/async/generate/`` and N concurrent coroutine jobs instead)
+
+Prints one JSON document with jobs/sec, latency percentiles, failures and peak
+RSS per scenario. Example:
+
+    cd backend
+    python test/benchmark_pipeline.py --jobs 40 --concurrency 1,4,8 --gemini-latency 0.2 --output before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark defaults; any of these can still be overridden from the environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+os.environ.setdefault('EMAIL_PORT', '587')
+os.environ.setdefault('CAPTIONS_MODE', 'forbid')
+os.environ.setdefault('RESULT_CACHE_ENABLED', 'False')
+for key in ['ASSEMBLYAI_API_KEY', 'GOOGLE_GEMINI_API_KEY', 'CLOUDINARY_CLOUD_NAME',
+            'CLOUDINARY_API_KEY', 'CLOUDINARY_API_SECRET']:
+    os.environ.setdefault(key, 'fake')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import setup_test_environment, override_settings
+
+from api.testing import FakeProviderConfig, ProviderProfile, install_fake_providers
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def video_link(run, index, distinct):
+    # Exactly 11 characters, like a real YouTube id
+    return f"https://www.youtube.com/watch?v=b{run:03d}x{index % distinct:06d}"
+
+
+def summarize(name, concurrency, latencies, failures, elapsed):
+    completed = len(latencies)
+    return {
+        'target': name,
+        'concurrency': concurrency,
+        'jobs': completed + failures,
+        'completed': completed,
+        'failed': failures,
+        'elapsed_s': round(elapsed, 3),
+        'jobs_per_sec': round((completed + failures) / elapsed, 3) if elapsed else None,
+        'latency_ms': {
+            'p50': _ms(percentile(latencies, 50)),
+            'p95': _ms(percentile(latencies, 95)),
+            'p99': _ms(percentile(latencies, 99)),
+            'mean': _ms(sum(latencies) / completed) if completed else None,
+        },
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def run_concurrently(count, concurrency, fn):
+    """Call ``fn(index)`` ``count`` times from ``concurrency`` threads; return (latencies, failures, elapsed)."""
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def timed(index):
+        started = time.perf_counter()
+        ok = fn(index)
+        duration = time.perf_counter() - started
+        with lock:
+            (latencies if ok else failures).append(duration)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench-client') as pool:
+        list(pool.map(timed, range(count)))
+    return latencies, len(failures), time.perf_counter() - started
+
+
+def bench_process(run, args, concurrency):
+    from api.utils import process_youtube_link
+
+    def call(index):
+        result = process_youtube_link(video_link(run, index, args.distinct_videos))
+        return 'error' not in result
+
+    return run_concurrently(args.jobs, concurrency, call)
+
+
+def bench_endpoint(run, args, concurrency, user):
+    import api.async_pipeline
+    import api.jobs
+    import api.scheduler
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    async_backend = args.job_backend == 'async'
+    generate_url = '/api/notes/async/generate/' if async_backend else '/api/notes/generate/'
+    # The async views authenticate from the request headers, so force_authenticate isn't enough
+    token = str(AccessToken.for_user(user))
+
+    def call(index):
+        client = APIClient()
+        client.force_authenticate(user)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.post(generate_url, {'link': video_link(run, index, args.distinct_videos)}, format='json')
+        if response.status_code == 201:
+            return True
+        if response.status_code != 202:
+            return False
+        job_url = response['Location']
+        deadline = time.monotonic() + args.job_timeout
+        while time.monotonic() < deadline:
+            job = client.get(job_url).json()
+            if job['status'] in ('completed', 'failed'):
+                return job['status'] == 'completed'
+            time.sleep(args.poll_interval)
+        print(f"Job {job_url} did not finish within {args.job_timeout}s", file=sys.stderr)
+        return False
+
+    # One job worker per concurrent client so the queue isn't the only bottleneck being measured
+    with override_settings(NOTE_JOB_WORKERS=concurrency, NOTE_JOB_ASYNC_CONCURRENCY=concurrency,
+                           NOTE_JOB_BACKEND=args.job_backend):
+        api.jobs._executor = None
+        api.scheduler._schedulers.clear()
+        try:
+            return run_concurrently(args.jobs, concurrency, call)
+        finally:
+            if api.jobs._executor is not None:
+                api.jobs._executor.shutdown(wait=True)
+            api.jobs._executor = None
+            api.scheduler._schedulers.clear()
+            api.async_pipeline.shutdown()
+
+
+def drain_background_work():
+    """Wait for queued audio archiving so it runs against the fakes and doesn't leak into the next scenario."""
+    import api.jobs
+    if api.jobs._archive_executor is not None:
+        api.jobs._archive_executor.shutdown(wait=True)
+        api.jobs._archive_executor = None
+
+
+def setup_database():
+    """Create a throwaway database (a temp file for SQLite so worker threads can share it)."""
+    setup_test_environment()
+    database = settings.DATABASES['default']
+    if database['ENGINE'].endswith('sqlite3'):
+        database.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.mkdtemp(prefix='ytnotes-bench-'), 'bench.sqlite3')
+        database.setdefault('OPTIONS', {})['timeout'] = 30
+    connection.creation.create_test_db(verbosity=0)
+
+    from django.contrib.auth.models import User
+    return User.objects.create_user('benchmark', 'benchmark@example.com', 'benchmark')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the notes pipeline against fake providers.")
+    parser.add_argument('--target', choices=['process', 'endpoint', 'both'], default='both')
+    parser.add_argument('--jobs', type=int, default=20, help="jobs per scenario")
+    parser.add_argument('--concurrency', default='1,4,8', help="comma-separated concurrency levels")
+    parser.add_argument('--distinct-videos', type=int, default=None,
+                        help="number of distinct videos per scenario (default: one per job)")
+    parser.add_argument('--metadata-latency', type=float, default=0.05)
+    parser.add_argument('--download-latency', type=float, default=0.2)
+    parser.add_argument('--cloudinary-latency', type=float, default=0.1)
+    parser.add_argument('--assemblyai-latency', type=float, default=0.3)
+    parser.add_argument('--gemini-latency', type=float, default=0.2)
+    parser.add_argument('--jitter', type=float, default=0.0, help="+/- seconds added to every provider call")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="per-call failure probability for every provider")
+    parser.add_argument('--audio-bytes', type=int, default=2 * 1024 * 1024)
+    parser.add_argument('--transcript-words', type=int, default=1500)
+    parser.add_argument('--notes-chars', type=int, default=4000)
+    parser.add_argument('--captions', action='store_true', help="give fake videos a caption track")
+    parser.add_argument('--job-backend', choices=['thread', 'async'], default='thread',
+                        help="NOTE_JOB_BACKEND for the endpoint target ('async' uses the async views)")
+    parser.add_argument('--poll-interval', type=float, default=0.02, help="job polling interval for the endpoint target")
+    parser.add_argument('--job-timeout', type=float, default=300, help="seconds before a polled job counts as failed")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--verbose', action='store_true', help="show the pipeline's own log output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.distinct_videos = args.distinct_videos or args.jobs
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    def profile(latency):
+        return ProviderProfile(latency=latency, jitter=args.jitter, failure_rate=args.failure_rate)
+
+    config = FakeProviderConfig(
+        youtube=profile(args.metadata_latency),
+        download=profile(args.download_latency),
+        cloudinary=profile(args.cloudinary_latency),
+        assemblyai=profile(args.assemblyai_latency),
+        gemini=profile(args.gemini_latency),
+        audio_bytes=args.audio_bytes,
+        transcript_words=args.transcript_words,
+        notes_chars=args.notes_chars,
+        captions=args.captions,
+        seed=args.seed,
+    )
+
+    user = setup_database()
+    targets = ['process', 'endpoint'] if args.target == 'both' else [args.target]
+    scenarios = []
+    run = 0
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with install_fake_providers(config):
+        for target in targets:
+            for concurrency in levels:
+                run += 1
+                print(f"Running {target} x{args.jobs} at concurrency {concurrency}...", file=sys.stderr)
+                with quiet:
+                    if target == 'process':
+                        latencies, failures, elapsed = bench_process(run, args, concurrency)
+                    else:
+                        latencies, failures, elapsed = bench_endpoint(run, args, concurrency, user)
+                    drain_background_work()
+                scenarios.append(summarize(target, concurrency, latencies, failures, elapsed))
+
+    report = {
+        'commit': git_commit(),
+        'settings': {
+            'CAPTIONS_MODE': settings.CAPTIONS_MODE,
+            'RESULT_CACHE_ENABLED': settings.RESULT_CACHE_ENABLED,
+            'AUDIO_TRANSFER_MODE': settings.AUDIO_TRANSFER_MODE,
+            'NOTES_CHUNK_TOKENS': settings.NOTES_CHUNK_TOKENS,
+            'NOTES_MAP_CONCURRENCY': settings.NOTES_MAP_CONCURRENCY,
+            'NOTE_JOB_BACKEND': args.job_backend,
+        },
+        'providers': {
+            'metadata_latency': args.metadata_latency,
+            'download_latency': args.download_latency,
+            'cloudinary_latency': args.cloudinary_latency,
+            'assemblyai_latency': args.assemblyai_latency,
+            'gemini_latency': args.gemini_latency,
+            'jitter': args.jitter,
+            'failure_rate': args.failure_rate,
+            'audio_bytes': args.audio_bytes,
+            'transcript_words': args.transcript_words,
+            'captions': args.captions,
+        },
+        'scenarios': scenarios,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == "__main__":
+    main()
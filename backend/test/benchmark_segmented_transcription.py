@@ -0,0 +1,133 @@
+"""
+Offline check of segmented transcription: cut planning and stitching.
+
+Builds synthetic recordings with known words (``FakeTranscriber`` in
+api/testing.py), plans cuts on their levels with
+``segmented.plan_segments``, "transcribes" each overlapping segment with the
+fake, stitches the pieces with ``segmented.stitch_words`` and compares the
+result with the ground truth, for every segment count and overlap asked for.
+Needs numpy but no ffmpeg, network or API keys.
+
+Reports, per setting, words missing, duplicated and substituted after
+stitching (substitutions include ``--mishear-rate`` mishearings), the worst
+timestamp error, and the transcription wall time a provider with
+``--latency`` + ``--real-time-factor`` x audio length would take for the
+whole file against the slowest segment. Example:
+
+    cd backend
+    python test/benchmark_segmented_transcription.py --seconds 3600 --segments 1,2,4,8 --overlaps 0,2,4 --mishear-rate 0.02
+"""
+import argparse
+import bisect
+import json
+import sys
+
+from benchmark_pipeline import git_commit, _ms
+
+from api.segmented import _normalize, plan_segments, stitch_words
+from api.testing import FakeTranscriber
+from api.vad import np
+
+
+def compare(truth, stitched):
+    """Missing, duplicated and substituted words, and the worst start-time error of the rest.
+
+    Words are paired by time, not text: each true word should get exactly one
+    stitched word whose midpoint falls inside it.
+    """
+    middles = [(word.start + word.end) / 2 for word in stitched]
+    missing = duplicated = substituted = 0
+    worst = 0.0
+    for word in truth:
+        heard = stitched[bisect.bisect_left(middles, word.start):bisect.bisect_right(middles, word.end)]
+        if not heard:
+            missing += 1
+            continue
+        duplicated += len(heard) - 1
+        if _normalize(heard[0].text) != _normalize(word.text):
+            substituted += 1
+        worst = max(worst, abs(heard[0].start - word.start))
+    # Stitched words that landed between true words
+    duplicated += len(stitched) - sum(
+        bisect.bisect_right(middles, word.end) - bisect.bisect_left(middles, word.start) for word in truth
+    )
+    return missing, duplicated, substituted, worst
+
+
+def run_setting(count, overlap, args):
+    totals = {'words': 0, 'missing': 0, 'duplicated': 0, 'substituted': 0}
+    worst = 0.0
+    whole, parallel = [], []
+    for seed in range(args.recordings):
+        transcriber = FakeTranscriber(
+            args.seconds, seed=seed, timing_jitter=args.timing_jitter, mishear_rate=args.mishear_rate,
+            latency=args.latency, real_time_factor=args.real_time_factor,
+        )
+        bounds = plan_segments(transcriber.levels(), count, overlap)
+        truth = transcriber.words
+        stitched = stitch_words([(start, end, transcriber.transcribe(start, end)) for start, end in bounds])
+        missing, duplicated, substituted, error = compare(truth, stitched)
+        totals['words'] += len(transcriber.words)
+        totals['missing'] += missing
+        totals['duplicated'] += duplicated
+        totals['substituted'] += substituted
+        worst = max(worst, error)
+        whole.append(transcriber.latency(0.0, args.seconds))
+        parallel.append(max(transcriber.latency(start, end) for start, end in bounds))
+    return {
+        'segments': count,
+        'overlap': overlap,
+        **totals,
+        'max_timestamp_error_ms': _ms(worst),
+        'whole_file_ms': _ms(sum(whole) / len(whole)),
+        'segmented_ms': _ms(sum(parallel) / len(parallel)),
+        'speedup': round(sum(whole) / sum(parallel), 2),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check segmented transcription stitching against known transcripts.")
+    parser.add_argument('--seconds', type=float, default=1800, help="length of each synthetic recording")
+    parser.add_argument('--recordings', type=int, default=5, help="recordings (seeds) per setting")
+    parser.add_argument('--segments', default='1,2,4,8', help="comma-separated segment counts")
+    parser.add_argument('--overlaps', default='0,1,2,4', help="comma-separated overlaps in seconds")
+    parser.add_argument('--timing-jitter', type=float, default=0.05, help="+/- seconds of word timestamp error")
+    parser.add_argument('--mishear-rate', type=float, default=0.0, help="probability a word is misheard")
+    parser.add_argument('--latency', type=float, default=2.0, help="fixed seconds per provider request")
+    parser.add_argument('--real-time-factor', type=float, default=0.1, help="provider seconds per second of audio")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if np is None:
+        sys.exit("numpy is required for this check")
+
+    results = []
+    for count in (int(value) for value in args.segments.split(',') if value.strip()):
+        for overlap in (float(value) for value in args.overlaps.split(',') if value.strip()):
+            print(f"Stitching {count} segments with {overlap:g}s overlap...", file=sys.stderr)
+            results.append(run_setting(count, overlap, args))
+
+    report = {
+        'commit': git_commit(),
+        'settings': {
+            'seconds': args.seconds,
+            'recordings': args.recordings,
+            'timing_jitter': args.timing_jitter,
+            'mishear_rate': args.mishear_rate,
+            'latency': args.latency,
+            'real_time_factor': args.real_time_factor,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == "__main__":
+    main()
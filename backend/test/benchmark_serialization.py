@@ -0,0 +1,140 @@
+"""
+Microbenchmark for the notes read path.
+
+Compares, on the same rows, building a response body with the DRF serializers
+(``VideoNotesSerializer`` / ``VideoNotesListSerializer`` + ``JSONRenderer``)
+against the ``.values()`` projection in api/projections.py rendered with
+``FastJSONRenderer``. Only serialization and rendering are timed; both paths
+run the same query shape (list fields, or every detail field).
+
+    cd backend
+    python test/benchmark_serialization.py --rows 1000,10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+os.environ.setdefault('EMAIL_PORT', '587')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+
+
+def setup_notes(rows, notes_chars, transcript_words):
+    from django.contrib.auth.models import User
+    from api.models import VideoNotes, make_notes_preview
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    user = User.objects.create_user('benchmark', 'benchmark@example.com', 'benchmark')
+    notes_content = ("## Key Concepts\n\n- **Example**: " + "lorem ipsum dolor sit amet " * notes_chars)[:notes_chars]
+    transcription = ' '.join(f"word{index % 997}" for index in range(transcript_words))
+    # bulk_create skips save(), so fill in the preview here
+    VideoNotes.objects.bulk_create([
+        VideoNotes(
+            user=user,
+            youtube_title=f"Benchmark video {index}",
+            youtube_link=f"https://www.youtube.com/watch?v=s{index:010d}",
+            video_id=f"s{index:010d}",
+            notes_content=notes_content,
+            notes_preview=make_notes_preview(notes_content),
+            transcription=transcription,
+            transcript_source='assemblyai',
+        )
+        for index in range(rows)
+    ], batch_size=500)
+    return user
+
+
+def serializer_path(user, rows, detail):
+    from api.models import VideoNotes
+    from api.serializers import VideoNotesSerializer, VideoNotesListSerializer
+
+    queryset = VideoNotes.objects.filter(user=user)[:rows]
+    if detail:
+        data = VideoNotesSerializer(queryset, many=True).data
+    else:
+        data = VideoNotesListSerializer(queryset.only(*VideoNotes.LIST_FIELDS), many=True).data
+    return JSONRenderer().render(data)
+
+
+def values_path(user, rows, detail):
+    from api.models import VideoNotes
+    from api.projections import NOTE_DETAIL_FIELDS, NOTE_LIST_FIELDS, project_rows
+    from api.renderers import FastJSONRenderer
+
+    fields = NOTE_DETAIL_FIELDS if detail else NOTE_LIST_FIELDS
+    data = project_rows(VideoNotes.objects.filter(user=user).values(*fields)[:rows], fields)
+    return FastJSONRenderer().render(data)
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(body)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark serializer vs values() rendering of notes.")
+    parser.add_argument('--rows', default='1000,10000', help="comma-separated row counts")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (the median is reported)")
+    parser.add_argument('--notes-chars', type=int, default=4000)
+    parser.add_argument('--transcript-words', type=int, default=1500)
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    counts = [int(count) for count in args.rows.split(',') if count.strip()]
+    user = setup_notes(max(counts), args.notes_chars, args.transcript_words)
+
+    from api.renderers import orjson
+
+    results = []
+    for rows in counts:
+        for detail in (False, True):
+            shape = 'detail' if detail else 'list'
+            print(f"Rendering {rows} {shape} rows...", file=sys.stderr)
+            baseline, baseline_bytes = measure(lambda: serializer_path(user, rows, detail), args.repeat)
+            fast, fast_bytes = measure(lambda: values_path(user, rows, detail), args.repeat)
+            results.append({
+                'rows': rows,
+                'fields': shape,
+                'serializer_ms': round(baseline * 1000, 1),
+                'values_ms': round(fast * 1000, 1),
+                'speedup': round(baseline / fast, 2) if fast else None,
+                'serializer_bytes': baseline_bytes,
+                'values_bytes': fast_bytes,
+            })
+
+    report = {
+        'orjson': getattr(orjson, '__version__', None),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == "__main__":
+    main()
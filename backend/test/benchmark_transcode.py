@@ -0,0 +1,159 @@
+"""
+Offline benchmark for transcoding downloaded audio to a speech format.
+
+Runs ``api.transcode.transcode_audio`` (the real ffmpeg stage, through its
+worker pool) over a set of audio files for each ``AUDIO_TRANSCODE`` mode and
+reports bytes in and out, transcode time, and the time to get each file to
+the provider: transcode plus upload at ``--uplink-mbps``, against uploading
+the original. Pass real downloads (e.g. files left by
+``test/test_yt_download.py``) or let it synthesize ``--generate`` files of
+``--seconds`` each as 128 kbps stereo AAC, like YouTube's usual m4a stream.
+Needs the ffmpeg binary. Example:
+
+    cd backend
+    python test/benchmark_transcode.py --generate 4 --seconds 600 --modes opus,aac --output transcode.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark_pipeline import git_commit, percentile, peak_rss_mb, _ms
+
+from django.test.utils import override_settings
+
+import api.transcode
+from api.transcode import find_ffmpeg, transcode_audio
+
+
+def generate_audio(ffmpeg, path, seconds):
+    """Write ``seconds`` of speech-band noise as 44.1 kHz stereo AAC at 128 kbps."""
+    subprocess.run([
+        ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f"anoisesrc=color=pink:amplitude=0.2:duration={seconds}:sample_rate=44100",
+        '-af', 'bandpass=f=1000:width_type=h:w=3000,volume=4',
+        '-ac', '2', '-c:a', 'aac', '-b:a', '128k', path,
+    ], check=True, timeout=600)
+
+
+def upload_seconds(size, uplink_mbps):
+    return size * 8 / (uplink_mbps * 1_000_000)
+
+
+def run_mode(mode, sources, work_dir, args):
+    # transcode_audio replaces its input, so each mode works on fresh copies
+    copies = []
+    for index, source in enumerate(sources):
+        copy = os.path.join(work_dir, f"{mode}-{index}{os.path.splitext(source)[1]}")
+        shutil.copyfile(source, copy)
+        copies.append(copy)
+
+    def transcode(path):
+        started = time.perf_counter()
+        output = transcode_audio(path)
+        return output, time.perf_counter() - started
+
+    with override_settings(AUDIO_TRANSCODE=mode, AUDIO_TRANSCODE_BITRATE=args.bitrate, AUDIO_TRANSCODE_WORKERS=args.workers):
+        api.transcode._executor = None
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(copies)) as pool:
+            results = list(pool.map(transcode, copies))
+        elapsed = time.perf_counter() - started
+        if api.transcode._executor is not None:
+            api.transcode._executor.shutdown(wait=True)
+        api.transcode._executor = None
+
+    files = []
+    for source, (output, seconds) in zip(sources, results):
+        size_in, size_out = os.path.getsize(source), os.path.getsize(output)
+        files.append({
+            'file': os.path.basename(source),
+            'bytes_in': size_in,
+            'bytes_out': size_out,
+            'ratio': round(size_in / size_out, 2),
+            'transcode_ms': _ms(seconds),
+            'original_upload_ms': _ms(upload_seconds(size_in, args.uplink_mbps)),
+            'end_to_end_ms': _ms(seconds + upload_seconds(size_out, args.uplink_mbps)),
+        })
+        os.remove(output)
+
+    bytes_in = sum(f['bytes_in'] for f in files)
+    bytes_out = sum(f['bytes_out'] for f in files)
+    transcode_ms = [f['transcode_ms'] for f in files]
+    return {
+        'mode': mode,
+        'files': files,
+        'bytes_in': bytes_in,
+        'bytes_out': bytes_out,
+        'bytes_saved': bytes_in - bytes_out,
+        'ratio': round(bytes_in / bytes_out, 2) if bytes_out else None,
+        'transcode_ms': {'p50': percentile(transcode_ms, 50), 'max': max(transcode_ms)},
+        'wall_ms': _ms(elapsed),
+        'original_upload_ms': sum(f['original_upload_ms'] for f in files),
+        'end_to_end_ms': sum(f['end_to_end_ms'] for f in files),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark transcoding audio to a compact speech format.")
+    parser.add_argument('files', nargs='*', help="audio files to transcode (left untouched)")
+    parser.add_argument('--generate', type=int, default=0, help="synthesize this many test files")
+    parser.add_argument('--seconds', type=int, default=600, help="length of each synthesized file")
+    parser.add_argument('--modes', default='opus,aac', help="comma-separated AUDIO_TRANSCODE modes")
+    parser.add_argument('--bitrate', default='24k', help="AUDIO_TRANSCODE_BITRATE")
+    parser.add_argument('--workers', type=int, default=2, help="AUDIO_TRANSCODE_WORKERS")
+    parser.add_argument('--uplink-mbps', type=float, default=20, help="upload bandwidth used for transfer estimates")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--verbose', action='store_true', help="show the transcoder's own log output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        sys.exit("ffmpeg is required for this benchmark")
+
+    with tempfile.TemporaryDirectory(prefix='transcode-bench-') as work_dir:
+        sources = list(args.files)
+        for index in range(args.generate):
+            path = os.path.join(work_dir, f"generated-{index}.m4a")
+            print(f"Generating {path} ({args.seconds}s)...", file=sys.stderr)
+            generate_audio(ffmpeg, path, args.seconds)
+            sources.append(path)
+        if not sources:
+            sys.exit("Pass audio files or --generate N")
+
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        results = []
+        for mode in (mode.strip() for mode in args.modes.split(',') if mode.strip()):
+            print(f"Transcoding with AUDIO_TRANSCODE={mode}...", file=sys.stderr)
+            with quiet:
+                results.append(run_mode(mode, sources, work_dir, args))
+
+    report = {
+        'commit': git_commit(),
+        'settings': {
+            'AUDIO_TRANSCODE_BITRATE': args.bitrate,
+            'AUDIO_TRANSCODE_WORKERS': args.workers,
+            'uplink_mbps': args.uplink_mbps,
+        },
+        'modes': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -245,6 +245,10 @@ export const generateNotes = async (youtubeLink) => {
             if (response.ok) {
                 const data = await response.json();
                 console.log('Response data:', data);
+                // 202 Accepted means the notes are being generated in the background
+                if (response.status === 202) {
+                    return await waitForNoteJob(data);
+                }
                 return data;
             } else {
                 // Try to get error details
@@ -267,11 +271,93 @@ export const generateNotes = async (youtubeLink) => {
     }
 };
 
-export const getUserNotes = async () => {
-    const response = await api.get('/api/notes/');
+export const getNoteJob = async (jobId) => {
+    const response = await api.get(`/api/notes/jobs/${jobId}/`);
+    return response.data;
+};
+
+// Run a failed job again; finished stages (completed_stages) are not repeated
+export const retryNoteJob = async (jobId) => {
+    const response = await api.post(`/api/notes/jobs/${jobId}/retry/`);
+    return response.data;
+};
+
+// Poll a note generation job until it finishes and return the generated note
+export const waitForNoteJob = async (job, onProgress, intervalMs = 2000) => {
+    let current = job;
+    while (['held', 'pending', 'running'].includes(current.status)) {
+        if (onProgress) {
+            onProgress(current);
+        }
+        await new Promise((resolve) => setTimeout(resolve, intervalMs));
+        current = await getNoteJob(current.id);
+    }
+    if (current.status === 'failed') {
+        throw new Error(current.detail || current.error || 'Note generation failed');
+    }
+    return await getNoteDetails(current.note);
+};
+
+// Submit many links at once; returns the batch with per-link status and overall progress
+export const generateNotesBatch = async (links) => {
+    const response = await api.post('/api/notes/batch/', { links });
+    return response.data;
+};
+
+export const getNoteBatch = async (batchId) => {
+    const response = await api.get(`/api/notes/batch/${batchId}/`);
+    return response.data;
+};
+
+// Expand a playlist or channel into a batch with one job per video
+export const generateNotesFromCollection = async (link) => {
+    const response = await api.post('/api/notes/collections/', { link });
     return response.data;
 };
 
+// Retry a batch's failed videos; videos that already have notes are kept
+export const resumeNoteBatch = async (batchId) => {
+    const response = await api.post(`/api/notes/batch/${batchId}/resume/`);
+    return response.data;
+};
+
+// The batch's notes in playlist order: { id, title, source_url, results }
+export const getNoteBatchNotes = async (batchId) => {
+    const response = await api.get(`/api/notes/batch/${batchId}/notes/`);
+    return response.data;
+};
+
+// Poll a batch until every link is resolved, reporting progress along the way
+export const waitForNoteBatch = async (batch, onProgress, intervalMs = 2000) => {
+    let current = batch;
+    while (current.status === 'running') {
+        if (onProgress) {
+            onProgress(current);
+        }
+        await new Promise((resolve) => setTimeout(resolve, intervalMs));
+        current = await getNoteBatch(current.id);
+    }
+    return current;
+};
+
+// Returns one page of notes: { next, results }. Pass the previous page's `next` to get the following one.
+export const getUserNotes = async ({ next = null, pageSize } = {}) => {
+    if (next) {
+        const response = await api.get(next);
+        return response.data;
+    }
+    const response = await api.get('/api/notes/', {
+        params: pageSize ? { page_size: pageSize } : {}
+    });
+    return response.data;
+};
+
+// Full-text search; snippets come back as escaped HTML with matches wrapped in <mark>
+export const searchNotes = async (query) => {
+    const response = await api.get('/api/notes/search/', { params: { q: query } });
+    return response.data.results;
+};
+
 export const getNoteDetails = async (noteId) => {
     const response = await api.get(`/api/notes/${noteId}/`);
     return response.data;
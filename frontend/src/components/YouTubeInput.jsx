@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { getAccessToken } from '../utils/tokenStorage';
+import { waitForNoteJob } from '../api';
 
 const YouTubeInput = ({ onNotesGenerated, onError }) => {
   const [youtubeLink, setYoutubeLink] = useState('');
@@ -71,7 +72,12 @@ const YouTubeInput = ({ onNotesGenerated, onError }) => {
       }
       
       setProgress('Processing video...');
-      const result = await response.json();
+      let result = await response.json();
+      if (response.status === 202) {
+        result = await waitForNoteJob(result, (job) => {
+          setProgress(job.stage ? `Processing video (${job.stage})...` : 'Waiting in queue...');
+        });
+      }
       
       setYoutubeLink('');
       onNotesGenerated(result);
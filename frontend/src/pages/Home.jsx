@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import Layout from '../components/Layout';
 import { getAccessToken } from '../utils/tokenStorage';
 import { useNavigate, Link } from 'react-router-dom';
-import { getUserNotes } from '../api';
+import { getUserNotes, waitForNoteJob } from '../api';
 
 const Home = () => {
   const [url, setUrl] = useState('');
@@ -17,8 +17,8 @@ const Home = () => {
     const fetchRecentNotes = async () => {
       try {
         setLoadingNotes(true);
-        const notes = await getUserNotes();
-        setRecentNotes(notes.slice(0, 3)); // Just show the 3 most recent notes
+        const { results } = await getUserNotes({ pageSize: 3 });
+        setRecentNotes(results); // Just show the 3 most recent notes
       } catch (err) {
         console.error('Error fetching recent notes:', err);
       } finally {
@@ -74,7 +74,10 @@ const Home = () => {
         throw new Error(errorMessage);
       }
       
-      const result = await response.json();
+      let result = await response.json();
+      if (response.status === 202) {
+        result = await waitForNoteJob(result);
+      }
       console.log('Success! Notes generated:', result);
       
       // After success, refresh notes and navigate to the note detail
@@ -1,13 +1,18 @@
 import React, { useEffect, useState } from 'react';
-import { getUserNotes, deleteNote } from '../api';
+import { getUserNotes, deleteNote, searchNotes } from '../api';
 import { Link, useNavigate } from 'react-router-dom';
 import Layout from '../components/Layout';
 import { useTheme } from '../context/ThemeContext';
 
 const NotesListPage = () => {
   const [notes, setNotes] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
+  const [searching, setSearching] = useState(false);
   const navigate = useNavigate();
   const { theme } = useTheme();
 
@@ -19,7 +24,8 @@ const NotesListPage = () => {
     try {
       setLoading(true);
       const data = await getUserNotes();
-      setNotes(data);
+      setNotes(data.results);
+      setNextPage(data.next);
       setError('');
     } catch (err) {
       console.error('Error fetching notes:', err);
@@ -29,11 +35,51 @@ const NotesListPage = () => {
     }
   };
 
+  const loadMoreNotes = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await getUserNotes({ next: nextPage });
+      setNotes(current => [...current, ...data.results]);
+      setNextPage(data.next);
+    } catch (err) {
+      console.error('Error fetching more notes:', err);
+      setError('Failed to load more notes. Please try again.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const handleSearch = async (e) => {
+    e.preventDefault();
+    if (!searchQuery.trim()) {
+      setSearchResults(null);
+      return;
+    }
+    try {
+      setSearching(true);
+      setSearchResults(await searchNotes(searchQuery));
+      setError('');
+    } catch (err) {
+      console.error('Error searching notes:', err);
+      setError('Search failed. Please try again.');
+    } finally {
+      setSearching(false);
+    }
+  };
+
+  const clearSearch = () => {
+    setSearchQuery('');
+    setSearchResults(null);
+  };
+
   const handleDeleteNote = async (id) => {
     if (window.confirm('Are you sure you want to delete this note?')) {
       try {
         await deleteNote(id);
         setNotes(notes.filter(note => note.id !== id));
+        if (searchResults) {
+          setSearchResults(searchResults.filter(note => note.id !== id));
+        }
       } catch (err) {
         console.error('Error deleting note:', err);
         setError('Failed to delete note. Please try again.');
@@ -67,6 +113,43 @@ const NotesListPage = () => {
       );
     }
 
+    if (searchResults) {
+      if (searchResults.length === 0) {
+        return (
+          <p className={`text-center py-16 ${theme === 'dark' ? 'text-gray-400' : 'text-gray-600'}`}>
+            No notes match "{searchQuery}".
+          </p>
+        );
+      }
+      return (
+        <div className="space-y-4">
+          {searchResults.map(result => (
+            <Link 
+              key={result.id} 
+              to={`/notes/${result.id}`}
+              className={`block p-5 rounded-xl transition-shadow shadow-md hover:shadow-lg ${
+                theme === 'dark' ? 'bg-gray-800 border border-gray-700' : 'bg-white border border-gray-200'
+              }`}
+            >
+              <h3 className="text-lg font-semibold mb-2">{result.youtube_title}</h3>
+              {result.notes_snippet && (
+                <p 
+                  className={`text-sm mb-2 ${theme === 'dark' ? 'text-gray-300' : 'text-gray-600'}`}
+                  dangerouslySetInnerHTML={{ __html: result.notes_snippet }}
+                />
+              )}
+              {result.transcription_snippet && (
+                <p 
+                  className={`text-sm italic ${theme === 'dark' ? 'text-gray-400' : 'text-gray-500'}`}
+                  dangerouslySetInnerHTML={{ __html: result.transcription_snippet }}
+                />
+              )}
+            </Link>
+          ))}
+        </div>
+      );
+    }
+
     if (notes.length === 0) {
       return (
         <div className="text-center py-16 px-4">
@@ -92,41 +175,63 @@ const NotesListPage = () => {
     }
 
     return (
-      <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-        {notes.map(note => (
-          <div 
-            key={note.id} 
-            className={`rounded-xl overflow-hidden shadow-md hover:shadow-lg transition-shadow ${
-              theme === 'dark' ? 'bg-gray-800 border border-gray-700' : 'bg-white border border-gray-200'
-            }`}
-          >
-            <div className="p-5">
-              <h3 className="text-lg font-semibold mb-2 line-clamp-2">{note.youtube_title}</h3>
-              <p className={`text-sm mb-4 ${theme === 'dark' ? 'text-gray-400' : 'text-gray-500'}`}>
-                Created: {new Date(note.created_at).toLocaleDateString()}
-              </p>
-              <div className="flex justify-between">
-                <Link 
-                  to={`/notes/${note.id}`} 
-                  className="px-4 py-2 bg-purple-600 text-white rounded-lg hover:bg-purple-700 transition-colors text-sm"
-                >
-                  View Notes
-                </Link>
-                <button 
-                  onClick={() => handleDeleteNote(note.id)} 
-                  className={`px-4 py-2 rounded-lg text-sm ${
-                    theme === 'dark' 
-                    ? 'bg-gray-700 text-red-400 hover:bg-red-900/30' 
-                    : 'bg-gray-100 text-red-600 hover:bg-red-50'
-                  }`}
-                >
-                  Delete
-                </button>
+      <>
+        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+          {notes.map(note => (
+            <div 
+              key={note.id} 
+              className={`rounded-xl overflow-hidden shadow-md hover:shadow-lg transition-shadow ${
+                theme === 'dark' ? 'bg-gray-800 border border-gray-700' : 'bg-white border border-gray-200'
+              }`}
+            >
+              <div className="p-5">
+                <h3 className="text-lg font-semibold mb-2 line-clamp-2">{note.youtube_title}</h3>
+                {note.notes_preview && (
+                  <p className={`text-sm mb-2 line-clamp-3 ${theme === 'dark' ? 'text-gray-300' : 'text-gray-600'}`}>
+                    {note.notes_preview}
+                  </p>
+                )}
+                <p className={`text-sm mb-4 ${theme === 'dark' ? 'text-gray-400' : 'text-gray-500'}`}>
+                  Created: {new Date(note.created_at).toLocaleDateString()}
+                </p>
+                <div className="flex justify-between">
+                  <Link 
+                    to={`/notes/${note.id}`} 
+                    className="px-4 py-2 bg-purple-600 text-white rounded-lg hover:bg-purple-700 transition-colors text-sm"
+                  >
+                    View Notes
+                  </Link>
+                  <button 
+                    onClick={() => handleDeleteNote(note.id)} 
+                    className={`px-4 py-2 rounded-lg text-sm ${
+                      theme === 'dark' 
+                      ? 'bg-gray-700 text-red-400 hover:bg-red-900/30' 
+                      : 'bg-gray-100 text-red-600 hover:bg-red-50'
+                    }`}
+                  >
+                    Delete
+                  </button>
+                </div>
               </div>
             </div>
+          ))}
+        </div>
+        {nextPage && (
+          <div className="flex justify-center mt-8">
+            <button 
+              onClick={loadMoreNotes} 
+              disabled={loadingMore}
+              className={`px-6 py-2.5 rounded-lg text-sm ${
+                theme === 'dark' 
+                ? 'bg-gray-800 text-gray-200 hover:bg-gray-700 border border-gray-700' 
+                : 'bg-white text-gray-700 hover:bg-gray-50 border border-gray-200'
+              } ${loadingMore ? 'opacity-60 cursor-not-allowed' : ''}`}
+            >
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
           </div>
-        ))}
-      </div>
+        )}
+      </>
     );
   };
 
@@ -163,6 +268,35 @@ const NotesListPage = () => {
           </button>
         </div>
 
+        {/* Search */}
+        <form onSubmit={handleSearch} className="flex gap-2 mb-6">
+          <input 
+            type="search"
+            value={searchQuery}
+            onChange={(e) => setSearchQuery(e.target.value)}
+            placeholder="Search your notes and transcripts..."
+            className={`flex-1 px-4 py-2.5 rounded-lg border focus:outline-none focus:ring-2 focus:ring-purple-500 ${
+              theme === 'dark' ? 'bg-gray-800 border-gray-700 text-gray-100' : 'bg-white border-gray-300 text-gray-900'
+            }`}
+          />
+          <button 
+            type="submit"
+            disabled={searching}
+            className="px-5 py-2.5 bg-purple-600 text-white rounded-lg hover:bg-purple-700 transition-colors"
+          >
+            {searching ? 'Searching...' : 'Search'}
+          </button>
+          {searchResults && (
+            <button 
+              type="button"
+              onClick={clearSearch}
+              className={`px-4 py-2.5 rounded-lg ${theme === 'dark' ? 'bg-gray-700 text-gray-200' : 'bg-gray-100 text-gray-700'}`}
+            >
+              Clear
+            </button>
+          )}
+        </form>
+
         {/* Notes Content */}
         {renderContent()}
       </div>